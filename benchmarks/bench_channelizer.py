@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+import argparse
+import time
+import numpy as np
+import common  # noqa: F401, puts the working tree on sys.path
+from rfsoc_qsfp_offload.channelizer import Channelizer, prototype_filter
+
+
+def main(args):
+    rng = np.random.default_rng(0)
+    block = rng.integers(-8192, 8192, 2 * args.block, dtype=np.int16)
+    print(f"{'channels':>9}{'taps':>6}{'outputs':>9}{'MSps':>10}")
+    for m in args.channels:
+        for n_out in (m, 1):
+            chan = Channelizer(m, prototype_filter(m, args.taps),
+                               channels=None if n_out == m else [1],
+                               max_samples=args.block)
+            chan.push(block)
+            n = 0
+            t0 = time.perf_counter()
+            while time.perf_counter() - t0 < args.seconds:
+                chan.push(block)
+                n += args.block
+            rate = n / (time.perf_counter() - t0)
+            print(f"{m:>9}{args.taps:>6}{n_out:>9}{rate / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the polyphase channelizer on one core")
+    parser.add_argument('-m', '--channels', type=int, nargs='*',
+                        default=[8, 64, 512])
+    parser.add_argument('--taps', type=int, default=12,
+                        help='Prototype taps per channel')
+    parser.add_argument('-b', '--block', type=int, default=65536,
+                        help='Complex samples per pushed block')
+    parser.add_argument('-t', '--seconds', type=float, default=1.0,
+                        help='Duration of each measurement')
+    main(parser.parse_args())
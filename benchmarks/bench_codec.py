@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+import argparse
+import numpy as np
+from common import best_time
+from rfsoc_qsfp_offload.codec import CODECS, encode, decode
+from rfsoc_qsfp_offload.signal_generator import convert_to_int16
+
+
+def test_signal(samples, noise):
+    """Interleaved 14-bit I/Q of a tone in noise, as the ADC delivers."""
+    rng = np.random.default_rng(0)
+    t = np.arange(samples)
+    x = 0.3 * np.exp(2j * np.pi * 0.0123 * t) + noise * (
+        rng.standard_normal(samples) + 1j * rng.standard_normal(samples))
+    iq = np.empty(2 * samples)
+    iq[0::2], iq[1::2] = x.real, x.imag
+    return convert_to_int16(iq, bits=14).astype(np.int16)
+
+
+def main(args):
+    samples = test_signal(args.samples, args.noise)
+    print(f"{'codec':<10}{'ratio':>8}{'encode MB/s':>14}{'decode MB/s':>14}")
+    for codec in CODECS:
+        frame = encode(samples, codec, args.level)
+        assert (decode(frame) == samples).all()
+        t_enc = best_time(lambda: encode(samples, codec, args.level),
+                          args.repeat)
+        t_dec = best_time(lambda: decode(frame), args.repeat)
+        mb = samples.nbytes / 1e6
+        print(f"{codec:<10}{len(frame) / samples.nbytes:>8.3f}"
+              f"{mb / t_enc:>14.1f}{mb / t_dec:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the 14-bit packing and lossless codecs")
+    parser.add_argument('-n', '--samples', type=int, default=1 << 20,
+                        help='Complex samples per frame')
+    parser.add_argument('--noise', type=float, default=0.01,
+                        help='Noise amplitude relative to full scale')
+    parser.add_argument('-l', '--level', type=int, default=1,
+                        help='zlib/lzma compression level')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='Number of timed repetitions')
+    main(parser.parse_args())
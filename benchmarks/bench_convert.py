@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+import argparse
+import numpy as np
+from common import best_time
+from rfsoc_qsfp_offload.convert import SampleConverter, FORMATS, FULL_SCALE
+
+
+def main(args):
+    rng = np.random.default_rng(0)
+    samples = rng.integers(-FULL_SCALE, FULL_SCALE, 2 * args.samples,
+                           dtype=np.int16)
+    cases = {
+        'naive complex64': lambda s: (s[0::2] + 1j * s[1::2]).astype(
+            np.complex64) / FULL_SCALE,
+        'astype complex64': lambda s: s.astype(np.float32).view(
+            np.complex64) * np.float32(1.0 / FULL_SCALE),
+    }
+    for fmt in FORMATS:
+        cases[fmt] = SampleConverter(fmt, args.samples).convert
+    print(f"{'conversion':<20}{'time [ms]':>12}{'MSps':>12}{'bytes/S':>10}")
+    for name, func in cases.items():
+        out = func(samples)
+        t = best_time(lambda: func(samples), args.repeat)
+        print(f"{name:<20}{t * 1e3:>12.3f}{args.samples / t / 1e6:>12.1f}"
+              f"{out.itemsize:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark int16 I/Q sample conversions")
+    parser.add_argument('-n', '--samples', type=int, default=1 << 20,
+                        help='Complex samples per conversion')
+    parser.add_argument('-r', '--repeat', type=int, default=20,
+                        help='Number of timed repetitions')
+    main(parser.parse_args())
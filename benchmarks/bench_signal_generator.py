@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+import argparse
+import itertools
+import json
+import platform
+import sys
+import numpy as np
+from common import best_time, peak_memory
+from rfsoc_qsfp_offload import signal_generator
+
+
+def cases(freqs, rates, sizes):
+    """Yield (name, params, func) of every benchmark case."""
+    for f, fs, n in itertools.product(freqs, rates, sizes):
+        params = {"f": f, "fs": fs, "min_samples": n}
+        tag = f"f={f:g} fs={fs:g} min_samples={n}"
+        yield f"sine {tag}", params, \
+            lambda f=f, fs=fs, n=n: signal_generator.sine(f, fs,
+                                                           min_samples=n)
+        yield f"sawtooth {tag}", params, \
+            lambda f=f, fs=fs, n=n: signal_generator.sawtooth(f, fs,
+                                                               min_samples=n)
+        yield f"cyclic_sine {tag}", params, \
+            lambda f=f, fs=fs, n=n: signal_generator.cyclic_sine(
+                f, fs, min_samples=n)
+        wave = signal_generator.sine(f, fs, min_samples=n)
+        yield f"convert_to_int16 {tag}", dict(params, samples=wave.size), \
+            lambda wave=wave: signal_generator.convert_to_int16(wave)
+
+
+def run(args):
+    results = {}
+    for name, params, func in cases(args.freqs, args.rates, args.sizes):
+        out = func()
+        results[name] = dict(params, samples=int(out.size),
+                             time_s=best_time(func, args.repeat),
+                             peak_bytes=peak_memory(func))
+    return results
+
+
+def compare(results, baseline, time_tolerance, memory_tolerance):
+    """Return the names and reasons of cases slower or larger than baseline.
+    """
+    regressions = []
+    for name, r in results.items():
+        b = baseline.get(name)
+        if b is None:
+            continue
+        if r["time_s"] > b["time_s"] * (1 + time_tolerance):
+            regressions.append(
+                (name, f"time {r['time_s'] * 1e3:.3f} ms vs "
+                       f"{b['time_s'] * 1e3:.3f} ms"))
+        if r["peak_bytes"] > b["peak_bytes"] * (1 + memory_tolerance):
+            regressions.append(
+                (name, f"peak {r['peak_bytes'] / 1e6:.2f} MB vs "
+                       f"{b['peak_bytes'] / 1e6:.2f} MB"))
+    return regressions
+
+
+def main(args):
+    results = run(args)
+    print(f"{'case':<62}{'samples':>10}{'ms':>10}{'peak MB':>10}")
+    for name, r in results.items():
+        print(f"{name:<62}{r['samples']:>10}{r['time_s'] * 1e3:>10.3f}"
+              f"{r['peak_bytes'] / 1e6:>10.2f}")
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({"machine": platform.platform(),
+                       "python": platform.python_version(),
+                       "numpy": np.__version__,
+                       "cases": results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["cases"]
+        regressions = compare(results, baseline, args.time_tolerance,
+                              args.memory_tolerance)
+        for name, reason in regressions:
+            print(f"REGRESSION {name}: {reason}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the TX waveform generation of "
+                    "signal_generator, no board needed")
+    parser.add_argument('--freqs', type=float, nargs='*',
+                        default=[1e6, 10e6, 100.1e6],
+                        help='Tone frequencies in Hz')
+    parser.add_argument('--rates', type=float, nargs='*',
+                        default=[1024e6, 2457.6e6],
+                        help='DAC sample rates in S/s')
+    parser.add_argument('--sizes', type=int, nargs='*',
+                        default=[24576, 1 << 20],
+                        help='min_samples values')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='Number of timed repetitions')
+    parser.add_argument('--save', default=None,
+                        help='Write the results as a JSON baseline')
+    parser.add_argument('--baseline', default=None,
+                        help='JSON baseline to check for regressions')
+    parser.add_argument('--time-tolerance', type=float, default=0.25,
+                        help='Allowed relative slowdown')
+    parser.add_argument('--memory-tolerance', type=float, default=0.10,
+                        help='Allowed relative growth of peak memory')
+    main(parser.parse_args())
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+import argparse
+import time
+import numpy as np
+import common  # noqa: F401, puts the working tree on sys.path
+from rfsoc_qsfp_offload.spectrum import SpectrumEngine
+
+
+def main(args):
+    rng = np.random.default_rng(0)
+    block = rng.integers(-8192, 8192, 2 * args.block, dtype=np.int16)
+    print(f"{'fft_size':>9}{'overlap':>9}{'MSps':>10}")
+    for fft_size in args.fft_sizes:
+        for overlap in args.overlaps:
+            engine = SpectrumEngine(fft_size, overlap, averages=64)
+            engine.push(block, 0)
+            n = 0
+            t0 = time.perf_counter()
+            while time.perf_counter() - t0 < args.seconds:
+                n += args.block
+                engine.push(block, n)
+            rate = n / (time.perf_counter() - t0)
+            print(f"{fft_size:>9}{overlap:>9.2f}{rate / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the streaming spectrum engine on one core")
+    parser.add_argument('--fft-sizes', type=int, nargs='*',
+                        default=[256, 1024, 4096])
+    parser.add_argument('--overlaps', type=float, nargs='*',
+                        default=[0.0, 0.5, 0.75])
+    parser.add_argument('-b', '--block', type=int, default=65536,
+                        help='Complex samples per pushed block')
+    parser.add_argument('-t', '--seconds', type=float, default=1.0,
+                        help='Duration of each measurement')
+    main(parser.parse_args())
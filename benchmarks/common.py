@@ -0,0 +1,30 @@
+import os
+import sys
+import time
+import tracemalloc
+
+# Run against the working tree, e.g. python benchmarks/bench_codec.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def best_time(func, repeat):
+    """Return the best time of `repeat` calls of func() in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def peak_memory(func):
+    """Return the peak bytes allocated during one call of func().
+
+    NumPy reports its array buffers to tracemalloc, so temporaries count.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
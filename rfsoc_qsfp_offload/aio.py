@@ -0,0 +1,178 @@
+import asyncio
+import collections
+import numpy as np
+from .rx import Receiver, PACKET_SAMPLES
+from .reassembly import Block, Reassembler
+
+POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+
+class SampleStream:
+    """Awaitable stream of sample blocks from a receiver.
+
+    Packets are read from the receiver whenever its socket becomes
+    readable, reassembled into blocks of `block_samples` samples and
+    queued for the consumer:
+
+        async with SampleStream(port=60133) as stream:
+            async for block in stream:
+                process(block.sample_idx, block.samples)
+
+    When the consumer falls behind and `max_blocks` blocks are queued,
+    `policy` decides what happens: 'drop_oldest' discards the oldest
+    queued block, 'drop_newest' discards the incoming block and 'block'
+    stops reading the socket until there is room again (the kernel then
+    drops once its buffer is full, which shows up as gap samples). Every
+    sample discarded by the policy is counted in 'dropped_samples' and
+    every zero-filled sample of the stream in 'gap_samples'.
+
+    A yielded block stays valid until the next block is requested. On
+    close() the blocks still held by the reassembler are flushed, with
+    missing packets zero-filled, and iteration ends once the queued
+    blocks are consumed.
+
+    Parameters
+    ----------
+    receiver: object
+        receiver with fileno() and recv(timeout), created from
+        `rx_kwargs` if None
+    block_samples: int
+        samples per block, a multiple of the packet size
+    policy: str
+        overload policy, one of POLICIES
+    max_blocks: int
+        number of blocks queued before the policy applies
+    """
+
+    def __init__(self, receiver=None, block_samples=32 * PACKET_SAMPLES,
+                 policy='drop_oldest', max_blocks=16, **rx_kwargs):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}.")
+        if block_samples % PACKET_SAMPLES:
+            raise ValueError(
+                f"block_samples must be a multiple of {PACKET_SAMPLES}.")
+        self.receiver = receiver if receiver is not None \
+            else Receiver(**rx_kwargs)
+        self._owns_receiver = receiver is None
+        self.policy = policy
+        self.max_blocks = max_blocks
+        self.block_samples = block_samples
+        self._reassembler = Reassembler(block_samples // PACKET_SAMPLES)
+        # Queued blocks, one being consumed and one spare
+        self._free = [np.zeros(2 * block_samples, dtype=np.int16)
+                      for _ in range(max_blocks + 2)]
+        self._queue = collections.deque()
+        self._current = None
+        self._waiter = None
+        self._loop = None
+        self._reading = False
+        self._closed = False
+        self.delivered_samples = 0
+        self.dropped_samples = 0
+        self.dropped_blocks = 0
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._resume()
+
+    def _resume(self):
+        if not self._reading and not self._closed:
+            self._loop.add_reader(self.receiver.fileno(), self._on_readable)
+            self._reading = True
+
+    def _pause(self):
+        if self._reading:
+            self._loop.remove_reader(self.receiver.fileno())
+            self._reading = False
+
+    def _on_readable(self, max_batches=64):
+        for _ in range(max_batches):
+            if self.policy == 'block' and len(self._queue) >= self.max_blocks:
+                self._pause()
+                break
+            payloads = self.receiver.recv(timeout=0)
+            if len(payloads) == 0:
+                break
+            for blk in self._reassembler.push(payloads):
+                self._enqueue(blk)
+        self._wake()
+
+    def _enqueue(self, blk):
+        if len(self._queue) >= self.max_blocks:
+            if self.policy == 'drop_newest':
+                self._drop(len(blk))
+                return
+            if self.policy == 'drop_oldest':
+                old = self._queue.popleft()
+                self._drop(len(old))
+                self._free.append(old.samples)
+        # A single push can complete several blocks, so the pool may grow
+        buf = self._free.pop() if self._free else np.empty_like(blk.samples)
+        buf[:] = blk.samples
+        self._queue.append(Block(blk.sample_idx, buf, blk.valid, blk.tags))
+
+    def _drop(self, samples):
+        self.dropped_blocks += 1
+        self.dropped_samples += samples
+
+    def _wake(self):
+        if self._queue and self._waiter is not None and \
+                not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._current is not None:
+            self._free.append(self._current.samples)
+            self._current = None
+        if self._loop is None:
+            await self.start()
+        while not self._queue:
+            if self._closed:
+                raise StopAsyncIteration
+            self._waiter = self._loop.create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        self._current = self._queue.popleft()
+        self.delivered_samples += len(self._current)
+        if self.policy == 'block':
+            self._resume()
+        return self._current
+
+    def stats(self) -> dict:
+        """Return a dictionary with the stream counters
+        """
+        gap = self._reassembler.gap_packets * PACKET_SAMPLES
+        return {
+            "delivered_samples": self.delivered_samples,
+            "dropped_samples": self.dropped_samples,
+            "dropped_blocks": self.dropped_blocks,
+            "gap_samples": gap,
+            "late_packets": self._reassembler.late,
+            "queued_blocks": len(self._queue),
+            "receiver": self.receiver.stats(),
+        }
+
+    def close(self):
+        if self._closed:
+            return
+        if self._loop is not None:
+            self._pause()
+        for blk in self._reassembler.flush():
+            self._enqueue(blk)
+        self._closed = True
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+        if self._owns_receiver:
+            self.receiver.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
@@ -0,0 +1,174 @@
+import argparse
+import itertools
+import numpy as np
+from scipy import fft as sp_fft
+from .convert import to_complex64
+
+
+def cross_delay(x, y, segment=4096, upsample=16):
+    """Estimate the delay of y relative to x by FFT cross-correlation.
+
+    Both signals are cut into segments of `segment` samples, transformed
+    in one batched FFT each, zero-padded to twice the segment length, and
+    the cross-spectra of all segments are summed. The correlation is the
+    inverse FFT of the sum, interpolated `upsample` times by zero-padding
+    the spectrum; a parabola through the peak gives the sub-sample delay.
+
+    Parameters
+    ----------
+    x, y: np.ndarray
+        complex64 samples covering the same sample indices
+    segment: int
+        samples per segment, larger than the delays to be measured
+    upsample: int
+        interpolation factor of the correlation
+
+    Returns
+    -------
+    (delay, coherence): the delay in samples, positive when y lags x,
+    and the normalised correlation peak in [0, 1]
+    """
+    n_seg = min(len(x), len(y)) // segment
+    if n_seg == 0:
+        raise ValueError(f"At least {segment} samples are needed.")
+    size = 2 * segment
+    xs = x[:n_seg * segment].reshape(n_seg, segment)
+    ys = y[:n_seg * segment].reshape(n_seg, segment)
+    xf = sp_fft.fft(xs, size, axis=1)
+    yf = sp_fft.fft(ys, size, axis=1)
+    cross = np.einsum('ij,ij->j', xf.conj(), yf)
+    # Zero-pad between the positive and negative frequencies
+    padded = np.zeros(size * upsample, dtype=np.complex128)
+    half = size // 2
+    padded[:half] = cross[:half]
+    padded[-half:] = cross[half:]
+    corr = np.abs(sp_fft.ifft(padded))
+    k = int(np.argmax(corr))
+    a, b, c = corr[k - 1], corr[k], corr[(k + 1) % len(corr)]
+    den = a - 2 * b + c
+    frac = 0.5 * (a - c) / den if den else 0.0
+    lag = (k + frac) / upsample
+    if lag >= segment:
+        lag -= size
+    energy = np.sqrt(np.vdot(xs, xs).real * np.vdot(ys, ys).real)
+    coherence = b * upsample / energy if energy else 0.0
+    return float(lag), float(min(coherence, 1.0))
+
+
+class AlignmentChecker:
+    """Measure the start skew between channels after they were armed.
+
+    Every channel is first aligned by the sample index in its headers,
+    then the remaining delay between the waveforms of each pair is
+    measured with cross_delay(). With a common signal on all inputs, e.g.
+    the DAC reference tone or noise, a delay near zero confirms that the
+    header sample indices of the channels refer to the same instants.
+
+    A tone only determines the delay modulo its period; use a wideband
+    signal to resolve whole-sample skews.
+
+    Parameters
+    ----------
+    sample_rate: float
+        complex samples per second
+    segment: int
+        samples per correlation segment
+    upsample: int
+        interpolation factor of the correlation
+    reference: str
+        channel all others are compared to, every pair if None
+    """
+
+    def __init__(self, sample_rate, segment=4096, upsample=16,
+                 reference=None):
+        self.sample_rate = sample_rate
+        self.segment = segment
+        self.upsample = upsample
+        self.reference = reference
+        self.reports = []
+
+    def measure(self, captures):
+        """Measure the delays between channels.
+
+        Parameters
+        ----------
+        captures: dict
+            (sample_idx, samples) of every channel, samples interleaved
+            int16 I/Q or complex64, sample_idx from the first header
+
+        Returns
+        -------
+        A list with a dictionary per channel pair
+        """
+        chans = {}
+        for name, (sample_idx, samples) in captures.items():
+            if samples.dtype == np.int16:
+                samples = to_complex64(samples)
+            chans[name] = (int(sample_idx), samples)
+        first = max(idx for idx, _ in chans.values())
+        last = min(idx + len(x) for idx, x in chans.values())
+        if last - first < self.segment:
+            raise ValueError("The captures overlap by less than a segment.")
+        names = list(chans)
+        if self.reference is None:
+            pairs = list(itertools.combinations(names, 2))
+        else:
+            pairs = [(self.reference, n) for n in names
+                     if n != self.reference]
+        reports = []
+        for a, b in pairs:
+            (ia, xa), (ib, xb) = chans[a], chans[b]
+            delay, coherence = cross_delay(
+                xa[first - ia:last - ia], xb[first - ib:last - ib],
+                self.segment, self.upsample)
+            reports.append({
+                "a": a,
+                "b": b,
+                "sample_idx": first,
+                "sample_idx_a": ia,
+                "sample_idx_b": ib,
+                "samples": last - first,
+                "delay_samples": delay,
+                "delay_s": delay / self.sample_rate,
+                "coherence": coherence,
+            })
+        self.reports.extend(reports)
+        return reports
+
+    def measure_block(self, block):
+        """Measure the delays of an AlignedBlock of a MultiBoardReceiver."""
+        return self.measure({name: (block.sample_idx, block.source(name))
+                             for name in block.names})
+
+
+def main(args):
+    from .calibration import load_sigmf
+    captures = {}
+    rate = None
+    for item in args.recordings:
+        name, path = item.split('=', 1)
+        samples, start, rate, _ = load_sigmf(path, args.samples)
+        captures[name] = (start, samples)
+    checker = AlignmentChecker(rate, args.segment, args.upsample,
+                               reference=args.reference)
+    for r in checker.measure(captures):
+        print(f"{r['a']}-{r['b']}: delay {r['delay_samples']:+.3f} samples "
+              f"({r['delay_s'] * 1e9:+.2f} ns), coherence "
+              f"{r['coherence']:.3f}, header sample_idx {r['sample_idx_a']}"
+              f" / {r['sample_idx_b']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure the delay between channel recordings")
+    parser.add_argument('recordings', nargs='+',
+                        help='CHANNEL=file.sigmf-data')
+    parser.add_argument('-r', '--reference', default=None,
+                        help='Channel to compare the others to')
+    parser.add_argument('--segment', type=int, default=4096,
+                        help='Samples per correlation segment')
+    parser.add_argument('--upsample', type=int, default=16,
+                        help='Correlation interpolation factor')
+    parser.add_argument('-n', '--samples', type=int, default=1 << 20,
+                        help='Samples read from every recording')
+    main(parser.parse_args())
@@ -0,0 +1,289 @@
+import argparse
+import json
+from fractions import Fraction
+import numpy as np
+from .convert import to_complex64
+
+
+def tone_frequency(samples, sample_rate):
+    """Estimate the frequency of the strongest tone in Hz.
+
+    The FFT peak is refined by parabolic interpolation of the log power.
+    """
+    n = len(samples)
+    win = np.hanning(n).astype(np.float32)
+    p = np.abs(np.fft.fft(samples * win)) ** 2 + 1e-30
+    k = int(np.argmax(p))
+    a, b, c = np.log(p[k - 1]), np.log(p[k]), np.log(p[(k + 1) % n])
+    den = a - 2 * b + c
+    delta = 0.5 * (a - c) / den if den else 0.0
+    f = (k + delta) / n
+    return float(f - 1 if f >= 0.5 else f) * sample_rate
+
+
+def fit_tone(samples, tone_hz, sample_rate, sample_idx=0):
+    """Fit y = gain*s + image*conj(s) + dc to a received reference tone.
+
+    s = exp(2j*pi*tone_hz*t) is the tone at the absolute sample index t,
+    so the gains of channels captured from the same sample index share
+    one phase reference.
+
+    Parameters
+    ----------
+    samples: np.ndarray
+        interleaved int16 I/Q or complex64 samples
+    tone_hz: float
+        tone frequency relative to the center frequency
+    sample_rate: float
+        complex samples per second
+    sample_idx: int
+        sample index of the first sample
+
+    Returns
+    -------
+    A dictionary with the complex 'gain', 'image' and 'dc', normalised to
+    full scale, and the fit residual as 'snr_db'
+    """
+    if samples.dtype == np.int16:
+        samples = to_complex64(samples)
+    n = len(samples)
+    # Sample indices since the epoch exceed the float64 mantissa, so the
+    # start phase, in cycles, is reduced exactly before adding the offsets
+    start = float(Fraction(tone_hz) / Fraction(sample_rate) *
+                  int(sample_idx) % 1)
+    cycles = start + (tone_hz / sample_rate) * np.arange(n, dtype=np.float64)
+    s = np.exp(2j * np.pi * cycles)
+    basis = np.stack([s, s.conj(), np.ones(n)], axis=1)
+    coef, *_ = np.linalg.lstsq(basis, samples.astype(np.complex128),
+                               rcond=None)
+    resid = samples - basis @ coef
+    signal = abs(coef[0]) ** 2
+    noise = float(np.mean(np.abs(resid) ** 2)) + 1e-30
+    return {"gain": complex(coef[0]), "image": complex(coef[1]),
+            "dc": complex(coef[2]),
+            "snr_db": float(10 * np.log10(signal / noise))}
+
+
+class ChannelCorrection:
+    """Correction of the gain, phase, DC offset and IQ imbalance of one
+    channel, y = a*x + b*conj(x) + k.
+
+    Applied in place with a handful of whole-array operations and one
+    preallocated scratch buffer; b is skipped when zero.
+
+    Parameters
+    ----------
+    a, b, k: complex
+        coefficients of the correction
+    """
+
+    def __init__(self, a, b=0j, k=0j):
+        self.a = np.complex64(a)
+        self.b = np.complex64(b)
+        self.k = np.complex64(k)
+        self._scratch = np.empty(0, dtype=np.complex64)
+
+    @classmethod
+    def from_fit(cls, gain, image, dc, target=1.0):
+        """Invert y = gain*s + image*conj(s) + dc to target*s."""
+        det = abs(gain) ** 2 - abs(image) ** 2
+        a = target * np.conj(gain) / det
+        b = -target * image / det
+        return cls(a, b, -(a * dc + b * np.conj(dc)))
+
+    def apply(self, samples, out=None):
+        """Correct samples, in place for complex64.
+
+        Parameters
+        ----------
+        samples: np.ndarray
+            interleaved int16 I/Q or complex64 samples
+        out: np.ndarray
+            complex64 array for the result of int16 input, allocated if None
+
+        Returns
+        -------
+        The corrected complex64 samples
+        """
+        x = to_complex64(samples, out) if samples.dtype == np.int16 \
+            else samples
+        if self.b:
+            if len(self._scratch) < len(x):
+                self._scratch = np.empty(len(x), dtype=np.complex64)
+            tmp = self._scratch[:len(x)]
+            np.multiply(x, self.a, out=tmp)
+            np.conjugate(x, out=x)
+            x *= self.b
+            x += tmp
+        else:
+            x *= self.a
+        if self.k:
+            x += self.k
+        return x
+
+
+class CalibrationProfile:
+    """Per-channel corrections estimated from a common reference tone.
+
+    Every channel is matched to the gain and phase of the reference
+    channel, with its own DC offset and IQ imbalance removed. The profile
+    is saved as JSON next to the recordings it applies to.
+
+    Attributes
+    ----------
+    channels: dict
+        fit of every channel, see fit_tone()
+    corrections: dict
+        ChannelCorrection of every channel
+    """
+
+    def __init__(self, channels, reference, tone_hz, sample_rate,
+                 center_freq=0.0):
+        self.channels = channels
+        self.reference = reference
+        self.tone_hz = tone_hz
+        self.sample_rate = sample_rate
+        self.center_freq = center_freq
+        target = channels[reference]["gain"]
+        self.corrections = {
+            name: ChannelCorrection.from_fit(fit["gain"], fit["image"],
+                                             fit["dc"], target)
+            for name, fit in channels.items()}
+
+    @classmethod
+    def estimate(cls, captures, sample_rate, sample_idx=0, tone_hz=None,
+                 reference=None, center_freq=0.0):
+        """Estimate a profile from simultaneous captures of a tone.
+
+        Parameters
+        ----------
+        captures: dict
+            samples of every channel, all starting at `sample_idx`
+        sample_rate: float
+            complex samples per second
+        sample_idx: int
+            sample index of the first sample of every capture
+        tone_hz: float
+            tone offset from the center, estimated from the reference if None
+        reference: str
+            channel the others are matched to, the first if None
+        center_freq: float
+            center frequency in Hz, stored with the profile
+        """
+        reference = next(iter(captures)) if reference is None else reference
+        if tone_hz is None:
+            ref = captures[reference]
+            if ref.dtype == np.int16:
+                ref = to_complex64(ref)
+            tone_hz = tone_frequency(ref, sample_rate)
+        channels = {name: fit_tone(x, tone_hz, sample_rate, sample_idx)
+                    for name, x in captures.items()}
+        return cls(channels, reference, tone_hz, sample_rate, center_freq)
+
+    def apply(self, channel, samples, out=None):
+        """Correct the samples of a channel, see ChannelCorrection.apply."""
+        return self.corrections[channel].apply(samples, out)
+
+    def summary(self) -> dict:
+        """Return a dictionary with the relative gain, phase, DC and image
+        rejection of every channel
+        """
+        ref = self.channels[self.reference]["gain"]
+        out = {}
+        for name, fit in self.channels.items():
+            rel = fit["gain"] / ref
+            out[name] = {
+                "gain_db": float(20 * np.log10(abs(rel))),
+                "phase_deg": float(np.degrees(np.angle(rel))),
+                "dc_dbfs": float(20 * np.log10(abs(fit["dc"]) + 1e-30)),
+                "image_rejection_db": float(20 * np.log10(
+                    abs(fit["gain"]) / (abs(fit["image"]) + 1e-30))),
+                "snr_db": fit["snr_db"],
+            }
+        return out
+
+    def save(self, path):
+        def pair(z):
+            return [z.real, z.imag]
+        with open(path, 'w') as f:
+            json.dump({
+                "reference": self.reference,
+                "tone_hz": self.tone_hz,
+                "sample_rate": self.sample_rate,
+                "center_freq": self.center_freq,
+                "channels": {
+                    name: {"gain": pair(fit["gain"]),
+                           "image": pair(fit["image"]),
+                           "dc": pair(fit["dc"]),
+                           "snr_db": fit["snr_db"]}
+                    for name, fit in self.channels.items()},
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            meta = json.load(f)
+        channels = {
+            name: {"gain": complex(*fit["gain"]),
+                   "image": complex(*fit["image"]),
+                   "dc": complex(*fit["dc"]), "snr_db": fit["snr_db"]}
+            for name, fit in meta["channels"].items()}
+        return cls(channels, meta["reference"], meta["tone_hz"],
+                   meta["sample_rate"], meta["center_freq"])
+
+
+def load_sigmf(path, n=None):
+    """Read the start of a SigMF recording.
+
+    Returns
+    -------
+    The first `n` interleaved int16 samples, all if None, with the sample
+    index, sample rate and frequency of the first capture
+    """
+    base = path.rsplit('.', 1)[0]
+    with open(base + '.sigmf-meta') as f:
+        meta = json.load(f)
+    cap = meta['captures'][0]
+    data = np.fromfile(base + '.sigmf-data', dtype='<i2',
+                       count=2 * n if n else -1)
+    return data, cap.get('core:global_index', cap['core:sample_start']), \
+        meta['global']['core:sample_rate'], cap.get('core:frequency', 0.0)
+
+
+def main(args):
+    captures, starts = {}, {}
+    for item in args.recordings:
+        name, path = item.split('=', 1)
+        samples, start, rate, freq = load_sigmf(path, args.samples)
+        captures[name], starts[name] = samples, start
+    # Trim every capture to the sample indices they have in common
+    first = max(starts.values())
+    last = min(starts[k] + len(v) // 2 for k, v in captures.items())
+    if last <= first:
+        raise ValueError("The recordings do not overlap in sample index.")
+    for name in captures:
+        off = first - starts[name]
+        captures[name] = captures[name][2 * off:2 * (off + last - first)]
+    profile = CalibrationProfile.estimate(captures, rate, first,
+                                          tone_hz=args.tone,
+                                          center_freq=freq)
+    profile.save(args.output)
+    for name, row in profile.summary().items():
+        print(name, ', '.join(f'{k}={v:.2f}' for k, v in row.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Estimate a channel calibration profile from "
+                    "recordings of a reference tone")
+    parser.add_argument('recordings', nargs='+',
+                        help='CHANNEL=file.sigmf-data, the first is the '
+                             'reference')
+    parser.add_argument('-o', '--output', default='calibration.json',
+                        help='Profile to write')
+    parser.add_argument('-t', '--tone', type=float, default=None,
+                        help='Tone offset from the center in Hz, '
+                             'estimated if unset')
+    parser.add_argument('-n', '--samples', type=int, default=1 << 20,
+                        help='Samples read from every recording')
+    main(parser.parse_args())
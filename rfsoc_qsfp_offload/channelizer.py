@@ -0,0 +1,161 @@
+import numpy as np
+from scipy import fft as sp_fft
+from scipy import signal
+from .convert import to_complex64
+
+
+def prototype_filter(n_channels, taps_per_channel=12, window=('kaiser', 8.0)):
+    """Design a lowpass prototype for an n_channels filterbank.
+
+    The cutoff is half the channel spacing, so adjacent channels cross at
+    about -6 dB.
+    """
+    return signal.firwin(n_channels * taps_per_channel, 1.0 / n_channels,
+                         window=window).astype(np.float32)
+
+
+class Channelizer:
+    """Critically sampled polyphase filterbank channelizer.
+
+    Splits a complex stream into `n_channels` channels spaced by
+    sample_rate/n_channels, each decimated by n_channels. Channel k is
+    centred on k*sample_rate/n_channels, so channels above n_channels/2
+    hold the negative frequencies, as in np.fft.fftfreq. Every call
+    consumes whole frames of n_channels samples; the rest, and the filter
+    history, carry over to the next block.
+
+    The prototype filter is applied as one multiply-accumulate per tap of
+    each polyphase branch over all frames of the block, followed by one
+    FFT across the branches. When only a few channels are requested, the
+    FFT is replaced by a matrix product with those DFT columns.
+
+    Parameters
+    ----------
+    n_channels: int
+        number of channels, the decimation factor
+    taps: np.ndarray
+        prototype lowpass filter, prototype_filter() if None
+    channels: list
+        channel indices to output, all if None
+    max_samples: int
+        largest block in complex samples, sizes the preallocated buffers
+    """
+
+    def __init__(self, n_channels, taps=None, channels=None,
+                 max_samples=1 << 18):
+        m = n_channels
+        if taps is None:
+            taps = prototype_filter(m)
+        taps = np.asarray(taps, dtype=np.float32)
+        n_taps = -(-len(taps) // m)
+        # Polyphase matrix, branch r holds taps[p*m + r]
+        h = np.zeros(n_taps * m, dtype=np.float32)
+        h[:len(taps)] = taps
+        self._h = h.reshape(n_taps, m)
+        # Complex copy so the products need no per-call casting
+        self._hc = self._h.astype(np.complex64)
+        self.n_channels = m
+        self.taps = taps
+        self.channels = np.arange(m) if channels is None \
+            else np.asarray(channels)
+        self._dft = None
+        if channels is not None and len(self.channels) <= \
+                max(2, int(np.log2(m))):
+            r = np.arange(m)[:, None]
+            self._dft = np.exp(2j * np.pi * r * self.channels[None, :] / m
+                               ).astype(np.complex64)
+        self.max_samples = max_samples
+        self._history = n_taps * m
+        self._buf = np.zeros(self._history + max_samples + m,
+                             dtype=np.complex64)
+        self._fill = self._history      # History is zero initially
+        max_frames = max_samples // m + 1
+        self._u = np.empty((max_frames, m), dtype=np.complex64)
+        self._tmp = np.empty((max_frames, m), dtype=np.complex64)
+        self._g = np.empty((max_frames + n_taps, m), dtype=np.complex64)
+        self._out = np.empty((max_frames, len(self.channels)),
+                             dtype=np.complex64)
+        self.frames = 0
+
+    def channel_frequencies(self, sample_rate):
+        """Center frequency offset of every output channel in Hz."""
+        return np.fft.fftfreq(self.n_channels,
+                              1.0 / sample_rate)[self.channels]
+
+    def push(self, samples):
+        """Channelize a block of samples.
+
+        Parameters
+        ----------
+        samples: np.ndarray
+            interleaved int16 I/Q or complex64 samples
+
+        Returns
+        -------
+        A (frames, len(channels)) complex64 view of a preallocated buffer,
+        valid until the next call
+        """
+        m = self.n_channels
+        n = len(samples) // 2 if samples.dtype == np.int16 else len(samples)
+        if n > self.max_samples:
+            raise ValueError(
+                f"{n} samples exceed max_samples={self.max_samples}.")
+        dst = self._buf[self._fill:self._fill + n]
+        if samples.dtype == np.int16:
+            to_complex64(samples, dst)
+        else:
+            dst[:] = samples
+        self._fill += n
+        n_frames = (self._fill - self._history) // m
+        if n_frames == 0:
+            return self._out[:0]
+        u = self._u[:n_frames]
+        tmp = self._tmp[:n_frames]
+        # Commutator: branch r of frame q takes x[q*m - r]. The reversed
+        # frames, history included, are copied once so the taps run over
+        # contiguous memory.
+        n_taps = len(self._h)
+        rows = n_frames + n_taps - 1
+        g = self._g[:rows]
+        item = self._buf.itemsize
+        np.copyto(g, np.lib.stride_tricks.as_strided(
+            self._buf[self._history - (n_taps - 1) * m:], shape=(rows, m),
+            strides=(m * item, -item), writeable=False))
+        for p in range(n_taps):
+            view = g[n_taps - 1 - p:n_taps - 1 - p + n_frames]
+            if p == 0:
+                np.multiply(view, self._hc[p], out=u)
+            else:
+                np.multiply(view, self._hc[p], out=tmp)
+                u += tmp
+        out = self._out[:n_frames]
+        if self._dft is not None:
+            np.matmul(u, self._dft, out=out)
+        elif len(self.channels) == m:
+            out[:] = sp_fft.ifft(u, axis=1, overwrite_x=True, norm='forward')
+        else:
+            out[:] = sp_fft.ifft(u, axis=1, overwrite_x=True,
+                                 norm='forward')[:, self.channels]
+        # Keep the history and the incomplete frame for the next block
+        used = n_frames * m
+        keep = self._fill - used
+        self._buf[:keep] = self._buf[used:self._fill]
+        self._fill = keep
+        self.frames += n_frames
+        return out
+
+    def reset(self):
+        """Clear the filter history, e.g. after a gap in the stream."""
+        self._buf[:self._history] = 0
+        self._fill = self._history
+
+    def stats(self) -> dict:
+        """Return a dictionary with the channelizer counters
+        """
+        return {
+            "n_channels": self.n_channels,
+            "channels": len(self.channels),
+            "taps_per_channel": len(self._h),
+            "frames": self.frames,
+            "pending_samples": self._fill - self._history,
+        }
@@ -0,0 +1,159 @@
+import lzma
+import struct
+import zlib
+import numpy as np
+
+CODECS = ('raw', 'pack14', 'zlib', 'lzma')
+
+# Frame header: magic, codec, flags, number of int16 values
+_FRAME = struct.Struct('<4sBBxxQ')
+_MAGIC = b'RFQC'
+_FLAG_SHIFTED = 1       # Values were stored without the 2 zero LSBs
+
+
+def pack14(samples, check=True):
+    """Pack MSB-aligned 14-bit samples into 14 bits each.
+
+    Every 4 int16 values become 7 bytes. The 2 least significant bits are
+    dropped, so the packing is lossless for ADC data as produced by
+    convert_to_int16(bits=14).
+
+    Parameters
+    ----------
+    samples: np.ndarray
+        int16 values, the length is padded to a multiple of 4
+    check: bool
+        raise ValueError if any of the dropped bits is set
+
+    Returns
+    -------
+    A uint8 array of ceil(len(samples)/4)*7 bytes
+    """
+    samples = np.asarray(samples, dtype=np.int16).ravel()
+    if check and (samples & 3).any():
+        raise ValueError("Samples have bits set below the 14 MSBs.")
+    pad = -len(samples) % 4
+    if pad:
+        samples = np.concatenate((samples, np.zeros(pad, dtype=np.int16)))
+    v = (samples.view(np.uint16) >> 2).reshape(-1, 4)
+    a, b, c, d = v[:, 0], v[:, 1], v[:, 2], v[:, 3]
+    out = np.empty((len(v), 7), dtype=np.uint8)
+    # Assignments to the uint8 output keep the low byte of each value
+    out[:, 0] = a
+    out[:, 1] = (a >> 8) | (b << 6)
+    out[:, 2] = b >> 2
+    out[:, 3] = (b >> 10) | (c << 4)
+    out[:, 4] = c >> 4
+    out[:, 5] = (c >> 12) | (d << 2)
+    out[:, 6] = d >> 6
+    return out.ravel()
+
+
+def unpack14(data, count=None):
+    """Unpack 14-bit samples packed by pack14().
+
+    Parameters
+    ----------
+    data: np.ndarray or bytes
+        packed bytes, a multiple of 7
+    count: int
+        number of values to return, all if None
+
+    Returns
+    -------
+    An int16 array of MSB-aligned samples
+    """
+    data = np.frombuffer(data, dtype=np.uint8).reshape(-1, 7)
+    words = np.zeros((len(data), 8), dtype=np.uint8)
+    words[:, :7] = data
+    words = words.view('<u8').ravel()
+    out = np.empty((len(words), 4), dtype=np.uint16)
+    # Shift each 14-bit field into the top of 16 bits, truncating above
+    out[:, 0] = words << np.uint64(2)
+    out[:, 1] = words >> np.uint64(12)
+    out[:, 2] = words >> np.uint64(26)
+    out[:, 3] = words >> np.uint64(40)
+    out &= 0xfffc
+    out = out.view(np.int16).ravel()
+    return out if count is None else out[:count]
+
+
+def _delta(values):
+    """Difference of I and Q values separately, wrapping in int16."""
+    d = values.copy()
+    d[2:] -= values[:-2]
+    return d
+
+
+def _undelta(d):
+    if len(d) % 2:
+        d = np.concatenate((d, np.zeros(1, dtype=np.int16)))
+    out = d.reshape(-1, 2)
+    # int16 cumulative sums wrap around exactly like the deltas did
+    np.cumsum(out, axis=0, dtype=np.int16, out=out)
+    return out.ravel()
+
+
+def encode(samples, codec='pack14', level=1):
+    """Encode int16 samples into a self-describing frame.
+
+    'pack14' stores 14 bits per value. 'zlib' and 'lzma' are lossless for
+    any int16 input: the I and Q sequences are delta coded, with the
+    2 zero LSBs of 14-bit data removed first, and then compressed.
+
+    Parameters
+    ----------
+    samples: np.ndarray
+        interleaved int16 I/Q samples
+    codec: str
+        one of CODECS
+    level: int
+        compression level of 'zlib' and 'lzma'
+
+    Returns
+    -------
+    The encoded frame as bytes
+    """
+    if codec not in CODECS:
+        raise ValueError(f"codec must be one of {CODECS}.")
+    samples = np.ascontiguousarray(samples, dtype=np.int16).ravel()
+    flags = 0
+    if codec == 'raw':
+        body = samples.astype('<i2').tobytes()
+    elif codec == 'pack14':
+        body = pack14(samples).tobytes()
+    else:
+        values = samples
+        if len(samples) and not (samples & 3).any():
+            values = samples >> 2
+            flags |= _FLAG_SHIFTED
+        raw = _delta(values).astype('<i2').tobytes()
+        body = zlib.compress(raw, level) if codec == 'zlib' else \
+            lzma.compress(raw, preset=level)
+    header = _FRAME.pack(_MAGIC, CODECS.index(codec), flags, len(samples))
+    return header + body
+
+
+def decode(frame):
+    """Decode a frame produced by encode().
+
+    Returns
+    -------
+    An int16 array with the original samples
+    """
+    magic, codec, flags, count = _FRAME.unpack_from(frame)
+    if magic != _MAGIC:
+        raise ValueError("Not an encoded sample frame.")
+    body = memoryview(frame)[_FRAME.size:]
+    codec = CODECS[codec]
+    if codec == 'raw':
+        return np.frombuffer(body, dtype='<i2').astype(np.int16)
+    if codec == 'pack14':
+        return unpack14(body, count)
+    raw = zlib.decompress(body) if codec == 'zlib' else \
+        lzma.decompress(body)
+    values = _undelta(np.frombuffer(raw, dtype='<i2').astype(np.int16))
+    values = values[:count]
+    if flags & _FLAG_SHIFTED:
+        values <<= 2
+    return values
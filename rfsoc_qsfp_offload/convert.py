@@ -0,0 +1,170 @@
+import numpy as np
+
+# Interleaved I/Q as structured complex types
+COMPLEX_INT16_DTYPE = np.dtype([('re', '<i2'), ('im', '<i2')])
+COMPLEX_FLOAT16_DTYPE = np.dtype([('re', '<f2'), ('im', '<f2')])
+
+# The 14-bit ADC samples are MSB aligned in int16, so full scale is 2**15
+FULL_SCALE = 1 << 15
+
+FORMATS = ('complex64', 'complex_float16', 'complex_int16')
+
+
+def _complex_shape(samples):
+    """Shape of the complex samples of interleaved I/Q."""
+    return samples.shape[:-1] + (samples.shape[-1] // 2,)
+
+
+def as_complex_int16(samples):
+    """Return interleaved int16 I/Q as a zero-copy complex int16 view.
+
+    Parameters
+    ----------
+    samples: np.ndarray
+        interleaved int16 I/Q samples, contiguous along the last axis
+
+    Returns
+    -------
+    A view with dtype COMPLEX_INT16_DTYPE, one element per complex sample,
+    shaped like `samples` with half as many values along the last axis
+    """
+    return samples.view(COMPLEX_INT16_DTYPE)
+
+
+def to_complex64(samples, out=None, scale=1.0 / FULL_SCALE):
+    """Convert interleaved int16 I/Q to complex64.
+
+    The conversion and the scaling are done in one pass, directly into
+    `out` when it is given. A batch of rows, e.g. the strided view of
+    payload_samples(), is converted row by row without a copy of the input.
+
+    Parameters
+    ----------
+    samples: np.ndarray
+        interleaved int16 I/Q samples, I/Q pairs along the last axis
+    out: np.ndarray
+        contiguous complex64 array of samples.size//2 to write to,
+        allocated if None
+    scale: float
+        factor applied to every value, 1.0 keeps the raw integer values
+
+    Returns
+    -------
+    The complex64 array, shaped like `out` or, if None, like `samples` with
+    half as many values along the last axis
+    """
+    if out is None:
+        out = np.empty(_complex_shape(samples), dtype=np.complex64)
+    np.multiply(samples, np.float32(scale),
+                out=out.view(np.float32).reshape(samples.shape))
+    return out
+
+
+def to_complex_float16(samples, out=None, scale=1.0 / FULL_SCALE):
+    """Convert interleaved int16 I/Q to complex float16.
+
+    NumPy has no complex float16 type, so the result uses
+    COMPLEX_FLOAT16_DTYPE; at 4 bytes per sample it halves the memory
+    traffic of complex64 while keeping 11 bits of mantissa. Note that
+    float16 overflows above 65504, so raw values need a scale below 2.
+
+    Parameters
+    ----------
+    samples: np.ndarray
+        interleaved int16 I/Q samples, I/Q pairs along the last axis
+    out: np.ndarray
+        contiguous COMPLEX_FLOAT16_DTYPE array of samples.size//2,
+        allocated if None
+    scale: float
+        factor applied to every value
+
+    Returns
+    -------
+    The complex float16 array, shaped as for to_complex64()
+    """
+    if out is None:
+        out = np.empty(_complex_shape(samples), dtype=COMPLEX_FLOAT16_DTYPE)
+    np.multiply(samples, np.float32(scale),
+                out=out.view(np.float16).reshape(samples.shape),
+                casting='same_kind')
+    return out
+
+
+def scale_inplace(array, scale):
+    """Scale a converted array in place, returning it.
+
+    Only floating point arrays are accepted; an integer array would
+    truncate the scale and wrap on overflow, so convert it first.
+    """
+    if array.dtype.names:
+        array = array.view(array.dtype[0])
+    if not np.issubdtype(array.dtype, np.inexact):
+        raise ValueError(f"Cannot scale {array.dtype} in place, convert it "
+                         "to a floating point format first.")
+    np.multiply(array, array.dtype.type(scale), out=array)
+    return array
+
+
+class SampleConverter:
+    """Convert blocks of int16 I/Q into a preallocated output buffer.
+
+    convert() returns a view of the internal buffer, valid until the next
+    call, so a processing loop runs without allocating. 'complex_int16'
+    returns a zero-copy view of the input instead.
+
+    Input of any shape with the I/Q pairs along the last axis is accepted,
+    including the non-contiguous (packets, 2*PACKET_SAMPLES) view returned
+    by payload_samples(); it is never copied. The output has the same
+    leading dimensions. Only 'complex_int16' needs the last axis to be
+    contiguous, as the rows of a payload batch are.
+
+    Parameters
+    ----------
+    fmt: str
+        output format, one of FORMATS
+    max_samples: int
+        largest number of complex samples converted at once
+    scale: float
+        factor applied to every value
+    """
+
+    def __init__(self, fmt='complex64', max_samples=1 << 16,
+                 scale=1.0 / FULL_SCALE):
+        if fmt not in FORMATS:
+            raise ValueError(f"fmt must be one of {FORMATS}.")
+        self.fmt = fmt
+        self.scale = scale
+        self.max_samples = max_samples
+        dtype = {'complex64': np.complex64,
+                 'complex_float16': COMPLEX_FLOAT16_DTYPE}.get(fmt)
+        self._out = None if dtype is None else \
+            np.empty(max_samples, dtype=dtype)
+
+    def convert(self, samples):
+        """Convert interleaved int16 I/Q samples.
+
+        Parameters
+        ----------
+        samples: np.ndarray
+            interleaved int16 I/Q samples, I/Q pairs along the last axis
+
+        Returns
+        -------
+        An array of complex samples in the configured format, shaped like
+        `samples` with half as many values along the last axis
+        """
+        if self.fmt == 'complex_int16':
+            if samples.strides[-1] != samples.itemsize:
+                raise ValueError("complex_int16 needs I/Q pairs that are "
+                                 "contiguous along the last axis.")
+            return as_complex_int16(samples)
+        n = samples.size // 2
+        if n > self.max_samples:
+            raise ValueError(
+                f"{n} samples exceed max_samples={self.max_samples}.")
+        out = self._out[:n]
+        if self.fmt == 'complex64':
+            to_complex64(samples, out, self.scale)
+        else:
+            to_complex_float16(samples, out, self.scale)
+        return out.reshape(_complex_shape(samples))
@@ -0,0 +1,206 @@
+import os
+import socket
+import time
+from .rx import PACKET_SAMPLES
+from .integrity import StreamIntegrity, decode_packet_index, \
+    decode_sent_counter
+
+# Memory the kernel charges against SO_RCVBUF for one jumbo frame (skb
+# truesize): the 8256 byte payload plus headers, rounded up to pages
+PACKET_TRUESIZE = 16384
+
+# Layers a lost packet can be attributed to, from the wire inwards
+LOSS_LAYERS = ('upstream', 'nic', 'socket', 'application')
+
+
+def _fileno(obj):
+    return obj if isinstance(obj, int) else obj.fileno()
+
+
+def read_sysctl(name):
+    """Return the integer value of a sysctl such as 'net.core.rmem_max'."""
+    with open('/proc/sys/' + name.replace('.', '/')) as f:
+        return int(f.read().split()[0])
+
+
+def udp_snmp() -> dict:
+    """Return the system-wide UDP counters of /proc/net/snmp
+    """
+    with open('/proc/net/snmp') as f:
+        rows = [line.split() for line in f if line.startswith('Udp:')]
+    names, values = rows[0][1:], rows[1][1:]
+    return {k: int(v) for k, v in zip(names, values)}
+
+
+def socket_counters(sock) -> dict:
+    """Return the /proc/net/udp entry of a socket
+
+    The socket is found by its inode. 'drops' counts datagrams the kernel
+    discarded because the receive buffer was full, 'rx_queue' the bytes
+    currently queued in it.
+    """
+    inode = str(os.fstat(_fileno(sock)).st_ino)
+    for path in ('/proc/net/udp', '/proc/net/udp6'):
+        try:
+            with open(path) as f:
+                next(f)
+                for line in f:
+                    cols = line.split()
+                    if cols[9] == inode:
+                        _, rx_queue = cols[4].split(':')
+                        return {"rx_queue": int(rx_queue, 16),
+                                "drops": int(cols[12])}
+        except FileNotFoundError:
+            continue
+    raise ValueError("Socket not found in /proc/net/udp.")
+
+
+def nic_counters(interface) -> dict:
+    """Return the receive drop counters of a network interface
+    """
+    base = f'/sys/class/net/{interface}/statistics/'
+    result = {}
+    for name in ('rx_packets', 'rx_dropped', 'rx_missed_errors',
+                 'rx_fifo_errors', 'rx_over_errors'):
+        with open(base + name) as f:
+            result[name] = int(f.read())
+    return result
+
+
+def preflight(sock, sample_rate, headroom_s=0.05) -> dict:
+    """Check the socket receive buffer against the needs of a stream.
+
+    The buffer must absorb the packets that arrive while the consumer is
+    not reading, `headroom_s` seconds worth at `sample_rate`. SO_RCVBUF
+    requests are capped at net.core.rmem_max, so a small rmem_max silently
+    shrinks the buffer.
+
+    Parameters
+    ----------
+    sock: socket or Receiver
+        anything with a fileno()
+    sample_rate: float
+        complex samples per second of the stream
+    headroom_s: float
+        consumer stall the buffer should absorb
+
+    Returns
+    -------
+    A dictionary with the effective and required sizes and a list of
+    warnings, empty when the configuration is sufficient
+    """
+    s = socket.socket(fileno=os.dup(_fileno(sock)))
+    try:
+        rcvbuf = s.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    finally:
+        s.close()
+    rmem_max = read_sysctl('net.core.rmem_max')
+    packet_rate = sample_rate / PACKET_SAMPLES
+    required = int(packet_rate * headroom_s * PACKET_TRUESIZE)
+    buffered_s = rcvbuf / PACKET_TRUESIZE / packet_rate if packet_rate \
+        else float('inf')
+    warnings = []
+    if rcvbuf < required:
+        warnings.append(
+            f"SO_RCVBUF is {rcvbuf} bytes ({buffered_s * 1e3:.1f} ms), "
+            f"{required} bytes are needed for {headroom_s * 1e3:.0f} ms.")
+    # The kernel doubles the requested size, so rmem_max allows 2*rmem_max
+    if 2 * rmem_max < required:
+        warnings.append(
+            f"net.core.rmem_max is {rmem_max}, raise it with "
+            f"sysctl -w net.core.rmem_max={required}.")
+    return {
+        "rcvbuf": rcvbuf,
+        "rmem_max": rmem_max,
+        "required": required,
+        "packet_rate": packet_rate,
+        "buffered_s": buffered_s,
+        "warnings": warnings,
+    }
+
+
+class LossMonitor:
+    """Attribute lost packets to the layer that dropped them.
+
+    The packet index of every packet handed to update(), sample_idx //
+    PACKET_SAMPLES from the radio header, gives the total number of
+    packets lost end-to-end. snapshot() samples the kernel
+    counters and splits that loss into:
+
+    - 'socket': drops of this socket's receive buffer, i.e. the consumer
+      did not read fast enough (from /proc/net/udp)
+    - 'nic': drops counted by the interface, if one is given
+    - 'application': packets discarded after receive, as reported through
+      `application_drops`
+    - 'upstream': the remainder, lost before reaching the host (board,
+      switch or cabling)
+
+    The system-wide RcvbufErrors counter is reported alongside; it also
+    includes other sockets, so it only bounds the socket drops.
+
+    Parameters
+    ----------
+    sock: socket or Receiver
+        receiving socket, anything with a fileno()
+    interface: str
+        network interface the stream arrives on
+    integrity: StreamIntegrity
+        accounting of the packet index, created if None
+    sent_counter: bool
+        count the sent_counter of the udp_stream_v1_0 packet generator
+        instead, for generator test streams only
+    """
+
+    def __init__(self, sock, interface=None, integrity=None,
+                 sent_counter=False):
+        self.sock = sock
+        self.interface = interface
+        self.integrity = integrity if integrity is not None \
+            else StreamIntegrity()
+        self._decode = decode_sent_counter if sent_counter \
+            else decode_packet_index
+        self.application_drops = 0
+        self._base_socket = socket_counters(sock)
+        self._base_snmp = udp_snmp()
+        self._base_nic = nic_counters(interface) if interface else None
+        self._start = time.monotonic()
+
+    def update(self, payloads):
+        """Account for a batch of received payloads in arrival order."""
+        if len(payloads):
+            self.integrity.update(self._decode(payloads))
+
+    def snapshot(self) -> dict:
+        """Return the loss of every layer since the monitor was created
+        """
+        sock = socket_counters(self.sock)
+        snmp = udp_snmp()
+        socket_drops = sock["drops"] - self._base_socket["drops"]
+        nic_drops = 0
+        if self._base_nic is not None:
+            nic = nic_counters(self.interface)
+            nic_drops = sum(nic[k] - self._base_nic[k]
+                            for k in nic if k != 'rx_packets')
+        lost = self.integrity.lost
+        attributed = socket_drops + nic_drops + self.application_drops
+        return {
+            "seconds": time.monotonic() - self._start,
+            "received": self.integrity.received,
+            "lost": lost,
+            "layers": {
+                "upstream": max(lost - attributed, 0),
+                "nic": nic_drops,
+                "socket": socket_drops,
+                "application": self.application_drops,
+            },
+            # Counted by a lower layer but not seen as a packet index gap,
+            # e.g. drops of other traffic or of packets before the first
+            "unmatched": max(attributed - lost, 0),
+            "rcvbuf_errors": snmp["RcvbufErrors"] -
+            self._base_snmp["RcvbufErrors"],
+            "udp_in_errors": snmp["InErrors"] - self._base_snmp["InErrors"],
+            "rx_queue": sock["rx_queue"],
+            "duplicates": self.integrity.duplicates,
+            "reorders": self.integrity.reorders,
+            "restarts": self.integrity.restarts,
+        }
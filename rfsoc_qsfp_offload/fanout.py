@@ -0,0 +1,293 @@
+import contextlib
+import fcntl
+import os
+import secrets
+import time
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from .reassembly import Block
+
+_MAGIC = 0x52465351464e4f55     # 'RFSQFNOU'
+
+# Control words at the start of the shared memory
+_C_MAGIC, _C_SLOTS, _C_BLOCK, _C_READERS, _C_SEQ = range(5)
+_N_CONTROL = 8
+# Columns of the reader table, a row is in use while its token is non-zero
+_R_TOKEN, _R_PID, _R_CURSOR, _R_OVERRUNS, _R_TORN, _R_BLOCKS = range(6)
+_N_READER = 6
+
+
+def _attach(name):
+    """Attach to existing shared memory without taking ownership of it.
+
+    Before Python 3.13 attaching registers the segment with the resource
+    tracker, which would unlink it when the reader process exits.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+@contextlib.contextmanager
+def _table_lock(shm):
+    """Hold an exclusive lock on the reader table of a ring.
+
+    The lock is an flock on the shared memory file itself, so it is shared
+    by every process that attached the ring and released if one dies.
+    """
+    fcntl.flock(shm._fd, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(shm._fd, fcntl.LOCK_UN)
+
+
+def _layout(n_slots, block_samples, max_readers):
+    """Return the byte offsets of the shared sections and the total size."""
+    control = 0
+    readers = control + _N_CONTROL * 8
+    meta = readers + max_readers * _N_READER * 8
+    data = meta + n_slots * 2 * 8
+    data = (data + 63) // 64 * 64
+    size = data + n_slots * block_samples * 4
+    return readers, meta, data, size
+
+
+class _Shared:
+    """NumPy views of the shared ring sections."""
+
+    def __init__(self, shm, n_slots, block_samples, max_readers):
+        readers, meta, data, _ = _layout(n_slots, block_samples, max_readers)
+        self.shm = shm
+        self.control = np.ndarray((_N_CONTROL,), dtype=np.int64,
+                                  buffer=shm.buf)
+        self.readers = np.ndarray((max_readers, _N_READER), dtype=np.int64,
+                                  buffer=shm.buf, offset=readers)
+        # Per slot: write sequence number and sample index
+        self.meta = np.ndarray((n_slots, 2), dtype=np.int64, buffer=shm.buf,
+                               offset=meta)
+        self.data = np.ndarray((n_slots, 2 * block_samples), dtype=np.int16,
+                               buffer=shm.buf, offset=data)
+
+    def release(self):
+        self.control = self.readers = self.meta = self.data = None
+        self.shm.close()
+
+
+class FanoutWriter:
+    """Single producer side of a shared-memory sample block ring.
+
+    Blocks of interleaved int16 I/Q samples are copied once into a ring
+    held in multiprocessing.shared_memory. Any number of FanoutReader
+    instances, in this or other processes, attach to the ring by name and
+    read the blocks in place with their own cursor. The writer never waits
+    for readers; a reader that falls behind detects the overrun itself.
+
+    Parameters
+    ----------
+    n_slots: int
+        number of blocks held by the ring
+    block_samples: int
+        complex samples per block
+    max_readers: int
+        size of the reader table used for monitoring
+    name: str
+        name of the shared memory, generated if None
+    """
+
+    def __init__(self, n_slots=64, block_samples=65536, max_readers=16,
+                 name=None):
+        _, _, _, size = _layout(n_slots, block_samples, max_readers)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = shm.name
+        self.n_slots = n_slots
+        self.block_samples = block_samples
+        self._shared = _Shared(shm, n_slots, block_samples, max_readers)
+        ctl = self._shared.control
+        ctl[:] = 0
+        self._shared.readers[:] = 0
+        self._shared.meta[:] = -1
+        ctl[_C_SLOTS] = n_slots
+        ctl[_C_BLOCK] = block_samples
+        ctl[_C_READERS] = max_readers
+        ctl[_C_MAGIC] = _MAGIC
+
+    @property
+    def seq(self):
+        """Number of blocks written so far."""
+        return int(self._shared.control[_C_SEQ])
+
+    def write(self, samples, sample_idx=0):
+        """Publish one block of interleaved int16 I/Q samples.
+
+        Parameters
+        ----------
+        samples: np.ndarray
+            2*block_samples int16 values
+        sample_idx: int
+            sample index of the first sample in the block
+        """
+        sh = self._shared
+        seq = int(sh.control[_C_SEQ])
+        slot = seq % self.n_slots
+        # Invalidate the slot while it is being rewritten
+        sh.meta[slot, 0] = -1
+        sh.data[slot] = samples
+        sh.meta[slot, 1] = sample_idx
+        sh.meta[slot, 0] = seq
+        sh.control[_C_SEQ] = seq + 1
+
+    def write_block(self, block):
+        """Publish a Block from the Reassembler."""
+        self.write(block.samples, block.sample_idx)
+
+    def readers(self) -> dict:
+        """Return the state of the attached readers, keyed by reader token
+        """
+        seq = self.seq
+        table = self._shared.readers
+        return {int(r[_R_TOKEN]): {"pid": int(r[_R_PID]),
+                                   "lag_blocks": seq - int(r[_R_CURSOR]),
+                                   "overruns": int(r[_R_OVERRUNS]),
+                                   "torn": int(r[_R_TORN]),
+                                   "blocks": int(r[_R_BLOCKS])}
+                for r in table if r[_R_TOKEN]}
+
+    def close(self):
+        shm = self._shared.shm
+        self._shared.release()
+        shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FanoutReader:
+    """Reader side of a FanoutWriter ring.
+
+    Each reader keeps its own cursor. read() returns the next block as a
+    zero-copy view of the shared ring, which stays valid until the next
+    call to read(). Blocks the writer overwrote before they were read are
+    counted as overruns and skipped; a returned block that was overwritten
+    while still in use is counted as torn.
+    Readers can attach and detach at any time. Each one holds a row of the
+    reader table under a random `token`, so several readers of one
+    process are told apart.
+
+    Parameters
+    ----------
+    name: str
+        name of the writer's shared memory
+    start: str
+        'latest' to start at the next block written, 'oldest' to start at
+        the oldest block still held by the ring
+    """
+
+    def __init__(self, name, start='latest'):
+        shm = _attach(name)
+        ctl = np.ndarray((_N_CONTROL,), dtype=np.int64, buffer=shm.buf)
+        if ctl[_C_MAGIC] != _MAGIC:
+            del ctl
+            shm.close()
+            raise ValueError(f"{name} is not a fanout ring.")
+        self.n_slots = int(ctl[_C_SLOTS])
+        self.block_samples = int(ctl[_C_BLOCK])
+        max_readers = int(ctl[_C_READERS])
+        del ctl
+        self._shared = _Shared(shm, self.n_slots, self.block_samples,
+                               max_readers)
+        seq = int(self._shared.control[_C_SEQ])
+        self.cursor = seq if start == 'latest' else \
+            max(0, seq - self.n_slots + 1)
+        self.overruns = 0
+        self.torn = 0
+        self.blocks = 0
+        self._held = None
+        self.token = secrets.randbits(62) + 1
+        self._entry = self._register()
+
+    def _register(self):
+        """Claim a row of the reader table, if one is free."""
+        table = self._shared.readers
+        with _table_lock(self._shared.shm):
+            free = np.flatnonzero(table[:, _R_TOKEN] == 0)
+            if len(free) == 0:
+                return None
+            entry = table[free[0]]
+            entry[:] = 0
+            entry[_R_PID] = os.getpid()
+            entry[_R_TOKEN] = self.token
+        return entry
+
+    def _publish(self):
+        if self._entry is not None:
+            self._entry[_R_CURSOR] = self.cursor
+            self._entry[_R_OVERRUNS] = self.overruns
+            self._entry[_R_TORN] = self.torn
+            self._entry[_R_BLOCKS] = self.blocks
+
+    def _check_held(self):
+        """Count the previous block as torn if it was overwritten."""
+        if self._held is not None:
+            slot, seq = self._held
+            if self._shared.meta[slot, 0] != seq:
+                self.torn += 1
+            self._held = None
+
+    def read(self, timeout=None, poll_interval=0.0005):
+        """Return the next block, or None if the timeout expired.
+
+        Returns
+        -------
+        A Block whose samples are a view of the shared ring
+        """
+        self._check_held()
+        sh = self._shared
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            seq = int(sh.control[_C_SEQ])
+            # The oldest readable block; the slot after it may be rewritten
+            oldest = seq - self.n_slots + 1
+            if self.cursor < oldest:
+                self.overruns += oldest - self.cursor
+                self.cursor = oldest
+            if self.cursor < seq:
+                slot = self.cursor % self.n_slots
+                if sh.meta[slot, 0] == self.cursor:
+                    break
+                self.overruns += 1
+                self.cursor += 1
+                continue
+            if deadline is not None and time.monotonic() >= deadline:
+                self._publish()
+                return None
+            time.sleep(poll_interval)
+        blk = Block(int(sh.meta[slot, 1]), sh.data[slot], None, [])
+        self._held = (slot, self.cursor)
+        self.cursor += 1
+        self.blocks += 1
+        self._publish()
+        return blk
+
+    def detach(self):
+        """Release the reader table entry and the shared memory.
+        """
+        self._check_held()
+        if self._entry is not None:
+            with _table_lock(self._shared.shm):
+                if self._entry[_R_TOKEN] == self.token:
+                    self._entry[_R_TOKEN] = 0
+            self._entry = None
+        self._shared.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.detach()
@@ -0,0 +1,209 @@
+import time
+import numpy as np
+from .rx import PACKET_SAMPLES
+from .reassembly import decode_headers
+
+
+def decode_packet_index(payloads):
+    """Decode the packet sequence number of adc_to_udp_stream packets.
+
+    The stream carries no packet counter; the sample_idx of the radio
+    header advances by PACKET_SAMPLES per packet, so sample_idx //
+    PACKET_SAMPLES serves as one. This is the decoder to use for the
+    ADC streams of the board.
+
+    Parameters
+    ----------
+    payloads: np.ndarray
+        (n, PAYLOAD_BYTES) uint8 array of UDP payloads
+
+    Returns
+    -------
+    A (n,) int64 array with the sequence number of every packet
+    """
+    return decode_headers(payloads)['sample_idx'].astype(np.int64) // \
+        PACKET_SAMPLES
+
+
+def decode_sent_counter(payloads):
+    """Decode the 32-bit sent_counter from payload words 0 and 1.
+
+    Only the udp_stream_v1_0 packet generator sends this counter. In
+    adc_to_udp_stream packets these words hold the low bytes of the
+    radio header's sample_idx; use decode_packet_index() for those.
+
+    Parameters
+    ----------
+    payloads: np.ndarray
+        (n, PAYLOAD_BYTES) uint8 array of UDP payloads
+
+    Returns
+    -------
+    A (n,) uint32 array with the counter of every packet
+    """
+    return np.ascontiguousarray(payloads[:, :4]).view('<u4').ravel()
+
+
+class StreamIntegrity:
+    """Packet loss, duplicate and reorder accounting for a packet counter.
+
+    Counters are unwrapped into 64-bit sequence numbers, so wraps of the
+    32-bit hardware counter are handled transparently. Sequence numbers
+    that were skipped are counted as lost; if one of them arrives later
+    (within `window` packets of the newest sequence) it is counted as a
+    reorder and removed from the lost count. Any other packet that is not
+    newer than the newest seen is a duplicate. A jump back by more than
+    `window` packets, or forward by more than `max_gap`, is treated as a
+    restart of the stream (e.g. after a CTRL reset) and resynchronises the
+    accounting.
+
+    Parameters
+    ----------
+    window: int
+        number of sequence numbers behind the newest that are tracked for
+        late arrival
+    max_gap: int
+        forward jumps larger than this are treated as a restart rather
+        than as loss
+    counter_bits: int
+        width of the hardware counter
+    """
+
+    def __init__(self, window=4096, max_gap=1 << 24, counter_bits=32):
+        self.window = window
+        self.max_gap = max_gap
+        self.counter_bits = counter_bits
+        self._mask = (1 << counter_bits) - 1
+        self._half = 1 << (counter_bits - 1)
+        self._last_raw = None
+        self._last_seq = 0
+        self.highest = -1
+        self._missing = np.empty(0, dtype=np.int64)
+        self.received = 0
+        self.lost = 0
+        self.duplicates = 0
+        self.reorders = 0
+        self.wraps = 0
+        self.restarts = 0
+        self._snap_time = time.monotonic()
+        self._snap = self._counters()
+
+    def _unwrap(self, raw):
+        """Convert raw counters into 64-bit sequence numbers."""
+        raw = raw.astype(np.int64) & self._mask
+        if self._last_raw is None:
+            self._last_raw = int(raw[0])
+            self._last_seq = int(raw[0])
+            self.highest = self._last_seq - 1
+        diff = np.diff(raw, prepend=self._last_raw)
+        # Signed difference modulo the counter width
+        diff = ((diff + self._half) & self._mask) - self._half
+        seq = self._last_seq + np.cumsum(diff)
+        self._last_raw = int(raw[-1])
+        self._last_seq = int(seq[-1])
+        return seq
+
+    def update(self, counters):
+        """Account for a batch of packet counters in arrival order.
+
+        Parameters
+        ----------
+        counters: np.ndarray
+            (n,) array of packet counters, e.g. from
+            decode_packet_index()
+        """
+        if len(counters) == 0:
+            return
+        seq = self._unwrap(np.asarray(counters))
+        # Split the batch where the stream restarted (rare)
+        while len(seq):
+            running = np.maximum.accumulate(
+                np.concatenate(([self.highest], seq)))[:-1]
+            jump = (seq < running - self.window) | \
+                (seq > running + self.max_gap)
+            r = int(np.argmax(jump)) if jump.any() else len(seq)
+            self._update(seq[:r])
+            if r == len(seq):
+                break
+            self._resync(int(seq[r]))
+            seq = seq[r:]
+
+    def _resync(self, seq):
+        self.restarts += 1
+        self.highest = seq - 1
+        self._missing = np.empty(0, dtype=np.int64)
+
+    def _update(self, seq):
+        if len(seq) == 0:
+            return
+        highest = self.highest
+        prev_max = np.maximum.accumulate(np.concatenate(([highest], seq)))[:-1]
+        _, first = np.unique(seq, return_index=True)
+        is_first = np.zeros(len(seq), dtype=bool)
+        is_first[first] = True
+
+        # Packets behind the newest at the time they arrived
+        late = seq <= prev_max
+        old = late & (seq <= highest)
+        recovered = np.isin(seq, self._missing) & old & is_first
+        in_batch_late = late & ~old & is_first & (seq != prev_max)
+
+        n_new = int(np.count_nonzero(~late))
+        n_recovered = int(np.count_nonzero(recovered))
+        n_reorder = n_recovered + int(np.count_nonzero(in_batch_late))
+        n_dup = len(seq) - n_new - n_reorder
+
+        # Sequence numbers skipped by this batch
+        new_highest = max(highest, int(seq.max()))
+        newer = np.unique(seq[seq > highest])
+        gap = (new_highest - highest) - len(newer)
+
+        lo = max(highest + 1, new_highest - self.window + 1)
+        missing = self._missing[~np.isin(self._missing, seq[recovered])]
+        missing = missing[missing > new_highest - self.window]
+        if gap:
+            span = np.arange(lo, new_highest + 1, dtype=np.int64)
+            missing = np.concatenate(
+                (missing, span[~np.isin(span, newer)]))
+        self._missing = missing
+
+        self.wraps += (new_highest >> self.counter_bits) - \
+            (max(highest, 0) >> self.counter_bits)
+        self.highest = new_highest
+        self.received += len(seq)
+        self.lost += gap - n_recovered
+        self.duplicates += n_dup
+        self.reorders += n_reorder
+
+    def _counters(self):
+        return {
+            "received": self.received,
+            "lost": self.lost,
+            "duplicates": self.duplicates,
+            "reorders": self.reorders,
+            "wraps": self.wraps,
+            "restarts": self.restarts,
+        }
+
+    def snapshot(self) -> dict:
+        """Return cumulative counters and rates since the last snapshot
+
+        Returns
+        -------
+        A dictionary with the cumulative counters, an 'interval' entry
+        with per-second rates over the time since the previous call and
+        the loss ratio over that interval
+        """
+        now = time.monotonic()
+        dt = now - self._snap_time
+        counters = self._counters()
+        delta = {k: counters[k] - self._snap[k] for k in counters}
+        expected = delta["received"] - delta["duplicates"] + delta["lost"]
+        interval = {k + "_per_s": (v / dt if dt > 0 else 0.0)
+                    for k, v in delta.items()}
+        interval["seconds"] = dt
+        interval["loss_ratio"] = delta["lost"] / expected if expected else 0.0
+        self._snap_time = now
+        self._snap = counters
+        counters["interval"] = interval
+        return counters
@@ -0,0 +1,154 @@
+import numpy as np
+from scipy import fft as sp_fft
+from .spectrum import SampleBuffer, fft_plan
+
+
+def sk_limits(m, sigma=3.0):
+    """Symmetric detection limits around 1 for M accumulated spectra.
+
+    Uses the variance of the spectral kurtosis of Gaussian noise,
+    4 M^2 / ((M - 1)(M + 2)(M + 3)).
+    """
+    std = np.sqrt(4.0 * m * m / ((m - 1) * (m + 2) * (m + 3)))
+    return 1.0 - sigma * std, 1.0 + sigma * std
+
+
+def unpack_mask(mask, fft_size):
+    """Expand a packed flag mask to one bool per bin."""
+    return np.unpackbits(mask, count=fft_size).astype(bool)
+
+
+class SpectralKurtosis:
+    """Streaming spectral-kurtosis RFI detector.
+
+    Samples are cut into non-overlapping segments of `fft_size`,
+    transformed in batches with one FFT call each, and the power P of
+    every bin is accumulated as S1 = sum(P) and S2 = sum(P^2). After
+    `m` segments the generalized spectral kurtosis
+
+        SK = (m + 1) / (m - 1) * (m * S2 / S1^2 - 1)
+
+    is formed per bin; Gaussian noise gives SK = 1, while pulsed or
+    constant-envelope interference moves it above or below. Bins outside
+    [lower, upper] are flagged. The flags of each window are packed into
+    fft_size/8 bytes, DC in the middle as in SpectrumEngine, and returned
+    with the sample index of the first sample of the window; unpack_mask()
+    expands them. A jump in the sample index restarts the window.
+
+    Parameters
+    ----------
+    fft_size: int
+        samples per FFT, a multiple of 8
+    m: int
+        segments per SK estimate
+    sigma: float
+        limits at sigma standard deviations of Gaussian SK
+    limits: tuple
+        (lower, upper) limits, overrides `sigma`
+    window: str
+        scipy.signal window name
+    sinks: list
+        objects with write(mask, sample_idx) receiving every mask
+    batch: int
+        segments transformed per FFT call
+    """
+
+    def __init__(self, fft_size=256, m=512, sigma=3.0, limits=None,
+                 window='boxcar', sinks=(), batch=256):
+        if fft_size % 8:
+            raise ValueError("fft_size must be a multiple of 8.")
+        if m < 2:
+            raise ValueError("m must be at least 2.")
+        self.fft_size = fft_size
+        self.m = m
+        self.lower, self.upper = sk_limits(m, sigma) if limits is None \
+            else limits
+        self.window, _ = fft_plan(fft_size, window)
+        self.sinks = list(sinks)
+        self.batch = batch
+        self._scratch = np.empty((batch, fft_size), dtype=np.complex64)
+        self._power = np.empty((batch, fft_size), dtype=np.float32)
+        self._work = SampleBuffer(fft_size)
+        self._s1 = np.zeros(fft_size, dtype=np.float64)
+        self._s2 = np.zeros(fft_size, dtype=np.float64)
+        self._count = 0
+        self._window_idx = None
+        self.sk = np.ones(fft_size, dtype=np.float32)
+        self.windows = 0
+        self.flagged = 0
+        self.flag_counts = np.zeros(fft_size, dtype=np.int64)
+
+    def push(self, samples, sample_idx=None):
+        """Add samples and return the masks of the windows they completed.
+
+        Parameters
+        ----------
+        samples: np.ndarray
+            interleaved int16 I/Q or complex64 samples
+        sample_idx: int
+            sample index of the first sample, None if contiguous
+
+        Returns
+        -------
+        A list of (sample_idx, mask) tuples, mask packed uint8
+        """
+        if not self._work.append(samples, sample_idx):
+            self._count = 0
+            self._s1[:] = 0
+            self._s2[:] = 0
+        return self._process()
+
+    def _process(self):
+        masks = []
+        fs = self.fft_size
+        work = self._work
+        segs = work.fill // fs
+        done = 0
+        while done < segs:
+            if self._count == 0:
+                self._window_idx = work.idx + done * fs
+            k = min(segs - done, self.batch, self.m - self._count)
+            x = self._scratch[:k]
+            np.multiply(work.data[done * fs:(done + k) * fs].reshape(k, fs),
+                        self.window, out=x)
+            x = sp_fft.fft(x, axis=1, overwrite_x=True)
+            f = x.view(np.float32).reshape(k, fs, 2)
+            p = np.einsum('ijk,ijk->ij', f, f, out=self._power[:k])
+            self._s1 += p.sum(axis=0)
+            self._s2 += np.einsum('ij,ij->j', p, p)
+            self._count += k
+            done += k
+            if self._count == self.m:
+                masks.append((self._window_idx, self._estimate()))
+                for sink in self.sinks:
+                    sink.write(masks[-1][1], self._window_idx)
+        # Keep the incomplete segment for the next block
+        work.consume(segs * fs)
+        return masks
+
+    def _estimate(self):
+        m = self.m
+        s1 = np.maximum(self._s1, 1e-30)
+        sk = (m + 1) / (m - 1) * (m * self._s2 / (s1 * s1) - 1)
+        self.sk = np.fft.fftshift(sk).astype(np.float32)
+        flags = (self.sk < self.lower) | (self.sk > self.upper)
+        self.flag_counts += flags
+        self.flagged += int(flags.sum())
+        self.windows += 1
+        self._s1[:] = 0
+        self._s2[:] = 0
+        self._count = 0
+        return np.packbits(flags)
+
+    def stats(self) -> dict:
+        """Return a dictionary with the detector counters
+        """
+        bins = self.windows * self.fft_size
+        return {
+            "windows": self.windows,
+            "flagged_bins": self.flagged,
+            "flagged_fraction": self.flagged / bins if bins else 0.0,
+            "lower": self.lower,
+            "upper": self.upper,
+            "pending_segments": self._count,
+        }
@@ -0,0 +1,160 @@
+import numpy as np
+from .convert import FULL_SCALE
+
+
+class _ChannelLevels:
+    __slots__ = ('total', 'interval', 'interval_samples', 'interval_idx',
+                 'blocks', 'max_block_rms', 'last')
+
+    def __init__(self, n_bins):
+        self.total = np.zeros((2, n_bins), dtype=np.int64)
+        self.interval = np.zeros((2, n_bins), dtype=np.int64)
+        self.interval_samples = 0
+        self.interval_idx = None
+        self.blocks = 0
+        self.max_block_rms = -np.inf
+        self.last = None
+
+
+class LevelMonitor:
+    """ADC level, clipping and histogram monitor of int16 I/Q streams.
+
+    Every block is reduced to one histogram of the ADC codes per I and Q
+    component with np.bincount; RMS, DC offset, peak and the counts at
+    and near full scale all follow from the histogram, so the samples are
+    read only once. Histograms are kept per channel, both for the current
+    interval and since the start.
+
+    Once a channel has received `interval_s` seconds of samples, a summary
+    of the interval is passed to `callback` and returned by update().
+    Levels are relative to FULL_SCALE, the range of the MSB-aligned
+    `bits`-bit codes produced by convert_to_int16; a sample is clipped
+    when I or Q is at the lowest or highest code. Summaries hold only
+    plain ints and floats, the DC offset as dc_i and dc_q, so they can be
+    written as JSON.
+
+    Parameters
+    ----------
+    sample_rate: float
+        complex samples per second of every channel
+    interval_s: float
+        stream time between summaries
+    bits: int
+        ADC resolution
+    near_dbfs: float
+        level above which a component counts as near full scale
+    callback: callable
+        called with every summary
+    """
+
+    def __init__(self, sample_rate, interval_s=1.0, bits=14, near_dbfs=-1.0,
+                 callback=None):
+        self.sample_rate = sample_rate
+        self.interval_s = interval_s
+        self.interval_samples = max(1, int(round(sample_rate * interval_s)))
+        self.bits = bits
+        self.near_dbfs = near_dbfs
+        self.callback = callback
+        self._n_bins = 1 << bits
+        # Normalised value of the lowest int16 code in every bin
+        self.levels = (np.arange(self._n_bins) - self._n_bins // 2) * \
+            ((1 << (16 - bits)) / FULL_SCALE)
+        self._levels2 = self.levels ** 2
+        self._near = np.abs(self.levels) >= 10 ** (near_dbfs / 20)
+        self._codes = np.empty(0, dtype=np.uint16)
+        self._channels = {}
+
+    def _histogram(self, samples):
+        """Per-component code histograms of a block, lowest code first."""
+        # Flipping the sign bit maps int16 to unsigned in signed order
+        codes = np.bitwise_xor(samples.view(np.uint16), 0x8000,
+                               out=self._codes[:len(samples)])
+        codes >>= 16 - self.bits
+        return np.stack([np.bincount(codes[c::2], minlength=self._n_bins)
+                         for c in range(2)])
+
+    def _levels(self, hist):
+        n = int(hist[0].sum())
+        if n == 0:
+            return {"samples": 0}
+        s1 = hist @ self.levels
+        s2 = hist @ self._levels2
+        power = (s2[0] + s2[1]) / n
+        used = np.flatnonzero(hist.sum(axis=0))
+        peak = max(abs(self.levels[used[0]]), abs(self.levels[used[-1]]))
+        clipped = int(hist[:, 0].sum() + hist[:, -1].sum())
+        return {
+            "samples": n,
+            "rms_dbfs": float(10 * np.log10(power + 1e-30)),
+            "dc_i": float(s1[0] / n),
+            "dc_q": float(s1[1] / n),
+            "peak_dbfs": float(20 * np.log10(peak + 1e-30)),
+            "clipped": clipped,
+            "near_full_scale": int(hist[:, self._near].sum()),
+            "clip_fraction": clipped / (2 * n),
+        }
+
+    def update(self, samples, sample_idx=None, channel='A'):
+        """Add a block of samples of one channel.
+
+        Parameters
+        ----------
+        samples: np.ndarray
+            interleaved int16 I/Q samples
+        sample_idx: int
+            sample index of the first sample
+        channel: str
+            name of the channel
+
+        Returns
+        -------
+        The summary of the interval the block completed, or None
+        """
+        ch = self._channels.get(channel)
+        if ch is None:
+            ch = self._channels[channel] = _ChannelLevels(self._n_bins)
+        if len(self._codes) < len(samples):
+            self._codes = np.empty(len(samples), dtype=np.uint16)
+        hist = self._histogram(samples)
+        ch.last = self._levels(hist)
+        ch.last["sample_idx"] = sample_idx
+        ch.total += hist
+        ch.interval += hist
+        if ch.interval_idx is None:
+            ch.interval_idx = sample_idx
+        ch.interval_samples += len(samples) // 2
+        ch.blocks += 1
+        if ch.last["samples"]:
+            ch.max_block_rms = max(ch.max_block_rms, ch.last["rms_dbfs"])
+        if ch.interval_samples < self.interval_samples:
+            return None
+        summary = self._levels(ch.interval)
+        summary.update(channel=channel, sample_idx=ch.interval_idx,
+                       blocks=ch.blocks, max_block_rms_dbfs=ch.max_block_rms)
+        ch.interval[:] = 0
+        ch.interval_samples = 0
+        ch.interval_idx = None
+        ch.blocks = 0
+        ch.max_block_rms = -np.inf
+        if self.callback is not None:
+            self.callback(summary)
+        return summary
+
+    def last_block(self, channel='A'):
+        """Levels of the newest block of a channel."""
+        return self._channels[channel].last
+
+    def histogram(self, channel='A', interval=False):
+        """Return the (2, 2**bits) I and Q code histograms of a channel.
+
+        Bin k counts the samples at code k - 2**(bits-1); `levels` holds
+        the normalised value of every bin.
+        """
+        ch = self._channels[channel]
+        return ch.interval if interval else ch.total
+
+    def stats(self) -> dict:
+        """Return a dictionary with the levels of every channel since start
+        """
+        return {name: self._levels(ch.total)
+                for name, ch in self._channels.items()}
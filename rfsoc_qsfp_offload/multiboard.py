@@ -0,0 +1,318 @@
+import ipaddress
+import select
+import numpy as np
+from .rx import Receiver, UDP_PORT, PACKET_SAMPLES
+from .integrity import StreamIntegrity
+from .reassembly import Reassembler, decode_headers
+
+
+def _source_key(spec):
+    """Return (addr, port) for an 'ip' or (ip, port) source, port 0 = any."""
+    if isinstance(spec, str):
+        ip, port = spec, 0
+    else:
+        ip, port = spec
+    return int(ipaddress.IPv4Address(ip)), int(port)
+
+
+class AlignedBlock:
+    """Time-aligned blocks of several sources covering the same samples.
+
+    Attributes
+    ----------
+    sample_idx: int
+        sample index of the first sample in the block
+    samples: np.ndarray
+        (n_sources, 2*block_samples) interleaved int16 I/Q samples, zero
+        where packets or whole sources were missing
+    valid: np.ndarray
+        (n_sources, block_packets) bool, False where zero-filled
+    names: list
+        source name of every row
+    tags: dict
+        (sample_idx, key, value) tag list of every source name
+    """
+
+    __slots__ = ('sample_idx', 'samples', 'valid', 'names', 'tags')
+
+    def __init__(self, sample_idx, samples, valid, names, tags):
+        self.sample_idx = sample_idx
+        self.samples = samples
+        self.valid = valid
+        self.names = names
+        self.tags = tags
+
+    def __len__(self):
+        return self.samples.shape[1] // 2
+
+    def source(self, name):
+        """Return the interleaved samples of one source."""
+        return self.samples[self.names.index(name)]
+
+
+class _Source:
+    """Reassembly and loss accounting of one board/channel stream."""
+
+    def __init__(self, name, block_packets, lag_blocks):
+        self.name = name
+        self.reassembler = Reassembler(block_packets, lag_blocks, align=True)
+        self.integrity = StreamIntegrity()
+        self.newest = None
+        self.rate = None
+        self.late_blocks = 0
+
+
+class MultiBoardReceiver:
+    """Merge the streams of several boards into time-aligned blocks.
+
+    Packets from all boards arrive on one or more receivers and are
+    demultiplexed by their source address: every board channel sends from
+    its own (ip, port) socket. Each source is reassembled on the absolute
+    sample index grid, so with PPS-synchronised boards the blocks of all
+    sources line up and are emitted together as one AlignedBlock.
+
+    A block is emitted as soon as every source delivered it, or once the
+    newest source is `max_lag_blocks` blocks ahead; sources missing by then
+    are zero-filled and marked invalid, and their block is counted as late
+    when it shows up. stats() reports the loss of every source and how far
+    each lags behind the newest one.
+
+    Emitted blocks stay valid until the next call to recv().
+
+    Parameters
+    ----------
+    sources: dict or list
+        source addresses, either 'ip' (any port) or (ip, port), optionally
+        mapped to a name
+    ports: list
+        local UDP ports to receive on, ignored when `receivers` is given
+    host: str
+        local address to bind to
+    block_samples: int
+        samples per block, a multiple of the packet size
+    lag_blocks: int
+        number of blocks each source waits for reordered packets
+    max_lag_blocks: int
+        number of blocks to wait for a lagging source
+    receivers: list
+        receivers created with sources=True to read from instead
+    """
+
+    def __init__(self, sources, ports=(UDP_PORT,), host='0.0.0.0',
+                 block_samples=32 * PACKET_SAMPLES, lag_blocks=2,
+                 max_lag_blocks=8, receivers=None, **rx_kwargs):
+        if block_samples % PACKET_SAMPLES:
+            raise ValueError(
+                f"block_samples must be a multiple of {PACKET_SAMPLES}.")
+        if not isinstance(sources, dict):
+            sources = {s: s if isinstance(s, str) else f'{s[0]}:{s[1]}'
+                       for s in sources}
+        if not sources:
+            raise ValueError("At least one source is required.")
+        self.names = list(sources.values())
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("Source names must be unique.")
+        self._exact = {}
+        self._any = {}
+        for i, spec in enumerate(sources):
+            addr, port = _source_key(spec)
+            if port:
+                self._exact[(addr, port)] = i
+            else:
+                self._any[addr] = i
+        if receivers is None:
+            receivers = [Receiver(port=p, host=host, sources=True,
+                                  **rx_kwargs) for p in ports]
+            self._owns_receivers = True
+        else:
+            if not all(rx.record_sources for rx in receivers):
+                raise ValueError("Receivers must record source addresses.")
+            self._owns_receivers = False
+        self.receivers = list(receivers)
+        self._by_fd = {rx.fileno(): rx for rx in self.receivers}
+        self._poll = select.poll()
+        for fd in self._by_fd:
+            self._poll.register(fd, select.POLLIN)
+        self.block_samples = block_samples
+        self.block_packets = block_samples // PACKET_SAMPLES
+        self.max_lag_blocks = max_lag_blocks
+        self._sources = [_Source(name, self.block_packets, lag_blocks)
+                         for name in self.names]
+        self._lookup = {}       # Cache of (addr << 16 | port) -> index
+        self._pending = {}      # sample_idx -> (AlignedBlock, present)
+        self._pool = []
+        self._returned = []
+        self._emitted = []
+        self._emitted_until = None
+        self._newest_block = None
+        self.unknown_packets = 0
+        self.blocks = 0
+        self.incomplete_blocks = 0
+
+    def _source_index(self, key):
+        if key not in self._lookup:
+            addr, port = key >> 16, key & 0xffff
+            self._lookup[key] = self._exact.get((addr, port),
+                                                self._any.get(addr))
+        return self._lookup[key]
+
+    def recv(self, timeout=None):
+        """Receive pending packets and return the blocks they completed.
+
+        Parameters
+        ----------
+        timeout: float
+            seconds to wait for packets, None blocks forever
+
+        Returns
+        -------
+        A list of AlignedBlock objects in sample order
+        """
+        self._pool.extend(self._returned)
+        self._returned = self._emitted = []
+        wait_ms = None if timeout is None else int(timeout * 1000)
+        for fd, _ in self._poll.poll(wait_ms):
+            rx = self._by_fd[fd]
+            payloads = rx.recv(timeout=0)
+            if len(payloads):
+                self._demux(payloads, rx.last_sources)
+        self._emit_ready()
+        self._returned = list(self._emitted)
+        return self._emitted
+
+    def _demux(self, payloads, src):
+        keys = (src['addr'].astype(np.int64) << 16) | src['port']
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        for u, key in enumerate(uniq):
+            i = self._source_index(int(key))
+            sel = payloads if len(uniq) == 1 else \
+                payloads[inverse.reshape(-1) == u]
+            if i is None:
+                self.unknown_packets += len(sel)
+                continue
+            s = self._sources[i]
+            hdr = decode_headers(sel)
+            sidx = hdr['sample_idx']
+            s.integrity.update(sidx // PACKET_SAMPLES)
+            newest = int(sidx.max())
+            s.newest = newest if s.newest is None else max(s.newest, newest)
+            s.rate = float(hdr['sample_rate_numerator'][-1] /
+                           max(int(hdr['sample_rate_denominator'][-1]), 1))
+            for blk in s.reassembler.push(sel):
+                self._add(i, blk)
+
+    def _add(self, i, blk):
+        start = blk.sample_idx
+        if self._emitted_until is not None and start < self._emitted_until:
+            if any(key == 'rx_resync' for _, key, _ in blk.tags):
+                # The board restarted on an earlier timeline, start over
+                self._emit_all()
+                self._emitted_until = self._newest_block = start
+            else:
+                self._sources[i].late_blocks += 1
+                return
+        if start not in self._pending:
+            n = len(self._sources)
+            frame = self._pool.pop() if self._pool else AlignedBlock(
+                0, np.zeros((n, 2 * self.block_samples), dtype=np.int16),
+                np.zeros((n, self.block_packets), dtype=bool), self.names,
+                None)
+            frame.sample_idx = start
+            frame.tags = {}
+            self._pending[start] = (frame, np.zeros(n, dtype=bool))
+        frame, present = self._pending[start]
+        frame.samples[i] = blk.samples
+        frame.valid[i] = blk.valid
+        frame.tags[self.names[i]] = blk.tags
+        present[i] = True
+        if self._newest_block is None or start > self._newest_block:
+            self._newest_block = start
+
+    def _emit_ready(self):
+        horizon = self.max_lag_blocks * self.block_samples
+        while self._pending:
+            start = min(self._pending)
+            _, present = self._pending[start]
+            if not present.all() and self._newest_block - start < horizon:
+                break
+            self._emit(start)
+
+    def _emit_all(self):
+        while self._pending:
+            self._emit(min(self._pending))
+
+    def _emit(self, start):
+        frame, present = self._pending.pop(start)
+        missing = ~present
+        if missing.any():
+            frame.samples[missing] = 0
+            frame.valid[missing] = False
+            for i in np.flatnonzero(missing):
+                frame.tags[self.names[i]] = []
+            self.incomplete_blocks += 1
+        self.blocks += 1
+        self._emitted.append(frame)
+        self._emitted_until = start + self.block_samples
+
+    def flush(self):
+        """Emit all pending blocks, zero-filling anything still missing.
+        """
+        self._pool.extend(self._returned)
+        self._returned = self._emitted = []
+        for i, s in enumerate(self._sources):
+            for blk in s.reassembler.flush():
+                self._add(i, blk)
+        self._emit_all()
+        self._returned = list(self._emitted)
+        return self._emitted
+
+    def stats(self) -> dict:
+        """Return per-source loss and lag, and aggregate counters
+
+        'lag_samples' is how far the newest packet of a source is behind
+        the newest packet of any source; 'lag_s' converts it with the
+        source's sample rate.
+        """
+        known = [s.newest for s in self._sources if s.newest is not None]
+        newest = max(known) if known else None
+        result = {}
+        for s in self._sources:
+            r = s.reassembler
+            lag = None if s.newest is None else newest - s.newest
+            result[s.name] = {
+                "packets": s.integrity.received,
+                "lost": s.integrity.lost,
+                "duplicates": s.integrity.duplicates,
+                "reorders": s.integrity.reorders,
+                "gap_packets": r.gap_packets,
+                "late_packets": r.late,
+                "late_blocks": s.late_blocks,
+                "resyncs": r.resyncs,
+                "newest_sample_idx": s.newest,
+                "lag_samples": lag,
+                "lag_s": lag / s.rate if lag is not None and s.rate else None,
+            }
+        result["total"] = {
+            "packets": sum(result[n]["packets"] for n in self.names),
+            "lost": sum(result[n]["lost"] for n in self.names),
+            "unknown_packets": self.unknown_packets,
+            "blocks": self.blocks,
+            "incomplete_blocks": self.incomplete_blocks,
+            "pending_blocks": len(self._pending),
+            "receivers": [rx.stats() for rx in self.receivers],
+        }
+        return result
+
+    def close(self):
+        for fd in self._by_fd:
+            self._poll.unregister(fd)
+        self._by_fd = {}
+        if self._owns_receivers:
+            for rx in self.receivers:
+                rx.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,239 @@
+import multiprocessing as mp
+import os
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from .rx import Receiver, PacketRing, UDP_PORT, PAYLOAD_BYTES, PACKET_SAMPLES
+from .integrity import StreamIntegrity
+from .reassembly import decode_headers
+
+ALL_CHANNELS = ['A', 'B', 'C', 'D']
+
+# Destination port of each adc_to_udp_stream channel in block_design.tcl
+CHANNEL_PORTS = {'A': 60134, 'B': 60133, 'C': 60132, 'D': 60131}
+
+# Columns of the shared per-worker statistics array
+_HEAD, _BYTES, _SIZE_ERRORS, _CALLS, _LOST, _DUPLICATES, _REORDERS, \
+    _CPU_NS, _WALL_NS, _READY = range(10)
+_N_STATS = 10
+
+
+def _worker(index, port, host, reuseport, cpu, slots, batch, rcvbuf,
+            ring_name, stats_name, n_workers, stop):
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+    ring_shm = shared_memory.SharedMemory(name=ring_name)
+    stats_shm = shared_memory.SharedMemory(name=stats_name)
+    try:
+        stats = np.ndarray((n_workers, _N_STATS), dtype=np.int64,
+                           buffer=stats_shm.buf)[index]
+        ring = PacketRing(slots, buffer=ring_shm.buf)
+        integrity = StreamIntegrity()
+        t0 = time.monotonic_ns()
+        with Receiver(port=port, host=host, batch=batch, rcvbuf=rcvbuf,
+                      reuseport=reuseport, ring=ring) as rx:
+            stats[_READY] = 1
+            while not stop.is_set():
+                payloads = rx.recv(timeout=0.1)
+                if len(payloads):
+                    sidx = decode_headers(payloads)['sample_idx']
+                    integrity.update(sidx // PACKET_SAMPLES)
+                    stats[_BYTES] = rx.bytes
+                    stats[_SIZE_ERRORS] = rx.size_errors
+                    stats[_CALLS] = rx.calls
+                    stats[_LOST] = integrity.lost
+                    stats[_DUPLICATES] = integrity.duplicates
+                    stats[_REORDERS] = integrity.reorders
+                    # Publish the head last, once the slots are complete
+                    stats[_HEAD] = ring.head
+                stats[_CPU_NS] = time.process_time_ns()
+                stats[_WALL_NS] = time.monotonic_ns() - t0
+        del stats, ring
+    finally:
+        ring_shm.close()
+        stats_shm.close()
+
+
+class MultiChannelReceiver:
+    """Receive several channels in parallel, one worker process each.
+
+    Every worker owns a socket and receives with recvmmsg() directly into
+    a packet ring held in shared memory, so the parent reads the packets
+    without any pickling or copying. Every worker listens on the port its
+    channel is sent to. With SO_REUSEPORT a single channel can instead be
+    received on a shared port; the headers carry no channel field, so
+    several channels on one port could not be told apart and are refused.
+
+    Parameters
+    ----------
+    channels: list
+        names of the channels/workers to start
+    ports: dict
+        UDP port per channel, defaults to CHANNEL_PORTS
+    port: int
+        the shared port when `reuseport` is set
+    host: str
+        local address to bind to
+    reuseport: bool
+        bind every worker to `port` with SO_REUSEPORT
+    cpus: dict
+        CPU to pin each channel's worker to
+    slots: int
+        packet slots in each channel's ring
+    batch: int
+        maximum number of packets read per system call
+    rcvbuf: int
+        requested socket receive buffer size in bytes
+    """
+
+    def __init__(self, channels=ALL_CHANNELS, ports=None, port=UDP_PORT,
+                 host='0.0.0.0', reuseport=False, cpus=None, slots=8192,
+                 batch=256, rcvbuf=64 * 1024 * 1024):
+        self.channels = list(channels)
+        if reuseport and len(self.channels) > 1:
+            raise ValueError(
+                "reuseport shares one port, so it takes a single channel.")
+        if ports is None:
+            ports = {ch: port for ch in self.channels} if reuseport \
+                else dict(CHANNEL_PORTS)
+        missing = [ch for ch in self.channels if ch not in ports]
+        if missing:
+            raise ValueError(f"No UDP port for channels {missing}.")
+        self.ports = ports
+        self.host = host
+        self.reuseport = reuseport
+        self.cpus = cpus or {}
+        self.slots = slots
+        self.batch = batch
+        self.rcvbuf = rcvbuf
+        n = len(self.channels)
+        self._ring_shm = [shared_memory.SharedMemory(
+            create=True, size=slots * PAYLOAD_BYTES) for _ in range(n)]
+        self._stats_shm = shared_memory.SharedMemory(
+            create=True, size=n * _N_STATS * 8)
+        self._stats = np.ndarray((n, _N_STATS), dtype=np.int64,
+                                 buffer=self._stats_shm.buf)
+        self._stats[:] = 0
+        self.rings = {ch: np.ndarray((slots, PAYLOAD_BYTES), dtype=np.uint8,
+                                     buffer=shm.buf)
+                      for ch, shm in zip(self.channels, self._ring_shm)}
+        self._tail = dict.fromkeys(self.channels, 0)
+        self.overruns = dict.fromkeys(self.channels, 0)
+        self._last = None
+        self._ctx = mp.get_context('spawn')
+        self._stop = self._ctx.Event()
+        self._procs = []
+
+    def start(self, timeout=10.0):
+        """Start the worker processes and wait until they are listening.
+        """
+        n = len(self.channels)
+        for i, ch in enumerate(self.channels):
+            p = self._ctx.Process(
+                target=_worker, name=f'rx_{ch}', daemon=True,
+                args=(i, self.ports[ch], self.host, self.reuseport,
+                      self.cpus.get(ch), self.slots, self.batch, self.rcvbuf,
+                      self._ring_shm[i].name, self._stats_shm.name, n,
+                      self._stop))
+            p.start()
+            self._procs.append(p)
+        deadline = time.monotonic() + timeout
+        while not self._stats[:, _READY].all():
+            if time.monotonic() > deadline or \
+                    not all(p.is_alive() for p in self._procs):
+                self.stop()
+                raise RuntimeError("Receiver workers failed to start.")
+            time.sleep(0.01)
+        self._last = (time.monotonic(), self._stats.copy())
+
+    def read(self, channel, max_packets=None):
+        """Return the packets received on a channel since the last read.
+
+        The result is a zero-copy view of the channel's shared ring and
+        is limited to the slots up to the end of the ring, so call again
+        to get the rest. If the consumer fell too far behind, the oldest
+        packets are skipped and counted as overruns.
+
+        Returns
+        -------
+        A (n, PAYLOAD_BYTES) uint8 view of the shared ring
+        """
+        i = self.channels.index(channel)
+        head = int(self._stats[i, _HEAD])
+        tail = self._tail[channel]
+        # Keep clear of the batch the worker may be writing into
+        limit = self.slots - self.batch
+        if head - tail > limit:
+            self.overruns[channel] += head - tail - limit
+            tail = head - limit
+        start = tail % self.slots
+        n = min(head - tail, self.slots - start)
+        if max_packets is not None:
+            n = min(n, max_packets)
+        self._tail[channel] = tail + n
+        return self.rings[channel][start:start + n]
+
+    def stats(self) -> dict:
+        """Return per-channel and aggregate receive statistics
+
+        Rates and CPU utilisation are computed over the time since the
+        previous call. A worker with a utilisation close to 1.0 is the
+        one saturating its core.
+        """
+        now = time.monotonic()
+        cur = self._stats.copy()
+        t_prev, prev = self._last if self._last else (now, cur)
+        dt = now - t_prev
+        d = cur - prev
+        result = {}
+        for i, ch in enumerate(self.channels):
+            wall = d[i, _WALL_NS]
+            result[ch] = {
+                "port": self.ports[ch],
+                "cpu": self.cpus.get(ch),
+                "packets": int(cur[i, _HEAD]),
+                "bytes": int(cur[i, _BYTES]),
+                "size_errors": int(cur[i, _SIZE_ERRORS]),
+                "lost": int(cur[i, _LOST]),
+                "duplicates": int(cur[i, _DUPLICATES]),
+                "reorders": int(cur[i, _REORDERS]),
+                "overruns": self.overruns[ch],
+                "packets_per_s": float(d[i, _HEAD] / dt) if dt > 0 else 0.0,
+                "mbps": float(d[i, _BYTES] * 8e-6 / dt) if dt > 0 else 0.0,
+                "packets_per_call": (float(d[i, _HEAD] / d[i, _CALLS])
+                                     if d[i, _CALLS] else 0.0),
+                "utilisation": float(d[i, _CPU_NS] / wall) if wall else 0.0,
+            }
+        result["total"] = {
+            key: sum(result[ch][key] for ch in self.channels)
+            for key in ("packets", "bytes", "lost", "overruns",
+                        "packets_per_s", "mbps")
+        }
+        self._last = (now, cur)
+        return result
+
+    def stop(self):
+        """Stop the workers and release the shared memory.
+        """
+        self._stop.set()
+        for p in self._procs:
+            p.join(timeout=2.0)
+            if p.is_alive():
+                p.terminate()
+        self._procs = []
+
+    def close(self):
+        self.stop()
+        self.rings = {}
+        self._stats = None
+        for shm in self._ring_shm + [self._stats_shm]:
+            shm.close()
+            shm.unlink()
+        self._ring_shm = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
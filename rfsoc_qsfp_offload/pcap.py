@@ -0,0 +1,339 @@
+import ipaddress
+import mmap
+import struct
+import numpy as np
+from .rx import UDP_PORT, PAYLOAD_BYTES, FRAME_HEADER_BYTES
+from .integrity import decode_packet_index, decode_sent_counter
+from .reassembly import decode_headers
+
+FRAME_BYTES = FRAME_HEADER_BYTES + PAYLOAD_BYTES
+LINKTYPE_ETHERNET = 1
+
+_PCAP_MAGIC_US = 0xa1b2c3d4
+_PCAP_MAGIC_NS = 0xa1b23c4d
+_PCAPNG_SHB = 0x0a0d0d0a
+_PCAPNG_IDB = 1
+_PCAPNG_EPB = 6
+_PCAPNG_BYTE_ORDER = 0x1a2b3c4d
+_IF_TSRESOL = 9
+
+# pcap record header followed by the frame headers of udp_stream_v1_0.v
+_RECORD_DTYPE = np.dtype([
+    ('ts_sec', '<u4'),
+    ('ts_frac', '<u4'),
+    ('incl_len', '<u4'),
+    ('orig_len', '<u4'),
+])
+
+# Start of a pcapng enhanced packet block
+_EPB_DTYPE = np.dtype([
+    ('type', '<u4'),
+    ('len', '<u4'),
+    ('iface', '<u4'),
+    ('ts_hi', '<u4'),
+    ('ts_lo', '<u4'),
+    ('cap_len', '<u4'),
+    ('orig_len', '<u4'),
+])
+
+# Records checked at once while scanning a run of stream frames
+_MIN_WINDOW = 16
+_MAX_WINDOW = 1 << 16
+
+
+def _leading(mask):
+    """Number of leading True values of a mask."""
+    m = int(np.argmin(mask)) if len(mask) else 0
+    return len(mask) if m == 0 and len(mask) and mask[0] else m
+
+
+def _concat(arrays):
+    return np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.int64)
+
+
+def frame_header(src=('192.168.4.99', UDP_PORT),
+                 dst=('192.168.4.1', UDP_PORT),
+                 src_mac='00:1a:2b:3c:4d:5e', dst_mac='ff:ff:ff:ff:ff:ff'):
+    """Build the 42-byte Ethernet/IPv4/UDP header udp_stream_v1_0.v sends.
+
+    Returns
+    -------
+    A (FRAME_HEADER_BYTES,) uint8 array
+    """
+    ip = struct.pack('>BBHHHBBH4s4s', 0x45, 0, 20 + 8 + PAYLOAD_BYTES, 1,
+                     0x4000, 255, 17, 0,
+                     ipaddress.IPv4Address(src[0]).packed,
+                     ipaddress.IPv4Address(dst[0]).packed)
+    words = sum(struct.unpack('>10H', ip))
+    words = (words & 0xffff) + (words >> 16)
+    ip = ip[:10] + struct.pack('>H', ~words & 0xffff) + ip[12:]
+    udp = struct.pack('>HHHH', src[1], dst[1], 8 + PAYLOAD_BYTES, 0)
+    eth = bytes.fromhex(dst_mac.replace(':', '')) + \
+        bytes.fromhex(src_mac.replace(':', '')) + b'\x08\x00'
+    return np.frombuffer(eth + ip + udp, dtype=np.uint8).copy()
+
+
+class PcapCapture:
+    """adc_to_udp_stream packets of a pcap or pcapng file.
+
+    The file is memory-mapped. When every record is a stream frame, as
+    with a capture filtered on the stream port, `payloads` is a single
+    strided view of the file; otherwise the matching frames are located
+    in one pass over the record headers, checking runs of stream records
+    as strided arrays, and copied run by run into one array.
+
+    Attributes
+    ----------
+    payloads: np.ndarray
+        (n, PAYLOAD_BYTES) uint8 UDP payloads
+    frames: np.ndarray
+        (n, FRAME_HEADER_BYTES) uint8 Ethernet/IP/UDP headers
+    timestamps_ns: np.ndarray
+        (n,) int64 capture times in ns since the epoch
+
+    Parameters
+    ----------
+    path: str
+        pcap or pcapng file
+    port: int
+        UDP destination port of the stream, None for any
+    """
+
+    def __init__(self, path, port=UDP_PORT):
+        self.path = path
+        self.port = port
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = np.frombuffer(self._map, dtype=np.uint8)
+        magic = struct.unpack_from('<I', self._map)[0]
+        if magic == _PCAPNG_SHB:
+            offsets, ts = self._scan_pcapng()
+        elif magic in (_PCAP_MAGIC_US, _PCAP_MAGIC_NS):
+            offsets, ts = self._scan_pcap(magic == _PCAP_MAGIC_NS)
+        else:
+            raise ValueError(f"{path} is not a little-endian pcap file.")
+        keep = self._matching(offsets)
+        if not keep.all():
+            offsets, ts = offsets[keep], ts[keep]
+        self.timestamps_ns = ts
+        self.frames, self.payloads = self._frames(offsets)
+
+    def _records(self, pos, stride, dtype, window):
+        """Record headers of `stride` bytes from pos, at most `window`."""
+        k = min(window, (len(self._map) - pos) // stride)
+        return np.ndarray((k,), dtype=dtype, buffer=self._map, offset=pos,
+                          strides=(stride,))
+
+    def _scan_pcap(self, nanoseconds):
+        linktype = struct.unpack_from('<I', self._map, 20)[0]
+        if linktype != LINKTYPE_ETHERNET:
+            raise ValueError("Only Ethernet captures are supported.")
+        size = len(self._map)
+        hdr = _RECORD_DTYPE.itemsize
+        stride = hdr + FRAME_BYTES
+        offsets, recs = [], []
+        pos = 24
+        window = _MIN_WINDOW
+        while pos + hdr <= size:
+            # Runs of stream frames are checked as strided record arrays,
+            # only the records in between are stepped through one by one
+            rec = self._records(pos, stride, _RECORD_DTYPE, window)
+            m = _leading(rec['incl_len'] == FRAME_BYTES)
+            if m:
+                offsets.append(pos + hdr + np.arange(m, dtype=np.int64) *
+                               stride)
+                recs.append(rec[:m])
+                pos += m * stride
+            if m == window:
+                window = min(2 * window, _MAX_WINDOW)
+                continue
+            window = _MIN_WINDOW
+            if pos + hdr > size:
+                break
+            incl = struct.unpack_from('<I', self._map, pos + 8)[0]
+            pos += hdr + incl
+        rec = np.concatenate(recs) if recs else \
+            np.zeros(0, dtype=_RECORD_DTYPE)
+        return _concat(offsets), self._ns(rec, nanoseconds)
+
+    @staticmethod
+    def _ns(rec, nanoseconds):
+        scale = 1 if nanoseconds else 1000
+        return rec['ts_sec'].astype(np.int64) * 1_000_000_000 + \
+            rec['ts_frac'].astype(np.int64) * scale
+
+    def _scan_pcapng(self):
+        size = len(self._map)
+        offsets, ts = [], []
+        resol = {}
+        pos = 0
+        window = _MIN_WINDOW
+        while pos + 12 <= size:
+            btype, blen = struct.unpack_from('<2I', self._map, pos)
+            if blen < 12 or pos + blen > size:
+                break
+            if btype == _PCAPNG_SHB:
+                order = struct.unpack_from('<I', self._map, pos + 8)[0]
+                if order != _PCAPNG_BYTE_ORDER:
+                    raise ValueError(
+                        "Only little-endian pcapng is supported.")
+                resol = {}
+            elif btype == _PCAPNG_IDB:
+                linktype = struct.unpack_from('<H', self._map, pos + 8)[0]
+                if linktype != LINKTYPE_ETHERNET:
+                    raise ValueError("Only Ethernet captures are supported.")
+                resol[len(resol)] = self._tsresol(pos + 16, pos + blen - 4)
+            elif btype == _PCAPNG_EPB and \
+                    struct.unpack_from('<I', self._map, pos + 20)[0] == \
+                    FRAME_BYTES:
+                # A run of stream frame blocks of the same length
+                blk = self._records(pos, blen, _EPB_DTYPE, window)
+                m = _leading((blk['type'] == _PCAPNG_EPB) &
+                             (blk['len'] == blen) &
+                             (blk['cap_len'] == FRAME_BYTES))
+                blk = blk[:m]
+                offsets.append(pos + 28 + np.arange(m, dtype=np.int64) * blen)
+                iface = blk['iface']
+                res = np.full(m, 10 ** 6, dtype=np.int64)
+                known = iface < len(resol)
+                res[known] = np.array([resol[i] for i in range(len(resol))],
+                                      dtype=np.int64)[iface[known]]
+                units = (blk['ts_hi'].astype(np.int64) << 32) | blk['ts_lo']
+                ts.append(units // res * 1_000_000_000 +
+                          units % res * 1_000_000_000 // res)
+                pos += m * blen
+                window = min(2 * window, _MAX_WINDOW) if m == window \
+                    else _MIN_WINDOW
+                continue
+            pos += blen
+        return _concat(offsets), _concat(ts)
+
+    def _tsresol(self, pos, end):
+        """Ticks per second from the options of an interface block."""
+        while pos + 4 <= end:
+            code, length = struct.unpack_from('<2H', self._map, pos)
+            if code == 0:
+                break
+            if code == _IF_TSRESOL:
+                v = self._map[pos + 4]
+                return 2 ** (v & 0x7f) if v & 0x80 else 10 ** v
+            pos += 4 + (length + 3) // 4 * 4
+        return 10 ** 6
+
+    def _frames(self, offsets):
+        """Frame headers and payloads at the offsets of the stream frames.
+
+        Frames at a constant distance are a strided view of the file. With
+        other records in between, every run of constant distance is copied
+        as a strided view into one preallocated array.
+        """
+        n = len(offsets)
+        if n == 0:
+            empty = np.zeros((0, FRAME_BYTES), dtype=np.uint8)
+            return empty[:, :FRAME_HEADER_BYTES], empty[:, FRAME_HEADER_BYTES:]
+        d = np.diff(offsets)
+        # Indices into d where the distance changes
+        changes = np.flatnonzero(d[1:] != d[:-1]) + 1
+        if len(changes) == 0:
+            frames = self._view(offsets, 0, n, d)
+        else:
+            frames = np.empty((n, FRAME_BYTES), dtype=np.uint8)
+            start = 0
+            while start < n:
+                i = np.searchsorted(changes, start, side='right')
+                stop = int(changes[i]) + 1 if i < len(changes) else n
+                frames[start:stop] = self._view(offsets, start, stop, d)
+                start = stop
+        return frames[:, :FRAME_HEADER_BYTES], frames[:, FRAME_HEADER_BYTES:]
+
+    def _view(self, offsets, start, stop, d):
+        """Strided view of the frames start..stop at a constant distance."""
+        stride = int(d[start]) if stop - start > 1 else FRAME_BYTES
+        return np.ndarray((stop - start, FRAME_BYTES), dtype=np.uint8,
+                          buffer=self._map, offset=int(offsets[start]),
+                          strides=(stride, 1))
+
+    def _matching(self, offsets):
+        """Mask of the frames at offsets that are IPv4/UDP to the port."""
+        def byte(i):
+            return self._buf[offsets + i]
+        keep = (byte(12) == 0x08) & (byte(13) == 0x00) & \
+            (byte(23) == 17) & (byte(14) == 0x45)
+        if self.port is not None:
+            keep &= (byte(36) == self.port >> 8) & \
+                (byte(37) == self.port & 0xff)
+        return keep
+
+    def __len__(self):
+        return len(self.payloads)
+
+    @property
+    def packet_index(self):
+        """The packet sequence number of every packet, sample_idx //
+        PACKET_SAMPLES from the radio header."""
+        return decode_packet_index(self.payloads)
+
+    @property
+    def sent_counter(self):
+        """The sent_counter of every packet of the udp_stream_v1_0 test
+        generator; ADC packets have no such field, use packet_index."""
+        return decode_sent_counter(self.payloads)
+
+    @property
+    def headers(self):
+        """The radio header of every packet, see RADIO_HEADER_DTYPE."""
+        return decode_headers(self.payloads)
+
+    def close(self):
+        self.frames = self.payloads = self._buf = None
+        try:
+            self._map.close()
+        except BufferError:
+            # Views are still held by the caller, unmapped once released
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_pcap(path, payloads, timestamps_ns=None, header=None,
+               chunk=4096):
+    """Write payloads as a nanosecond pcap file of stream frames.
+
+    Parameters
+    ----------
+    path: str
+        output file
+    payloads: np.ndarray
+        (n, PAYLOAD_BYTES) uint8 UDP payloads
+    timestamps_ns: np.ndarray
+        capture time of every packet in ns, zero if None
+    header: np.ndarray
+        42-byte frame header, frame_header() if None
+    chunk: int
+        packets assembled per write
+    """
+    header = frame_header() if header is None else header
+    n = len(payloads)
+    ts = np.zeros(n, dtype=np.int64) if timestamps_ns is None \
+        else np.asarray(timestamps_ns, dtype=np.int64)
+    rec_bytes = _RECORD_DTYPE.itemsize
+    buf = np.zeros((min(chunk, max(n, 1)), rec_bytes + FRAME_BYTES),
+                   dtype=np.uint8)
+    rec = buf[:, :rec_bytes].view(_RECORD_DTYPE)[:, 0]
+    buf[:, rec_bytes:rec_bytes + FRAME_HEADER_BYTES] = header
+    rec['incl_len'] = rec['orig_len'] = FRAME_BYTES
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<IHHiIII', _PCAP_MAGIC_NS, 2, 4, 0, 0,
+                            65535, LINKTYPE_ETHERNET))
+        for start in range(0, n, len(buf)):
+            m = min(len(buf), n - start)
+            t = ts[start:start + m]
+            rec['ts_sec'][:m] = t // 1_000_000_000
+            rec['ts_frac'][:m] = t % 1_000_000_000
+            buf[:m, rec_bytes + FRAME_HEADER_BYTES:] = \
+                payloads[start:start + m]
+            f.write(buf[:m])
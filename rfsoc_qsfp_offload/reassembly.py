@@ -0,0 +1,310 @@
+import numpy as np
+from .rx import RADIO_HEADER_BYTES, PACKET_SAMPLES, payload_samples
+
+# RfPktHeader as written by adc_to_udp_stream_v1_0.v (packed, little endian)
+RADIO_HEADER_DTYPE = np.dtype([
+    ('sample_idx', '<u8'),
+    ('sample_rate_numerator', '<u8'),
+    ('sample_rate_denominator', '<u8'),
+    ('frequency_idx', '<u4'),           # kHz, see FREQUENCY_IDX
+    ('num_subchannels', '<u4'),
+    ('pkt_samples', '<u4'),
+    ('bits_per_int', '<u2'),
+    ('is_complex', 'u1'),
+    ('samples_per_adc_clock', 'u1'),
+    ('first_sample_adc_clock', '<u8'),
+    ('pps_adc_clock', '<u8'),
+    ('reserved4', '<u8'),
+])
+assert RADIO_HEADER_DTYPE.itemsize == RADIO_HEADER_BYTES
+
+
+def decode_headers(payloads):
+    """Decode the radio header of a batch of payloads.
+
+    Parameters
+    ----------
+    payloads: np.ndarray
+        (n, PAYLOAD_BYTES) uint8 array of UDP payloads
+
+    Returns
+    -------
+    A (n,) zero-copy view of the headers with dtype RADIO_HEADER_DTYPE
+    """
+    return payloads[:, :RADIO_HEADER_BYTES].view(RADIO_HEADER_DTYPE)[:, 0]
+
+
+class Block:
+    """A contiguous, sample-indexed block of reassembled samples.
+
+    Attributes
+    ----------
+    sample_idx: int
+        sample index of the first sample in the block
+    samples: np.ndarray
+        interleaved int16 I/Q samples, zero where packets were missing
+    valid: np.ndarray
+        bool per packet slot, False where the slot was zero-filled
+    tags: list
+        (sample_idx, key, value) tuples for metadata changes in the block
+    """
+
+    __slots__ = ('sample_idx', 'samples', 'valid', 'tags', '_slot')
+
+    def __init__(self, sample_idx, samples, valid, tags, slot=None):
+        self.sample_idx = sample_idx
+        self.samples = samples
+        self.valid = valid
+        self.tags = tags
+        self._slot = slot
+
+    def __len__(self):
+        return len(self.samples) // 2
+
+
+class Reassembler:
+    """Place packets into sample-indexed blocks with zero-filled gaps.
+
+    The packet position is taken from the sample_idx header field, so
+    reordered packets land in the right place and missing packets leave
+    zeros. A block is emitted once packets `lag_blocks` blocks newer have
+    arrived; packets for blocks that were already emitted are counted as
+    late and dropped. Changes of frequency_idx or sample rate produce
+    'rx_freq' (Hz) and 'rx_rate' (S/s) tags, and a discontinuity in the
+    sample index larger than `max_gap` samples resynchronises the stream
+    with an 'rx_resync' tag. So does a jump back in arrival order by more
+    than the reorder window of lag_blocks + 1 blocks, e.g. a restarted
+    stream; it is found before the batch is sorted, so packets of the old
+    and the new stream are never mixed.
+
+    With `align` set, blocks start on a grid of absolute sample indices
+    (multiples of `block_packets` packets) rather than at the first packet
+    received, so streams that share a sample index timeline produce blocks
+    with matching sample_idx.
+
+    Emitted blocks are views into an internal buffer and stay valid until
+    the next call to push().
+
+    Parameters
+    ----------
+    block_packets: int
+        number of packets per emitted block
+    lag_blocks: int
+        number of blocks to wait for late packets
+    max_gap: int
+        largest gap in samples that is zero-filled instead of resynced
+    align: bool
+        start blocks on the absolute sample index grid
+    """
+
+    def __init__(self, block_packets=64, lag_blocks=2, max_gap=1 << 24,
+                 align=False):
+        self.block_packets = block_packets
+        self.align = align
+        self.block_samples = block_packets * PACKET_SAMPLES
+        self.lag_blocks = lag_blocks
+        self.max_gap = max_gap
+        self.n_slots = 2 * lag_blocks + 1
+        self.window = (lag_blocks + 1) * self.block_samples
+        self._buf = np.zeros(
+            (self.n_slots, block_packets, 2 * PACKET_SAMPLES), dtype=np.int16)
+        self._filled = np.zeros((self.n_slots, block_packets), dtype=bool)
+        self._origin = None     # sample_idx of packet index 0
+        self._next_block = 0    # Oldest block not yet emitted
+        self._newest = -1       # Newest packet index placed
+        self._freq = None
+        self._rate = None
+        self._tags = []
+        self._emitted = []
+        self.packets = 0
+        self.late = 0
+        self.duplicates = 0
+        self.gap_packets = 0
+        self.resyncs = 0
+
+    def push(self, payloads):
+        """Place a batch of payloads and return the blocks completed by it.
+
+        Parameters
+        ----------
+        payloads: np.ndarray
+            (n, PAYLOAD_BYTES) uint8 array of UDP payloads
+
+        Returns
+        -------
+        A list of Block objects in sample order
+        """
+        self._emitted = []
+        if len(payloads) == 0:
+            return self._emitted
+        hdr = decode_headers(payloads)
+        sidx = hdr['sample_idx'].astype(np.int64)
+        arrival = np.arange(len(sidx))
+        while True:
+            r = self._restart(sidx)
+            self._push_sorted(payloads, hdr, arrival[:r], sidx[:r])
+            if r == len(sidx):
+                break
+            self._resync(int(sidx[r]))
+            arrival, sidx = arrival[r:], sidx[r:]
+        return self._emitted
+
+    def _restart(self, sidx):
+        """Index of the first packet, in arrival order, more than the
+        reorder window behind the newest one before it, len(sidx) if none.
+        """
+        base = sidx[0] if self._newest < 0 else \
+            self._origin + self._newest * PACKET_SAMPLES
+        newest = np.maximum.accumulate(sidx)
+        prior = np.maximum(np.concatenate(([base], newest[:-1])), base)
+        back = sidx < prior - self.window
+        return int(np.argmax(back)) if back.any() else len(sidx)
+
+    def _push_sorted(self, payloads, hdr, arrival, sidx):
+        if len(arrival) == 0:
+            return
+        by_idx = np.argsort(sidx, kind='stable')
+        order, sidx = arrival[by_idx], sidx[by_idx]
+        if self._origin is None:
+            self._origin = self._origin_for(int(sidx[0]))
+
+        while len(order):
+            rel = sidx - self._origin
+            pkt = rel // PACKET_SAMPLES
+            # Packets are sorted, so only steps between neighbours matter
+            prev = np.concatenate(([max(self._newest, pkt[0])], pkt[:-1]))
+            max_step = self.max_gap // PACKET_SAMPLES
+            bad = (rel % PACKET_SAMPLES != 0) | (pkt - prev > max_step) | \
+                (pkt < self._next_block * self.block_packets - max_step)
+            r = int(np.argmax(bad)) if bad.any() else len(order)
+            self._tag_changes(hdr[order[:r]], sidx[:r])
+            self._place(payloads, order[:r], pkt[:r])
+            if r == len(order):
+                break
+            self._resync(int(sidx[r]))
+            order, sidx = order[r:], sidx[r:]
+
+    def _origin_for(self, sample_idx):
+        if not self.align:
+            return sample_idx
+        pkt = sample_idx // PACKET_SAMPLES
+        return sample_idx - (pkt % self.block_packets) * PACKET_SAMPLES
+
+    def _tag_changes(self, hdr, sidx):
+        if len(hdr) == 0:
+            return
+        freq = hdr['frequency_idx'].astype(np.int64)
+        num = hdr['sample_rate_numerator']
+        den = np.maximum(hdr['sample_rate_denominator'], 1)
+        rate = num / den
+        for key, vals, scale, last in (('rx_freq', freq, 1e3, self._freq),
+                                       ('rx_rate', rate, 1.0, self._rate)):
+            prev = np.concatenate(([vals[0] if last is None else last],
+                                   vals[:-1]))
+            change = np.flatnonzero(vals != prev)
+            if last is None:
+                change = np.concatenate(([0], change))
+            self._tags.extend((int(sidx[i]), key, float(vals[i]) * scale)
+                              for i in change)
+        self._freq = freq[-1]
+        self._rate = rate[-1]
+        self._tags.sort(key=lambda t: t[0])
+
+    def _resync(self, sample_idx):
+        self._flush()
+        self.resyncs += 1
+        self._origin = self._origin_for(sample_idx)
+        self._next_block = 0
+        self._newest = -1
+        self._freq = None
+        self._rate = None
+        self._tags = [(sample_idx, 'rx_resync', True)]
+
+    def _place(self, payloads, order, pkt):
+        if len(order) == 0:
+            return
+        bp = self.block_packets
+        first = self._next_block * bp
+        late = pkt < first
+        self.late += int(np.count_nonzero(late))
+        order, pkt = order[~late], pkt[~late]
+        self.packets += len(order)
+        # Place in chunks that fit in the slots not held by pending blocks
+        while len(order):
+            limit = (self._next_block + self.n_slots) * bp
+            r = int(np.searchsorted(pkt, limit))
+            if r:
+                self._scatter(payloads, order[:r], pkt[:r])
+            order, pkt = order[r:], pkt[r:]
+            self._advance()
+            if len(order):
+                # Make room for the remaining packets
+                self._emit_until(pkt[0] // bp - self.n_slots + 1)
+
+    def _scatter(self, payloads, order, pkt):
+        bp = self.block_packets
+        slot = (pkt // bp) % self.n_slots
+        pos = pkt % bp
+        self._protect(np.unique(slot))
+        filled = self._filled[slot, pos]
+        dup = filled | np.concatenate(([False], pkt[1:] == pkt[:-1]))
+        self.duplicates += int(np.count_nonzero(dup))
+        self._buf[slot, pos] = payload_samples(payloads)[order]
+        self._filled[slot, pos] = True
+        self._newest = max(self._newest, int(pkt[-1]))
+
+    def _protect(self, slots):
+        """Copy emitted blocks whose slot is about to be reused."""
+        for blk in self._emitted:
+            if blk._slot is not None and blk._slot in slots:
+                blk.samples = blk.samples.copy()
+                blk._slot = None
+
+    def _advance(self):
+        newest_block = self._newest // self.block_packets
+        self._emit_until(newest_block - self.lag_blocks + 1)
+
+    def _emit_until(self, block):
+        while self._next_block < block:
+            self._emit(self._next_block)
+            self._next_block += 1
+
+    def _flush(self):
+        if self._newest >= 0:
+            self._emit_until(self._newest // self.block_packets + 1)
+
+    def _emit(self, block):
+        slot = block % self.n_slots
+        self._protect((slot,))
+        filled = self._filled[slot]
+        missing = ~filled
+        if missing.any():
+            self._buf[slot][missing] = 0
+            self.gap_packets += int(np.count_nonzero(missing))
+        start = self._origin + block * self.block_samples
+        stop = start + self.block_samples
+        n = 0
+        while n < len(self._tags) and self._tags[n][0] < stop:
+            n += 1
+        tags, self._tags = self._tags[:n], self._tags[n:]
+        self._emitted.append(Block(start, self._buf[slot].reshape(-1),
+                                   filled.copy(), tags, slot))
+        filled[:] = False
+
+    def flush(self):
+        """Emit all pending blocks, zero-filling anything still missing.
+        """
+        self._emitted = []
+        self._flush()
+        return self._emitted
+
+    def stats(self) -> dict:
+        """Return a dictionary with the reassembly counters
+        """
+        return {
+            "packets": self.packets,
+            "late": self.late,
+            "duplicates": self.duplicates,
+            "gap_packets": self.gap_packets,
+            "resyncs": self.resyncs,
+        }
@@ -0,0 +1,316 @@
+import datetime
+import fcntl
+import json
+import mmap
+import os
+import queue
+import threading
+import time
+import numpy as np
+
+SIGMF_VERSION = '1.0.0'
+BYTES_PER_SAMPLE = 4        # ci16_le
+
+
+def _aligned_buffer(nbytes):
+    """Return a page-aligned uint8 array, as O_DIRECT requires."""
+    return np.frombuffer(mmap.mmap(-1, nbytes), dtype=np.uint8)
+
+
+def _datetime(seconds):
+    dt = datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc)
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+class SigMFRecorder:
+    """Record int16 I/Q samples to SigMF files from a writer thread.
+
+    Samples are copied into large page-aligned buffers which a dedicated
+    thread writes out with one system call each, optionally with O_DIRECT
+    to bypass the page cache. Recordings are split into files of at most
+    `max_bytes` bytes or `max_seconds` seconds, named
+    <name>_<n>.sigmf-data with a matching .sigmf-meta, and the files are
+    spread round-robin over `dirs` to stripe the load across disks.
+
+    A new SigMF capture segment starts whenever the sample index jumps or
+    the frequency changes. When `sample_idx_offset` is non-zero (capture
+    started on a PPS with SAMPLE_IDX_OFFSET set to the samples since the
+    Unix epoch), sample indices are absolute and every capture gets a
+    core:datetime.
+
+    If the disks cannot keep up, write() blocks until a buffer is free;
+    the time spent waiting is reported as stalls.
+
+    Parameters
+    ----------
+    name: str
+        base name of the recording files
+    sample_rate: float
+        complex samples per second, f_s
+    center_freq: float
+        RF center frequency in Hz, f_c_hz
+    dirs: list
+        directories the files are written to, round-robin
+    sample_idx_offset: int
+        SAMPLE_IDX_OFFSET the capture was started with
+    max_bytes: int
+        largest size of one data file
+    max_seconds: float
+        largest duration of one data file, None for no limit
+    write_bytes: int
+        size of each write, a multiple of the page size
+    n_buffers: int
+        number of write buffers
+    direct: bool
+        open the data files with O_DIRECT
+    metadata: dict
+        extra global fields for the .sigmf-meta files
+    """
+
+    def __init__(self, name, sample_rate, center_freq, dirs=('.',),
+                 sample_idx_offset=0, max_bytes=1 << 32, max_seconds=None,
+                 write_bytes=1 << 24, n_buffers=8, direct=False,
+                 metadata=None):
+        if write_bytes % mmap.PAGESIZE:
+            raise ValueError(
+                f"write_bytes must be a multiple of {mmap.PAGESIZE}.")
+        self.name = name
+        self.sample_rate = sample_rate
+        self.center_freq = center_freq
+        self.dirs = list(dirs)
+        self.sample_idx_offset = sample_idx_offset
+        self.direct = direct
+        self.metadata = metadata or {}
+        limit = max_bytes
+        if max_seconds is not None:
+            limit = min(limit, int(max_seconds * sample_rate) *
+                        BYTES_PER_SAMPLE)
+        self.file_bytes = limit // BYTES_PER_SAMPLE * BYTES_PER_SAMPLE
+        if self.file_bytes <= 0:
+            raise ValueError("File size limit is smaller than one sample.")
+        self.write_bytes = write_bytes
+        self._free = queue.Queue()
+        for _ in range(n_buffers):
+            self._free.put(_aligned_buffer(write_bytes))
+        self._queue = queue.Queue()
+        self._buf = None
+        self._fill = 0
+        self._file = -1
+        self._file_written = 0      # Bytes of the current file queued
+        self._captures = []
+        self._next_idx = None
+        self._freq = center_freq
+        self._error = None
+        self.files = []
+        self.samples = 0
+        self.bytes_written = 0
+        self.stalls = 0
+        self.stall_s = 0.0
+        self._thread = threading.Thread(target=self._writer, daemon=True,
+                                        name=f'sigmf_{name}')
+        self._thread.start()
+
+    # Producer side
+
+    def _check(self):
+        if self._error is not None:
+            raise RuntimeError("SigMF writer failed.") from self._error
+
+    def _get_buffer(self):
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        t0 = time.monotonic()
+        self.stalls += 1
+        buf = self._free.get()
+        self.stall_s += time.monotonic() - t0
+        return buf
+
+    def _submit(self):
+        if self._fill:
+            self._queue.put(('data', self._buf, self._fill))
+            self._buf = None
+            self._fill = 0
+
+    def _open_next(self):
+        if self._file >= 0:
+            self._close_file()
+        self._file += 1
+        self._file_written = 0
+        self._captures = []
+        path = os.path.join(self.dirs[self._file % len(self.dirs)],
+                            f'{self.name}_{self._file:05d}')
+        self.files.append(path)
+        self._queue.put(('open', path))
+
+    def _close_file(self):
+        self._submit()
+        self._queue.put(('close', self._meta()))
+
+    def _meta(self):
+        meta = {
+            "global": {
+                "core:datatype": "ci16_le",
+                "core:sample_rate": self.sample_rate,
+                "core:version": SIGMF_VERSION,
+                "core:num_channels": 1,
+                "core:recorder": "rfsoc_qsfp_offload",
+                **self.metadata,
+            },
+            "captures": self._captures,
+            "annotations": [],
+        }
+        return meta
+
+    def _new_capture(self, sample_idx):
+        capture = {
+            "core:sample_start": self._file_written // BYTES_PER_SAMPLE,
+            "core:global_index": int(sample_idx),
+            "core:frequency": self._freq,
+        }
+        if self.sample_idx_offset:
+            capture["core:datetime"] = _datetime(sample_idx /
+                                                 self.sample_rate)
+        self._captures.append(capture)
+
+    def write(self, samples, sample_idx, frequency=None):
+        """Queue interleaved int16 I/Q samples for writing.
+
+        Parameters
+        ----------
+        samples: np.ndarray
+            interleaved int16 I/Q samples
+        sample_idx: int
+            sample index of the first sample
+        frequency: float
+            center frequency in Hz from this sample on, if it changed
+        """
+        self._check()
+        data = np.ascontiguousarray(samples).view(np.uint8)
+        new_capture = sample_idx != self._next_idx
+        if frequency is not None and frequency != self._freq:
+            self._freq = frequency
+            new_capture = True
+        self._next_idx = sample_idx + len(data) // BYTES_PER_SAMPLE
+        self.samples += len(data) // BYTES_PER_SAMPLE
+        while len(data):
+            if self._file < 0 or self._file_written >= self.file_bytes:
+                self._open_next()
+                new_capture = True
+            if new_capture:
+                self._new_capture(sample_idx)
+                new_capture = False
+            if self._buf is None:
+                self._buf = self._get_buffer()
+            n = min(len(data), self.write_bytes - self._fill,
+                    self.file_bytes - self._file_written)
+            self._buf[self._fill:self._fill + n] = data[:n]
+            self._fill += n
+            self._file_written += n
+            sample_idx += n // BYTES_PER_SAMPLE
+            data = data[n:]
+            if self._fill == self.write_bytes:
+                self._submit()
+
+    def write_block(self, block):
+        """Queue a Block, turning its 'rx_freq' tags into new captures."""
+        start = 0
+        freq = None
+        for idx, key, value in block.tags:
+            if key != 'rx_freq':
+                continue
+            pos = idx - block.sample_idx
+            if pos > start:
+                self.write(block.samples[2 * start:2 * pos],
+                           block.sample_idx + start, freq)
+                start = pos
+            freq = value
+        self.write(block.samples[2 * start:], block.sample_idx + start, freq)
+
+    # Writer thread
+
+    def _writer(self):
+        fd = None
+        path = None
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                if item[0] == 'open':
+                    path = item[1]
+                    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+                    if self.direct:
+                        flags |= os.O_DIRECT
+                    fd = os.open(path + '.sigmf-data', flags, 0o644)
+                elif item[0] == 'data':
+                    _, buf, n = item
+                    self._write(fd, buf, n)
+                    self._free.put(buf)
+                else:
+                    os.close(fd)
+                    fd = None
+                    with open(path + '.sigmf-meta', 'w') as f:
+                        json.dump(item[1], f, indent=2)
+        except BaseException as e:
+            self._error = e
+            # Keep the producer from blocking forever
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                if item[0] == 'data':
+                    self._free.put(item[1])
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def _write(self, fd, buf, n):
+        view = memoryview(buf)[:n]
+        if self.direct and n % mmap.PAGESIZE:
+            # O_DIRECT needs aligned lengths, write the tail buffered
+            aligned = n // mmap.PAGESIZE * mmap.PAGESIZE
+            self._write_all(fd, view[:aligned])
+            flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags & ~os.O_DIRECT)
+            self._write_all(fd, view[aligned:])
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags)
+        else:
+            self._write_all(fd, view)
+
+    def _write_all(self, fd, view):
+        while len(view):
+            n = os.write(fd, view)
+            self.bytes_written += n
+            view = view[n:]
+
+    def stats(self) -> dict:
+        """Return a dictionary with the recorder counters
+        """
+        return {
+            "samples": self.samples,
+            "bytes_written": self.bytes_written,
+            "files": len(self.files),
+            "queued_buffers": self._queue.qsize(),
+            "stalls": self.stalls,
+            "stall_s": self.stall_s,
+        }
+
+    def close(self):
+        """Write out all queued samples and the metadata, then stop.
+        """
+        if self._thread is None:
+            return
+        if self._file >= 0:
+            self._close_file()
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._check()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
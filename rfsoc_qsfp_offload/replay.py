@@ -0,0 +1,380 @@
+import argparse
+import ctypes
+import errno
+import json
+import os
+import socket
+import time
+import numpy as np
+from .rx import _IoVec, _MMsgHdr, UDP_PORT, PAYLOAD_BYTES, \
+    PACKET_SAMPLES, payload_samples
+from .reassembly import decode_headers
+
+# Header defaults of adc_to_udp_stream_v1_0.v
+RATE_DENOMINATOR = 16
+BITS_PER_INT = 16
+SAMPLES_PER_ADC_CLOCK = 2
+
+_IOVEC_DTYPE = np.dtype([('base', '<u8'), ('len', '<u8')])
+
+
+def _load_sendmmsg():
+    libc = ctypes.CDLL(None, use_errno=True)
+    try:
+        fn = libc.sendmmsg
+    except AttributeError:
+        return None
+    fn.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint,
+                   ctypes.c_int]
+    fn.restype = ctypes.c_int
+    return fn
+
+
+_sendmmsg = _load_sendmmsg()
+
+
+def _fill(payloads, samples):
+    """Copy interleaved int16 I/Q samples into consecutive payloads."""
+    rows = payload_samples(payloads)
+    width = rows.shape[1]
+    full = len(samples) // width
+    rows[:full] = samples[:full * width].reshape(full, width)
+    rest = len(samples) - full * width
+    if rest:
+        rows[full, :rest] = samples[full * width:]
+
+
+def _frame(payloads, sample_idx, sample_rate, frequency):
+    """Write the radio headers of consecutive packets."""
+    hdr = decode_headers(payloads)
+    hdr['sample_idx'] = sample_idx + np.arange(len(payloads)) * PACKET_SAMPLES
+    hdr['sample_rate_numerator'] = round(sample_rate * RATE_DENOMINATOR)
+    hdr['sample_rate_denominator'] = RATE_DENOMINATOR
+    hdr['frequency_idx'] = round(frequency / 1e3)
+    hdr['pkt_samples'] = PACKET_SAMPLES
+    hdr['bits_per_int'] = BITS_PER_INT
+    hdr['is_complex'] = 1
+    hdr['samples_per_adc_clock'] = SAMPLES_PER_ADC_CLOCK
+
+
+def packetize(samples, sample_idx, sample_rate, frequency=0.0):
+    """Frame interleaved int16 I/Q samples as adc_to_udp_stream payloads.
+
+    The samples are taken as a whole stream; use a Packetizer to frame a
+    stream that arrives in blocks.
+
+    Parameters
+    ----------
+    samples: np.ndarray
+        interleaved int16 I/Q samples, the last packet is zero-padded
+    sample_idx: int
+        sample index of the first sample
+    sample_rate: float
+        complex samples per second
+    frequency: float
+        center frequency in Hz
+
+    Returns
+    -------
+    A (n, PAYLOAD_BYTES) uint8 array of payloads
+    """
+    n = -(-(len(samples) // 2) // PACKET_SAMPLES)
+    payloads = np.zeros((n, PAYLOAD_BYTES), dtype=np.uint8)
+    _fill(payloads, samples)
+    _frame(payloads, sample_idx, sample_rate, frequency)
+    return payloads
+
+
+class Packetizer:
+    """Frame a stream of int16 I/Q blocks as adc_to_udp_stream payloads.
+
+    Samples that do not fill a whole packet are held back and sent in
+    front of the next block, so consecutive blocks give consecutive,
+    non-overlapping packets; only flush() zero-pads the last packet. A
+    packet carries the frequency of its first sample. A block that does
+    not continue the sample index of the stream flushes the held samples
+    first.
+
+    Parameters
+    ----------
+    sample_rate: float
+        complex samples per second
+    frequency: float
+        center frequency in Hz, until a block sets another
+    """
+
+    def __init__(self, sample_rate, frequency=0.0):
+        self.sample_rate = sample_rate
+        self.frequency = frequency
+        self._held = np.empty(2 * PACKET_SAMPLES, dtype=np.int16)
+        self._n_held = 0        # int16 values held back
+        self._held_freq = frequency
+        self._next_idx = None   # Sample index after the last sample pushed
+
+    def push(self, samples, sample_idx=None, frequency=None):
+        """Add a block and return the packets it completed.
+
+        Parameters
+        ----------
+        samples: np.ndarray
+            interleaved int16 I/Q samples
+        sample_idx: int
+            sample index of the first sample, None if contiguous
+        frequency: float
+            center frequency in Hz of the block, unchanged if None
+
+        Returns
+        -------
+        A (n, PAYLOAD_BYTES) uint8 array of payloads
+        """
+        if frequency is not None:
+            self.frequency = frequency
+        if sample_idx is None:
+            sample_idx = 0 if self._next_idx is None else self._next_idx
+        flushed = self.flush() if sample_idx != self._next_idx else None
+        self._next_idx = sample_idx + len(samples) // 2
+        held = self._n_held
+        if not held:
+            self._held_freq = self.frequency
+        width = 2 * PACKET_SAMPLES
+        n = (held + len(samples)) // width
+        payloads = np.zeros((n, PAYLOAD_BYTES), dtype=np.uint8)
+        if n:
+            used = n * width - held
+            rows = payload_samples(payloads)
+            rows[0, :held] = self._held[:held]
+            rows[0, held:] = samples[:width - held]
+            _fill(payloads[1:], samples[width - held:used])
+            _frame(payloads, sample_idx - held // 2, self.sample_rate,
+                   self.frequency)
+            decode_headers(payloads[:1])['frequency_idx'] = \
+                round(self._held_freq / 1e3)
+            samples = samples[used:]
+            held = 0
+            self._held_freq = self.frequency
+        self._held[held:held + len(samples)] = samples
+        self._n_held = held + len(samples)
+        if flushed is not None and len(flushed):
+            return np.concatenate((flushed, payloads))
+        return payloads
+
+    def flush(self):
+        """Return the held samples as a zero-padded packet, if any."""
+        held = self._n_held
+        payloads = np.zeros((1 if held else 0, PAYLOAD_BYTES),
+                            dtype=np.uint8)
+        if held:
+            _fill(payloads, self._held[:held])
+            _frame(payloads, self._next_idx - held // 2, self.sample_rate,
+                   self._held_freq)
+            self._n_held = 0
+        return payloads
+
+
+class Replayer:
+    """Send recorded payloads as UDP packets at the original rate.
+
+    Packets are sent unmodified, so sample indices and counters are
+    preserved, in batches with sendmmsg(). Each batch is released when the
+    samples it carries are due at `speed` times the stream's sample rate;
+    the difference between the scheduled and the actual send time of every
+    batch is reported as pacing jitter.
+
+    Parameters
+    ----------
+    dest: tuple
+        (host, port) to send to
+    sample_rate: float
+        complex samples per second, taken from the radio headers if None
+    speed: float
+        multiple of the sample rate to replay at
+    batch: int
+        packets per sendmmsg() call
+    sndbuf: int
+        requested socket send buffer size in bytes
+    spin_s: float
+        final part of every wait that is busy-waited for accuracy
+    """
+
+    def __init__(self, dest=('127.0.0.1', UDP_PORT), sample_rate=None,
+                 speed=1.0, batch=32, sndbuf=16 * 1024 * 1024,
+                 spin_s=200e-6):
+        self.sample_rate = sample_rate
+        self.speed = speed
+        self.batch = batch
+        self.spin_s = spin_s
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf)
+        self.sock.connect(dest)
+        self._iov = (_IoVec * batch)()
+        self._iov_np = np.frombuffer(self._iov, dtype=_IOVEC_DTYPE)
+        self._iov_np['len'] = PAYLOAD_BYTES
+        self._msgvec = (_MMsgHdr * batch)()
+        for i in range(batch):
+            self._msgvec[i].msg_hdr.msg_iov = ctypes.addressof(self._iov[i])
+            self._msgvec[i].msg_hdr.msg_iovlen = 1
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.packets = 0
+        self.batches = 0
+        self.retries = 0
+        self._lateness = []
+        self._elapsed = 0.0
+        self._target_rate = 0.0
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def _send(self, payloads):
+        """Send up to `batch` contiguous rows, return the number sent."""
+        n = len(payloads)
+        self._iov_np['base'][:n] = payloads.ctypes.data + \
+            np.arange(n, dtype=np.uint64) * payloads.strides[0]
+        if _sendmmsg is None:
+            for row in payloads:
+                self.sock.send(row)
+            return n
+        sent = 0
+        while sent < n:
+            r = _sendmmsg(self.sock.fileno(),
+                          ctypes.addressof(self._msgvec[sent]), n - sent, 0)
+            if r < 0:
+                err = ctypes.get_errno()
+                if err in (errno.ENOBUFS, errno.EAGAIN, errno.EINTR):
+                    self.retries += 1
+                    continue
+                raise OSError(err, os.strerror(err))
+            sent += r
+        return sent
+
+    def _wait(self, deadline):
+        remaining = deadline - time.perf_counter()
+        if remaining > self.spin_s:
+            time.sleep(remaining - self.spin_s)
+        while time.perf_counter() < deadline:
+            pass
+
+    def replay(self, payloads, loops=1):
+        """Send payloads at the configured rate.
+
+        Parameters
+        ----------
+        payloads: np.ndarray
+            (n, PAYLOAD_BYTES) uint8 payloads, rows may be strided
+        loops: int
+            number of times to send the whole recording
+
+        Returns
+        -------
+        The statistics, see stats()
+        """
+        self._reset_stats()
+        rate = self.sample_rate
+        if rate is None:
+            hdr = decode_headers(payloads[:1])
+            rate = float(hdr['sample_rate_numerator'][0]) / \
+                max(int(hdr['sample_rate_denominator'][0]), 1)
+        packet_s = PACKET_SAMPLES / (rate * self.speed)
+        if payloads.strides[1] != 1:
+            payloads = np.ascontiguousarray(payloads)
+        t0 = time.perf_counter()
+        k = 0
+        for _ in range(loops):
+            for start in range(0, len(payloads), self.batch):
+                due = t0 + k * packet_s
+                self._wait(due)
+                self._lateness.append(time.perf_counter() - due)
+                chunk = payloads[start:start + self.batch]
+                self.packets += self._send(chunk)
+                self.batches += 1
+                k += len(chunk)
+        self._elapsed = time.perf_counter() - t0
+        self._target_rate = 1.0 / packet_s
+        return self.stats()
+
+    def stats(self) -> dict:
+        """Return a dictionary with the achieved rate and pacing jitter
+
+        'lateness' is how late each batch started compared to its
+        schedule; its spread is the pacing jitter.
+        """
+        late = np.array(self._lateness) if self._lateness else np.zeros(1)
+        rate = self.packets / self._elapsed if self._elapsed else 0.0
+        return {
+            "packets": self.packets,
+            "batches": self.batches,
+            "retries": self.retries,
+            "seconds": self._elapsed,
+            "packets_per_s": rate,
+            "target_packets_per_s": self._target_rate,
+            "mbps": rate * PAYLOAD_BYTES * 8e-6,
+            "lateness_mean_s": float(late.mean()),
+            "lateness_max_s": float(late.max()),
+            "jitter_s": float(late.std()),
+        }
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_recording(path):
+    """Load payloads from a pcap, pcapng or SigMF recording.
+
+    Returns
+    -------
+    A (n, PAYLOAD_BYTES) uint8 array of payloads
+    """
+    if path.endswith('.sigmf-data') or path.endswith('.sigmf-meta'):
+        base = path.rsplit('.', 1)[0]
+        with open(base + '.sigmf-meta') as f:
+            meta = json.load(f)
+        data = np.memmap(base + '.sigmf-data', dtype='<i2', mode='r')
+        rate = meta['global']['core:sample_rate']
+        packetizer = Packetizer(rate)
+        parts = []
+        captures = meta['captures']
+        for i, cap in enumerate(captures):
+            start = cap['core:sample_start']
+            stop = captures[i + 1]['core:sample_start'] \
+                if i + 1 < len(captures) else len(data) // 2
+            parts.append(packetizer.push(data[2 * start:2 * stop],
+                                         cap.get('core:global_index', start),
+                                         cap.get('core:frequency', 0.0)))
+        parts.append(packetizer.flush())
+        return np.concatenate(parts)
+    from .pcap import PcapCapture
+    return PcapCapture(path).payloads
+
+
+def main(args):
+    payloads = load_recording(args.recording)
+    with Replayer((args.host, args.port), sample_rate=args.rate,
+                  speed=args.speed, batch=args.batch) as rep:
+        stats = rep.replay(payloads, loops=args.loops)
+    for key, value in stats.items():
+        print(f'{key:>22}: {value}')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Replay a recording as adc_to_udp_stream UDP packets")
+    parser.add_argument('recording', help='pcap, pcapng or .sigmf-data file')
+    parser.add_argument('--host', default='127.0.0.1', help='Destination')
+    parser.add_argument('-p', '--port', type=int, default=UDP_PORT,
+                        help='Destination UDP port')
+    parser.add_argument('-s', '--speed', type=float, default=1.0,
+                        help='Multiple of the recorded sample rate')
+    parser.add_argument('-r', '--rate', type=float, default=None,
+                        help='Sample rate in S/s, from the headers if unset')
+    parser.add_argument('-b', '--batch', type=int, default=32,
+                        help='Packets per sendmmsg call')
+    parser.add_argument('-n', '--loops', type=int, default=1,
+                        help='Number of times to send the recording')
+    main(parser.parse_args())
@@ -0,0 +1,228 @@
+import math
+from fractions import Fraction
+import numpy as np
+from scipy import fft as sp_fft
+from scipy import signal
+from .convert import to_complex64
+
+
+def resampling_filter(up, down, taps_per_phase=20, beta=5.0):
+    """Design a Kaiser lowpass for resampling by up/down.
+
+    The cutoff is the lower of the two Nyquist rates and the gain is `up`,
+    which makes up for the zeros of the upsampling.
+    """
+    if up == down == 1:
+        return np.ones(1, dtype=np.float32)
+    n = taps_per_phase * max(up, down)
+    return (up * signal.firwin(n, 1.0 / max(up, down),
+                               window=('kaiser', beta))).astype(np.float32)
+
+
+class RationalResampler:
+    """Streaming polyphase FIR resampler by a factor up/down.
+
+    The output equals scipy.signal.upfirdn(taps, x, up, down) of the
+    concatenated input, however the input is split into blocks: the
+    filter history and the phase of the next output are kept between
+    calls.
+
+    Each polyphase branch has ceil(len(taps)/up) taps. Short branches are
+    evaluated directly at the output instants only, with one vectorized
+    multiply-accumulate per tap. Branches longer than `fft_threshold` are
+    applied by overlap-save FFT convolution: the input segments are
+    transformed once per block, then only the branches used by the output
+    instants are multiplied and transformed back, in place in
+    preallocated workspaces.
+
+    Parameters
+    ----------
+    up: int
+        interpolation factor
+    down: int
+        decimation factor
+    taps: np.ndarray
+        FIR filter at the upsampled rate, resampling_filter() if None
+    max_samples: int
+        largest block in complex samples, sizes the preallocated buffers
+    fft_threshold: int
+        taps per branch above which overlap-save is used
+    """
+
+    def __init__(self, up, down, taps=None, max_samples=1 << 18,
+                 fft_threshold=32):
+        if up < 1 or down < 1:
+            raise ValueError("up and down must be positive integers.")
+        g = math.gcd(up, down)
+        up, down = up // g, down // g
+        if taps is None:
+            taps = resampling_filter(up, down)
+        taps = np.asarray(taps, dtype=np.float32)
+        n_taps = -(-len(taps) // up)
+        h = np.zeros(n_taps * up, dtype=np.float32)
+        h[:len(taps)] = taps
+        # Branch p holds taps[p + i*up], applied to x[n - i]
+        self._h = h.reshape(n_taps, up).T.astype(np.complex64)
+        # Reversed branches, dotted with windows in sample order
+        self._h_rev = np.ascontiguousarray(self._h[:, ::-1])
+        self.up = up
+        self.down = down
+        self.taps = taps
+        self.max_samples = max_samples
+        self._history = n_taps - 1
+        self._t = 0         # Next output instant at the upsampled rate
+        self._fft = None
+        pad = 0
+        if n_taps > fft_threshold:
+            size = sp_fft.next_fast_len(4 * n_taps)
+            self._fft = size
+            self._step = size - n_taps + 1
+            self._hf = sp_fft.fft(self._h, size, axis=1)
+            n_seg = -(-max_samples // self._step)
+            # Spectra of the input segments and of one branch output
+            self._xf = np.empty((n_seg, size), dtype=np.complex64)
+            self._yf = np.empty((n_seg, size), dtype=np.complex64)
+            pad = size
+        self._buf = np.zeros(self._history + max_samples + pad,
+                             dtype=np.complex64)
+        self._out = np.empty(max_samples * up // down + 2,
+                             dtype=np.complex64)
+        self.samples_in = 0
+        self.samples_out = 0
+
+    @classmethod
+    def for_rates(cls, in_rate, out_rate, max_denominator=1000, **kwargs):
+        """Create a resampler between two sample rates.
+
+        The ratio is approximated by a fraction with a denominator of at
+        most `max_denominator`; check `output_rate()` for the exact result.
+        """
+        ratio = Fraction(out_rate / in_rate).limit_denominator(
+            max_denominator)
+        return cls(ratio.numerator, ratio.denominator, **kwargs)
+
+    def output_rate(self, in_rate):
+        return in_rate * self.up / self.down
+
+    def reset(self):
+        """Clear the filter history, e.g. after a gap in the stream."""
+        self._buf[:self._history] = 0
+        self._t = 0
+
+    def push(self, samples):
+        """Resample a block of samples.
+
+        Parameters
+        ----------
+        samples: np.ndarray
+            interleaved int16 I/Q or complex64 samples
+
+        Returns
+        -------
+        A complex64 view of a preallocated buffer, valid until the next
+        call
+        """
+        n = len(samples) // 2 if samples.dtype == np.int16 else len(samples)
+        if n > self.max_samples:
+            raise ValueError(
+                f"{n} samples exceed max_samples={self.max_samples}.")
+        hist = self._history
+        dst = self._buf[hist:hist + n]
+        if samples.dtype == np.int16:
+            to_complex64(samples, dst)
+        else:
+            dst[:] = samples
+        up, down = self.up, self.down
+        # Outputs whose newest input sample is in this block
+        n_out = max(0, -(-(n * up - self._t) // down))
+        out = self._out[:n_out]
+        if self._fft is None:
+            self._direct(out)
+        elif n_out:
+            self._overlap_save(out)
+        self._t = self._t + down * n_out - n * up
+        # The newest inputs become the history of the next block
+        self._buf[:hist] = self._buf[n:n + hist]
+        self.samples_in += n
+        self.samples_out += n_out
+        return out
+
+    def _direct(self, out):
+        """Evaluate the branches at the output instants only.
+
+        Every up-th output uses the same branch and starts `down` input
+        samples later, so each branch is one matrix-vector product over a
+        strided view of the input windows.
+        """
+        up, down = self.up, self.down
+        n_taps = self._h.shape[1]
+        item = self._buf.itemsize
+        for r in range(min(up, len(out))):
+            t = self._t + r * down
+            y = out[r::up]
+            windows = np.lib.stride_tricks.as_strided(
+                self._buf[t // up + self._history - n_taps + 1:],
+                shape=(len(y), n_taps), strides=(down * item, item),
+                writeable=False)
+            np.matmul(windows, self._h_rev[t % up], out=y)
+
+    def _overlap_save(self, out):
+        """Evaluate the used branches by overlap-save FFT convolution.
+
+        As in _direct(), every up-th output uses the same branch, at every
+        down-th input sample, so each branch is inverse transformed once
+        and sampled at those positions.
+        """
+        up, down = self.up, self.down
+        size, step = self._fft, self._step
+        hist = self._history
+        # Segments up to the newest input sample used by an output
+        n_seg = ((self._t + (len(out) - 1) * down) // up) // step + 1
+        item = self._buf.itemsize
+        segs = np.lib.stride_tricks.as_strided(
+            self._buf, shape=(n_seg, size), strides=(step * item, item),
+            writeable=False)
+        xf = self._xf[:n_seg]
+        xf[:] = segs
+        xf = sp_fft.fft(xf, axis=1, overwrite_x=True)
+        yf = self._yf[:n_seg]
+        for r in range(min(up, len(out))):
+            t = self._t + r * down
+            y = out[r::up]
+            np.multiply(xf, self._hf[t % up], out=yf)
+            z = sp_fft.ifft(yf, axis=1, overwrite_x=True)
+            # New sample j is at position hist + j % step of segment j//step
+            j = t // up + down * np.arange(len(y))
+            seg, pos = np.divmod(j, step)
+            pos += hist
+            y[:] = z[seg, pos]
+
+    def stats(self) -> dict:
+        """Return a dictionary with the resampler counters
+        """
+        return {
+            "up": self.up,
+            "down": self.down,
+            "taps": len(self.taps),
+            "overlap_save": self._fft is not None,
+            "samples_in": self.samples_in,
+            "samples_out": self.samples_out,
+        }
+
+
+class Decimator(RationalResampler):
+    """Streaming FIR lowpass and decimation by an integer factor.
+
+    Fills the gaps between the decimation factors of the ADC chain, e.g.
+    a factor of 3 after the hardware decimation by 2.
+
+    Parameters
+    ----------
+    decimation: int
+        decimation factor
+    taps: np.ndarray
+        FIR filter, resampling_filter(1, decimation) if None
+    """
+
+    def __init__(self, decimation, taps=None, **kwargs):
+        super().__init__(1, decimation, taps, **kwargs)
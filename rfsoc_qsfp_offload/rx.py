@@ -0,0 +1,306 @@
+import ctypes
+import ctypes.util
+import errno
+import ipaddress
+import os
+import select
+import socket
+import numpy as np
+
+# Packet layout of the udp_stream / adc_to_udp_stream cores
+UDP_PORT = 60133
+PAYLOAD_WORDS = 4128                                # 16-bit words per UDP payload
+PAYLOAD_BYTES = PAYLOAD_WORDS * 2                   # 8256 bytes
+RADIO_HEADER_BYTES = 64                             # RfPktHeader (adc_to_udp_stream)
+SAMPLE_BYTES = PAYLOAD_BYTES - RADIO_HEADER_BYTES   # 8192 bytes of sc16
+PACKET_SAMPLES = SAMPLE_BYTES // 4                  # 2048 complex samples
+FRAME_HEADER_BYTES = 42                             # Ethernet + IPv4 + UDP
+
+MSG_WAITFORONE = 0x10000
+
+# struct sockaddr_in, as filled in by recvmmsg() for every packet
+SOCKADDR_IN_DTYPE = np.dtype([
+    ('family', '<u2'),
+    ('port', '>u2'),
+    ('addr', '>u4'),
+    ('zero', 'V8'),
+])
+
+
+class _IoVec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p),
+                ('iov_len', ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p),
+                ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.c_void_p),
+                ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p),
+                ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _MsgHdr),
+                ('msg_len', ctypes.c_uint)]
+
+
+def _load_recvmmsg():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fn = libc.recvmmsg
+    except (OSError, AttributeError, TypeError):
+        return None
+    fn.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint,
+                   ctypes.c_int, ctypes.c_void_p]
+    fn.restype = ctypes.c_int
+    return fn
+
+
+_recvmmsg = _load_recvmmsg()
+
+
+def payload_samples(payloads):
+    """Return the interleaved int16 I/Q samples of a batch of payloads.
+
+    The result is a zero-copy (n, 2*PACKET_SAMPLES) view of `payloads`.
+    """
+    return payloads[:, RADIO_HEADER_BYTES:].view('<i2')
+
+
+class PacketRing:
+    """Preallocated ring of fixed-size packet slots.
+
+    Slots are stored as rows of a single (slots, PAYLOAD_BYTES) uint8
+    array together with the received length of each slot. The payloads
+    can be placed in an existing buffer, e.g. shared memory, by passing
+    `buffer`.
+    """
+
+    def __init__(self, slots=8192, slot_bytes=PAYLOAD_BYTES, buffer=None):
+        if slots < 1:
+            raise ValueError("Ring must have at least one slot.")
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        if buffer is None:
+            self.payloads = np.zeros((slots, slot_bytes), dtype=np.uint8)
+        else:
+            self.payloads = np.ndarray((slots, slot_bytes), dtype=np.uint8,
+                                       buffer=buffer)
+        self.lengths = np.zeros(slots, dtype=np.uint32)
+        self.sources = np.zeros(slots, dtype=SOCKADDR_IN_DTYPE)
+        self.head = 0   # Total number of packets written
+
+    @property
+    def index(self):
+        """Slot index that the next packet will be written to."""
+        return self.head % self.slots
+
+
+class Receiver:
+    """Batched UDP receiver for adc_to_udp_stream packets.
+
+    Packets are read with recvmmsg() straight into the slots of a
+    PacketRing. Each call to recv() returns a view of the slots filled by
+    that call; the view stays valid until the ring wraps around, i.e. for
+    roughly `slots // batch` further calls. Datagrams larger than a slot
+    arrive truncated (MSG_TRUNC); they are dropped and counted in
+    'truncated'.
+
+    Parameters
+    ----------
+    port: int
+        UDP port to listen on
+    host: str
+        local address to bind to
+    slots: int
+        number of packets held by the ring
+    batch: int
+        maximum number of packets read per system call
+    rcvbuf: int
+        requested socket receive buffer size in bytes
+    sock: socket.socket
+        already bound socket to use instead of creating one
+    reuseport: bool
+        set SO_REUSEPORT so several receivers can share the port
+    ring: PacketRing
+        ring to receive into instead of allocating one
+    sources: bool
+        record the source address of every packet in the ring
+    """
+
+    def __init__(self, port=UDP_PORT, host='0.0.0.0', slots=8192, batch=256,
+                 rcvbuf=64 * 1024 * 1024, sock=None, reuseport=False,
+                 ring=None, sources=False):
+        self.ring = PacketRing(slots) if ring is None else ring
+        if batch < 1 or batch > self.ring.slots:
+            raise ValueError("batch must be between 1 and slots.")
+        self.batch = batch
+        self.record_sources = sources
+        if sock is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if reuseport:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+            sock.bind((host, port))
+        sock.setblocking(False)
+        self.sock = sock
+        self._poll = select.poll()
+        self._poll.register(sock.fileno(), select.POLLIN)
+        self.packets = 0
+        self.bytes = 0
+        self.size_errors = 0
+        self.truncated = 0
+        self.calls = 0
+        self._last = slice(0, 0)
+        self._setup_msgvec()
+
+    def _setup_msgvec(self):
+        ring = self.ring
+        iov = (_IoVec * ring.slots)()
+        msgvec = (_MMsgHdr * ring.slots)()
+        base = ring.payloads.ctypes.data
+        names = ring.sources.ctypes.data
+        for i in range(ring.slots):
+            iov[i].iov_base = base + i * ring.slot_bytes
+            iov[i].iov_len = ring.slot_bytes
+            msgvec[i].msg_hdr.msg_iov = ctypes.addressof(iov[i])
+            msgvec[i].msg_hdr.msg_iovlen = 1
+            if self.record_sources:
+                msgvec[i].msg_hdr.msg_name = \
+                    names + i * SOCKADDR_IN_DTYPE.itemsize
+                msgvec[i].msg_hdr.msg_namelen = SOCKADDR_IN_DTYPE.itemsize
+        self._iov = iov
+        self._msgvec = msgvec
+        self._msgvec_addr = ctypes.addressof(msgvec)
+        # Strided view of the msg_len field of every mmsghdr
+        self._msg_len = np.ndarray(
+            shape=(ring.slots,), dtype=np.uintc, buffer=msgvec,
+            offset=_MMsgHdr.msg_len.offset,
+            strides=(ctypes.sizeof(_MMsgHdr),))
+        self._msg_flags = np.ndarray(
+            shape=(ring.slots,), dtype=np.intc, buffer=msgvec,
+            offset=_MMsgHdr.msg_hdr.offset + _MsgHdr.msg_flags.offset,
+            strides=(ctypes.sizeof(_MMsgHdr),))
+        self._truncated = np.zeros(ring.slots, dtype=bool)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def _recv_batch(self, start, count):
+        if _recvmmsg is None:
+            return self._recv_fallback(start, count)
+        n = _recvmmsg(self.sock.fileno(),
+                      self._msgvec_addr + start * ctypes.sizeof(_MMsgHdr),
+                      count, MSG_WAITFORONE, None)
+        if n < 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return 0
+            raise OSError(err, os.strerror(err))
+        self.ring.lengths[start:start + n] = self._msg_len[start:start + n]
+        np.not_equal(self._msg_flags[start:start + n] & socket.MSG_TRUNC, 0,
+                     out=self._truncated[start:start + n])
+        return n
+
+    def _recv_fallback(self, start, count):
+        ring = self.ring
+        n = 0
+        while n < count:
+            try:
+                ring.lengths[start + n], _, flags, (addr, port) = \
+                    self.sock.recvmsg_into([ring.payloads[start + n]])
+            except BlockingIOError:
+                break
+            self._truncated[start + n] = bool(flags & socket.MSG_TRUNC)
+            if self.record_sources:
+                src = ring.sources[start + n]
+                src['port'] = port
+                src['addr'] = int(ipaddress.IPv4Address(addr))
+            n += 1
+        return n
+
+    def recv(self, timeout=None):
+        """Receive up to `batch` packets.
+
+        Parameters
+        ----------
+        timeout: float
+            seconds to wait for the first packet, None blocks forever
+
+        Returns
+        -------
+        A (n, PAYLOAD_BYTES) uint8 view of the ring slots that were filled,
+        n may be zero if the timeout expired
+        """
+        ring = self.ring
+        start = ring.index
+        count = min(self.batch, ring.slots - start)
+        n = self._recv_batch(start, count)
+        if n == 0:
+            wait_ms = None if timeout is None else int(timeout * 1000)
+            if not self._poll.poll(wait_ms):
+                self._last = slice(start, start)
+                return ring.payloads[self._last]
+            n = self._recv_batch(start, count)
+        self.calls += 1
+        n = self._drop_truncated(start, n)
+        self._last = slice(start, start + n)
+        lengths = ring.lengths[self._last]
+        self.packets += n
+        self.bytes += int(lengths.sum(dtype=np.uint64))
+        self.size_errors += int(np.count_nonzero(lengths != ring.slot_bytes))
+        ring.head += n
+        return ring.payloads[self._last]
+
+    def _drop_truncated(self, start, n):
+        """Move the complete packets of a batch to its front.
+
+        Returns the number of complete packets.
+        """
+        trunc = self._truncated[start:start + n]
+        if not trunc.any():
+            return n
+        ring = self.ring
+        keep = start + np.flatnonzero(~trunc)
+        self.truncated += n - len(keep)
+        for arr in (ring.payloads, ring.lengths, ring.sources):
+            arr[start:start + len(keep)] = arr[keep]
+        return len(keep)
+
+    @property
+    def last_lengths(self):
+        """Received lengths of the packets returned by the last recv()."""
+        return self.ring.lengths[self._last]
+
+    @property
+    def last_sources(self):
+        """Source addresses of the packets returned by the last recv().
+
+        Only filled in when the receiver was created with sources=True.
+        """
+        return self.ring.sources[self._last]
+
+    def stats(self) -> dict:
+        """Return a dictionary with the receive counters
+        """
+        return {
+            "packets": self.packets,
+            "bytes": self.bytes,
+            "size_errors": self.size_errors,
+            "truncated": self.truncated,
+            "calls": self.calls,
+        }
+
+    def close(self):
+        self._poll.unregister(self.sock.fileno())
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
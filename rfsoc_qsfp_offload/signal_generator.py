@@ -1,3 +1,5 @@
+import warnings
+from fractions import Fraction
 import numpy as np
 from scipy import signal
 
@@ -38,3 +40,85 @@ def convert_to_int16(array, bits=14):
     bit_array = array*(maxrep)
     clip_array = bit_array.clip(-maxrep, maxrep-1)
     return clip_array.astype(np.int16)*(2**(16-bits))
+
+
+def cyclic_length(f, fs, min_samples=0, align=16, max_samples=1 << 24):
+    """Find the shortest buffer length holding a whole number of
+    cycles of frequency f at sample frequency fs, as a multiple of
+    `align` samples and at least `min_samples` long.
+
+    If no such length up to `max_samples` exists, the nearest
+    frequency that has one is used instead.
+
+    Returns the number of samples, the number of cycles and the
+    frequency actually generated.
+    """
+    if not 0 < abs(f) < fs:
+        raise ValueError("f must be non-zero and below fs.")
+    # Cycles per block of `align` samples, as the fraction cycles/blocks
+    per_block = (Fraction(f) * align / Fraction(fs)).limit_denominator(
+        max(1, max_samples // align))
+    if per_block == 0:
+        raise ValueError("f is too low for a buffer of max_samples.")
+    n = align * per_block.denominator
+    repeat = max(1, -(-min_samples // n))
+    n *= repeat
+    cycles = per_block.numerator * repeat
+    return n, cycles, float(per_block * fs / align)
+
+
+def _cyclic(wave, f, fs, min_samples, align, max_samples, tolerance):
+    """Build an exact-period buffer from wave(phase), phase in [0, 2*pi).
+
+    wave() is evaluated over the shortest period only, which is then
+    repeated up to min_samples. Warns when the frequency generated
+    differs from f by more than `tolerance` Hz.
+    """
+    n, cycles, actual = cyclic_length(f, fs, 0, align, max_samples)
+    if abs(actual - f) > tolerance:
+        warnings.warn(f"Generating {actual!r} Hz instead of {f!r} Hz, the "
+                      f"nearest frequency with a period of at most "
+                      f"{max_samples} samples.", stacklevel=3)
+    # Integer phase accumulation, exact at every sample and the wrap;
+    # only the reduced phase is rounded to single precision
+    k = np.arange(n, dtype=np.int64)
+    k *= cycles
+    k %= n
+    phase = k.astype(np.single)
+    phase *= np.single(2 * np.pi / n)
+    period = wave(phase)
+    repeat = max(1, -(-min_samples // n))
+    return np.tile(period, repeat) if repeat > 1 else period
+
+
+def cyclic_sine(f=10e6, fs=2457.6e6, phi=0.0, A=1, min_samples=0,
+                align=16, max_samples=1 << 24, tolerance=1e-3):
+    """Generate a sine wave buffer that repeats without a phase
+    discontinuity, for cyclic DMA transfers to the DAC.
+
+    Unlike sine(), the buffer holds an integer number of cycles, so
+    repeating it continues the phase exactly. Its length is the
+    shortest multiple of `align` samples doing so, see cyclic_length().
+    A warning is issued when f has to be moved by more than `tolerance`
+    Hz; cyclic_length() returns the frequency actually generated.
+
+    Returns a floating-point np.array object.
+    """
+    def wave(phase):
+        phase += np.single(phi)
+        np.sin(phase, out=phase)
+        phase *= np.single(A)
+        return phase
+    return _cyclic(wave, f, fs, min_samples, align, max_samples, tolerance)
+
+
+def cyclic_sawtooth(f=50e6, fs=2457.6e6, width=0.5, A=1, min_samples=0,
+                    align=16, max_samples=1 << 24, tolerance=1e-3):
+    """Generate a sawtooth wave buffer that repeats without a phase
+    discontinuity, see cyclic_sine().
+
+    Returns a floating-point np.array object.
+    """
+    def wave(phase):
+        return (A * signal.sawtooth(phase, width=width)).astype(np.single)
+    return _cyclic(wave, f, fs, min_samples, align, max_samples, tolerance)
@@ -0,0 +1,325 @@
+import functools
+import json
+import numpy as np
+from scipy import fft as sp_fft
+from scipy import signal
+from .convert import to_complex64
+
+
+@functools.lru_cache(maxsize=16)
+def fft_plan(fft_size, window='hamming'):
+    """Return the cached window and power normalisation for an FFT size.
+
+    The normalisation makes a full-scale complex tone read 0 dBFS.
+    """
+    win = signal.get_window(window, fft_size).astype(np.float32)
+    win.flags.writeable = False
+    return win, 1.0 / float(win.sum()) ** 2
+
+
+class SampleBuffer:
+    """Growing complex64 buffer of the samples not yet cut into segments.
+
+    Pushed blocks are converted straight into the buffer, and the samples
+    used up by whole segments are dropped from its front, so segments
+    continue across blocks.
+
+    Attributes
+    ----------
+    data: np.ndarray
+        complex64 buffer, the first `fill` samples are valid
+    fill: int
+        samples held
+    idx: int
+        sample index of data[0], None before the first block
+
+    Parameters
+    ----------
+    spare: int
+        extra samples allocated whenever the buffer grows
+    """
+
+    def __init__(self, spare):
+        self.spare = spare
+        self.data = np.empty(0, dtype=np.complex64)
+        self.fill = 0
+        self.idx = None
+
+    def append(self, samples, sample_idx=None):
+        """Append int16 I/Q or complex64 samples.
+
+        A sample index other than the one after the held samples drops
+        them and restarts the buffer at `sample_idx`.
+
+        Returns
+        -------
+        True if the samples continue the held ones
+        """
+        n = len(samples) // 2 if samples.dtype == np.int16 else len(samples)
+        expected = None if self.idx is None else self.idx + self.fill
+        if sample_idx is None:
+            sample_idx = 0 if expected is None else expected
+        contiguous = sample_idx == expected
+        if not contiguous:
+            self.fill = 0
+            self.idx = sample_idx
+        if len(self.data) < self.fill + n:
+            data = np.empty(self.fill + n + self.spare, dtype=np.complex64)
+            data[:self.fill] = self.data[:self.fill]
+            self.data = data
+        dst = self.data[self.fill:self.fill + n]
+        if samples.dtype == np.int16:
+            to_complex64(samples, dst)
+        else:
+            dst[:] = samples
+        self.fill += n
+        return contiguous
+
+    def consume(self, n):
+        """Drop the oldest n samples."""
+        if n:
+            rest = self.fill - n
+            self.data[:rest] = self.data[n:self.fill]
+            self.fill = rest
+            self.idx += n
+
+
+class SpectrumEngine:
+    """Streaming Welch power spectrum of int16 or complex64 samples.
+
+    int16 samples are scaled to full scale, complex64 samples are taken
+    as already normalised.
+
+    Samples are cut into segments of `fft_size` overlapping by `overlap`,
+    windowed and transformed in batches with one FFT call each. The power
+    of `averages` consecutive segments is averaged into one spectrum row,
+    in dBFS with DC in the middle, and handed to every sink. Each row
+    carries the sample index of its first sample. Segments continue
+    across pushed blocks; a jump in the sample index restarts the
+    averaging.
+
+    With `frame_rate` set, the number of averages is chosen so that rows
+    are produced at that rate in stream time, e.g. 25 rows per second of
+    samples for a live display.
+
+    Parameters
+    ----------
+    fft_size: int
+        samples per FFT
+    overlap: float
+        fraction of a segment shared with the next one
+    window: str
+        scipy.signal window name
+    averages: int
+        segments averaged into one row
+    center_f: float
+        center frequency in Hz
+    samp_rate: float
+        complex samples per second
+    frame_rate: float
+        rows per second of samples, overrides `averages`
+    sinks: list
+        objects with write(row, sample_idx) receiving every row
+    batch: int
+        segments transformed per FFT call
+    """
+
+    def __init__(self, fft_size=1024, overlap=0.5, window='hamming',
+                 averages=16, center_f=0.0, samp_rate=1.0, frame_rate=None,
+                 sinks=(), batch=256):
+        if not 0 <= overlap < 1:
+            raise ValueError("overlap must be in [0, 1).")
+        self.fft_size = fft_size
+        self.step = max(1, int(round(fft_size * (1 - overlap))))
+        self.window, self._norm = fft_plan(fft_size, window)
+        self.frame_rate = frame_rate
+        self.averages = averages
+        self.batch = batch
+        self._scratch = np.empty((batch, fft_size), dtype=np.complex64)
+        self._work = SampleBuffer(fft_size)
+        # Sum of squares of the real and imaginary parts of every bin
+        self._acc = np.zeros(2 * fft_size, dtype=np.float64)
+        self._count = 0
+        self._row_idx = None
+        # Sinks keep their own axis until the range is changed
+        self.sinks = []
+        self.set_frequency_range(center_f, samp_rate)
+        self.sinks = list(sinks)
+        self.rows = 0
+        self.segments = 0
+
+    def set_frequency_range(self, center_f, samp_rate):
+        """Set the center frequency and sample rate of the spectrum.
+
+        Like the fosphor and Qt sinks, this only changes the frequency axis,
+        plus the number of averages when a frame rate is set. Sinks with a
+        set_frequency_range() method are updated as well. A partly averaged
+        row and the samples of an unfinished segment belong to the old
+        range and are discarded; the next segment starts at the next
+        pushed sample.
+        """
+        self._work.consume(self._work.fill)
+        self._acc[:] = 0
+        self._count = 0
+        self.center_f = center_f
+        self.samp_rate = samp_rate
+        if self.frame_rate:
+            self.averages = max(1, int(round(
+                samp_rate / (self.frame_rate * self.step))))
+        for sink in self.sinks:
+            if hasattr(sink, 'set_frequency_range'):
+                sink.set_frequency_range(center_f, samp_rate)
+
+    def frequencies(self):
+        """Frequency of every bin of a row in Hz."""
+        return self.center_f + np.fft.fftshift(
+            np.fft.fftfreq(self.fft_size, 1.0 / self.samp_rate))
+
+    def push(self, samples, sample_idx=None):
+        """Add samples and return the rows they completed.
+
+        Parameters
+        ----------
+        samples: np.ndarray
+            interleaved int16 I/Q or complex64 samples
+        sample_idx: int
+            sample index of the first sample, None if contiguous
+
+        Returns
+        -------
+        A list of (sample_idx, row) tuples, row in dBFS
+        """
+        if not self._work.append(samples, sample_idx):
+            self._count = 0
+            self._acc[:] = 0
+        return self._process()
+
+    def _process(self):
+        rows = []
+        fs, step = self.fft_size, self.step
+        work = self._work
+        m = (work.fill - fs) // step + 1 if work.fill >= fs else 0
+        done = 0
+        while done < m:
+            if self._count == 0:
+                self._row_idx = work.idx + done * step
+            k = min(m - done, self.batch, self.averages - self._count)
+            segs = np.lib.stride_tricks.as_strided(
+                work.data[done * step:], shape=(k, fs),
+                strides=(step * 8, 8), writeable=False)
+            x = self._scratch[:k]
+            np.multiply(segs, self.window, out=x)
+            x = sp_fft.fft(x, axis=1, overwrite_x=True)
+            p = x.view(np.float32)
+            self._acc += np.einsum('ij,ij->j', p, p)
+            self._count += k
+            done += k
+            if self._count == self.averages:
+                row = self._acc.reshape(fs, 2).sum(axis=1) * \
+                    (self._norm / self._count)
+                row = 10 * np.log10(np.fft.fftshift(row) + 1e-30)
+                rows.append((self._row_idx, row.astype(np.float32)))
+                for sink in self.sinks:
+                    sink.write(rows[-1][1], self._row_idx)
+                self._acc[:] = 0
+                self._count = 0
+        self.segments += m
+        self.rows += len(rows)
+        # Keep the samples not yet fully used for the next segments
+        work.consume(m * step)
+        return rows
+
+    def stats(self) -> dict:
+        """Return a dictionary with the engine counters
+        """
+        return {
+            "rows": self.rows,
+            "segments": self.segments,
+            "averages": self.averages,
+            "pending_segments": self._count,
+        }
+
+
+class WaterfallFile:
+    """Waterfall rows stored as a compact on-disk ring of uint8 dB values.
+
+    Rows are quantised to 256 levels between `db_min` and `db_max` and
+    written to <path>.npy, a memory-mapped (n_rows, fft_size) array that
+    any NumPy program can open, with the sample index of every row in
+    <path>_idx.npy and its (center_f, samp_rate) in <path>_axis.npy, so
+    rows written before a retune keep their own frequency axis. Once full,
+    the oldest rows are overwritten; <path>.json records the newest row
+    and the current frequency axis.
+
+    Parameters
+    ----------
+    path: str
+        base name of the files
+    fft_size: int
+        bins per row
+    n_rows: int
+        capacity of the ring
+    db_min, db_max: float
+        dB range mapped to 0..255
+    center_f, samp_rate: float
+        frequency axis stored with the rows
+    """
+
+    def __init__(self, path, fft_size, n_rows=4096, db_min=-120.0,
+                 db_max=0.0, center_f=0.0, samp_rate=1.0):
+        self.path = path
+        self.db_min = db_min
+        self.db_max = db_max
+        self.center_f = center_f
+        self.samp_rate = samp_rate
+        self.rows = np.lib.format.open_memmap(
+            path + '.npy', mode='w+', dtype=np.uint8,
+            shape=(n_rows, fft_size))
+        self.sample_idx = np.lib.format.open_memmap(
+            path + '_idx.npy', mode='w+', dtype=np.int64, shape=(n_rows,))
+        self.sample_idx[:] = -1
+        self.axis = np.lib.format.open_memmap(
+            path + '_axis.npy', mode='w+', dtype=np.float64,
+            shape=(n_rows, 2))
+        self.head = 0       # Total number of rows written
+        self._scale = 255.0 / (db_max - db_min)
+
+    def set_frequency_range(self, center_f, samp_rate):
+        self.center_f = center_f
+        self.samp_rate = samp_rate
+
+    def write(self, row, sample_idx):
+        """Quantise and store one row in dB."""
+        slot = self.head % len(self.rows)
+        q = (row - self.db_min) * self._scale
+        np.clip(q, 0, 255, out=q)
+        self.rows[slot] = q
+        self.sample_idx[slot] = sample_idx
+        self.axis[slot] = self.center_f, self.samp_rate
+        self.head += 1
+
+    def frequencies(self, slot):
+        """Frequency of every bin of the row in a ring slot in Hz."""
+        center_f, samp_rate = self.axis[slot]
+        return center_f + np.fft.fftshift(
+            np.fft.fftfreq(self.rows.shape[1], 1.0 / samp_rate))
+
+    def flush(self):
+        self.rows.flush()
+        self.sample_idx.flush()
+        self.axis.flush()
+        with open(self.path + '.json', 'w') as f:
+            json.dump({"head": self.head, "n_rows": len(self.rows),
+                       "db_min": self.db_min, "db_max": self.db_max,
+                       "center_f": self.center_f,
+                       "samp_rate": self.samp_rate}, f, indent=2)
+
+    def close(self):
+        self.flush()
+        self.rows = self.sample_idx = self.axis = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
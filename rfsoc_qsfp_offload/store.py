@@ -0,0 +1,281 @@
+import datetime
+import json
+import os
+import numpy as np
+from .reassembly import Block
+
+STORE_VERSION = 1
+
+# Runs of contiguous samples in a channel's data file
+SEGMENT_DTYPE = np.dtype([
+    ('sample_idx', '<i8'),      # Sample index of the first sample
+    ('offset', '<i8'),          # Position in the data file, in samples
+    ('count', '<i8'),           # Number of samples
+    ('frequency', '<f8'),       # Center frequency in Hz
+])
+
+# Points of interest in a channel's timeline
+EVENT_DTYPE = np.dtype([
+    ('sample_idx', '<i8'),
+    ('kind', 'u1'),
+    ('value', '<f8'),
+])
+EVENT_PPS, EVENT_GAP, EVENT_RETUNE = range(3)
+EVENT_KINDS = {EVENT_PPS: 'pps', EVENT_GAP: 'gap', EVENT_RETUNE: 'retune'}
+
+
+def _seconds(t):
+    if isinstance(t, datetime.datetime):
+        return t.timestamp()
+    return float(t)
+
+
+class CaptureStoreWriter:
+    """Write channels of int16 I/Q samples to a time-indexed store.
+
+    Every channel's samples are appended to <channel>.data in the `root`
+    directory. Alongside, a compact index records the contiguous segments
+    with their position in the file, and events for every PPS boundary,
+    gap (value: missing samples) and retune (value: new frequency in Hz).
+    PPS boundaries (value: epoch second) require an integer sample rate.
+    With SAMPLE_IDX_OFFSET set by capture_next_pps the sample index counts
+    samples since the Unix epoch, which lets CaptureStore answer UTC range
+    queries.
+
+    Parameters
+    ----------
+    root: str
+        directory of the store, created if needed
+    sample_rate: float
+        complex samples per second, f_s
+    center_freq: float
+        initial center frequency in Hz, f_c_hz
+    """
+
+    def __init__(self, root, sample_rate, center_freq=float('nan')):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.sample_rate = sample_rate
+        self.center_freq = center_freq
+        self._files = {}
+        self._segments = {}
+        self._events = {}
+        self._freq = {}
+        self._next = {}
+
+    def _open(self, channel):
+        self._files[channel] = open(
+            os.path.join(self.root, f'{channel}.data'), 'wb')
+        self._segments[channel] = []
+        self._events[channel] = []
+        self._freq[channel] = self.center_freq
+        self._next[channel] = None
+
+    def write(self, channel, samples, sample_idx, frequency=None):
+        """Append interleaved int16 I/Q samples to a channel.
+
+        Parameters
+        ----------
+        channel: str
+            channel name
+        samples: np.ndarray
+            interleaved int16 I/Q samples
+        sample_idx: int
+            sample index of the first sample
+        frequency: float
+            center frequency in Hz from this sample on, if it changed
+        """
+        if channel not in self._files:
+            self._open(channel)
+        n = len(samples) // 2
+        if n == 0:
+            return
+        segments, events = self._segments[channel], self._events[channel]
+        expected = self._next[channel]
+        new_segment = sample_idx != expected
+        if expected is not None and sample_idx > expected:
+            events.append((expected, EVENT_GAP, sample_idx - expected))
+        if frequency is not None and frequency != self._freq[channel]:
+            self._freq[channel] = frequency
+            events.append((sample_idx, EVENT_RETUNE, frequency))
+            new_segment = True
+        if new_segment:
+            offset = segments[-1][1] + segments[-1][2] if segments else 0
+            segments.append([sample_idx, offset, 0, self._freq[channel]])
+        segments[-1][2] += n
+        # Whole seconds since the epoch that start within these samples
+        fs = int(self.sample_rate)
+        if fs == self.sample_rate:
+            first = -(-sample_idx // fs)
+            last = -(-(sample_idx + n) // fs)
+            events.extend((s * fs, EVENT_PPS, s) for s in range(first, last))
+        self._next[channel] = sample_idx + n
+        np.ascontiguousarray(samples, dtype=np.int16).tofile(
+            self._files[channel])
+
+    def write_block(self, channel, block):
+        """Append a Block, turning its 'rx_freq' tags into retunes."""
+        start = 0
+        freq = None
+        for idx, key, value in block.tags:
+            if key != 'rx_freq':
+                continue
+            pos = idx - block.sample_idx
+            if pos > start:
+                self.write(channel, block.samples[2 * start:2 * pos],
+                           block.sample_idx + start, freq)
+                start = pos
+            freq = value
+        self.write(channel, block.samples[2 * start:],
+                   block.sample_idx + start, freq)
+
+    def flush(self):
+        """Flush the data files and write the index.
+        """
+        for channel, f in self._files.items():
+            f.flush()
+            segments = np.array([tuple(s) for s in self._segments[channel]],
+                                dtype=SEGMENT_DTYPE)
+            events = np.array(self._events[channel], dtype=EVENT_DTYPE)
+            np.save(os.path.join(self.root, f'{channel}.segments.npy'),
+                    segments)
+            np.save(os.path.join(self.root, f'{channel}.events.npy'), events)
+        with open(os.path.join(self.root, 'store.json'), 'w') as f:
+            json.dump({"version": STORE_VERSION,
+                       "sample_rate": self.sample_rate,
+                       "center_freq": self.center_freq,
+                       "channels": list(self._files)}, f, indent=2)
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CaptureStore:
+    """Read a store written by CaptureStoreWriter.
+
+    The data files are memory-mapped, so a query touches only the pages
+    of the requested range:
+
+        store = CaptureStore('/data/capture')
+        for block in store.query('A', t_start, t_stop):
+            process(block.sample_idx, block.samples)
+
+    Parameters
+    ----------
+    root: str
+        directory of the store
+    """
+
+    def __init__(self, root):
+        self.root = root
+        with open(os.path.join(root, 'store.json')) as f:
+            info = json.load(f)
+        if info["version"] != STORE_VERSION:
+            raise ValueError(f"Unsupported store version {info['version']}.")
+        self.sample_rate = info["sample_rate"]
+        self.center_freq = info["center_freq"]
+        self.channels = info["channels"]
+        self._maps = {}
+        self._segments = {}
+        self._events = {}
+
+    def _load(self, channel):
+        if channel not in self.channels:
+            raise ValueError(f"Unknown channel {channel}.")
+        if channel not in self._maps:
+            segments = np.load(os.path.join(
+                self.root, f'{channel}.segments.npy'))
+            events = np.load(os.path.join(self.root, f'{channel}.events.npy'))
+            self._segments[channel] = np.sort(segments, order='sample_idx')
+            self._events[channel] = np.sort(events, order='sample_idx',
+                                            kind='stable')
+            path = os.path.join(self.root, f'{channel}.data')
+            self._maps[channel] = np.memmap(path, dtype=np.int16, mode='r') \
+                if os.path.getsize(path) else np.zeros(0, dtype=np.int16)
+        return self._segments[channel]
+
+    def to_sample_idx(self, t):
+        """Sample index of a UTC time given as epoch seconds or datetime."""
+        t = _seconds(t)
+        whole = int(np.floor(t))
+        return int(round(whole * self.sample_rate)) + \
+            int(round((t - whole) * self.sample_rate))
+
+    def segments(self, channel) -> np.ndarray:
+        """Return the SEGMENT_DTYPE index of a channel
+        """
+        return self._load(channel)
+
+    def events(self, channel, t_start=None, t_stop=None, kind=None):
+        """Return the events of a channel within a time range.
+
+        Returns
+        -------
+        An EVENT_DTYPE array
+        """
+        self._load(channel)
+        events = self._events[channel]
+        lo = 0 if t_start is None else np.searchsorted(
+            events['sample_idx'], self.to_sample_idx(t_start))
+        hi = len(events) if t_stop is None else np.searchsorted(
+            events['sample_idx'], self.to_sample_idx(t_stop))
+        events = events[lo:hi]
+        if kind is not None:
+            events = events[events['kind'] == kind]
+        return events
+
+    def query(self, channel, t_start, t_stop):
+        """Return the samples of a channel between two UTC times.
+
+        Parameters
+        ----------
+        channel: str
+            channel name
+        t_start, t_stop: float or datetime
+            range in seconds since the Unix epoch, t_stop excluded
+
+        Returns
+        -------
+        A list of Block objects, one per contiguous segment in the range,
+        whose samples are read-only views of the memory-mapped file and
+        whose tags hold the retunes within the block
+        """
+        return self.query_samples(channel, self.to_sample_idx(t_start),
+                                  self.to_sample_idx(t_stop))
+
+    def query_samples(self, channel, start, stop):
+        """Like query(), with the range given as sample indices."""
+        segments = self._load(channel)
+        data = self._maps[channel]
+        end = segments['sample_idx'] + segments['count']
+        lo = int(np.searchsorted(end, start, side='right'))
+        hi = int(np.searchsorted(segments['sample_idx'], stop))
+        blocks = []
+        for seg in segments[lo:hi]:
+            s0 = max(start, int(seg['sample_idx']))
+            s1 = min(stop, int(seg['sample_idx'] + seg['count']))
+            if s1 <= s0:
+                continue
+            pos = int(seg['offset']) + s0 - int(seg['sample_idx'])
+            tags = [(s0, 'rx_freq', float(seg['frequency']))]
+            blocks.append(Block(s0, data[2 * pos:2 * (pos + s1 - s0)],
+                                None, tags))
+        return blocks
+
+    def close(self):
+        self._maps = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,278 @@
+import ctypes
+import mmap
+import select
+import socket
+import struct
+import numpy as np
+from .rx import UDP_PORT, PAYLOAD_BYTES, FRAME_HEADER_BYTES
+
+# linux/if_packet.h
+SOL_PACKET = 263
+PACKET_RX_RING = 5
+PACKET_STATISTICS = 6
+PACKET_VERSION = 10
+PACKET_IGNORE_OUTGOING = 23
+TPACKET_V3 = 2
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1
+ETH_P_IP = 0x0800
+SO_ATTACH_FILTER = 26
+
+# Offsets into struct tpacket_block_desc (tpacket_hdr_v1)
+_BLOCK_STATUS = 8
+_BLOCK_NUM_PKTS = 12
+_BLOCK_FIRST_PKT = 16
+
+# struct tpacket3_hdr as a NumPy dtype
+_TPACKET3_HDR = np.dtype([
+    ('tp_next_offset', '<u4'),
+    ('tp_sec', '<u4'),
+    ('tp_nsec', '<u4'),
+    ('tp_snaplen', '<u4'),
+    ('tp_len', '<u4'),
+    ('tp_status', '<u4'),
+    ('tp_mac', '<u2'),
+    ('tp_net', '<u2'),
+])
+
+
+class _SockFilter(ctypes.Structure):
+    _fields_ = [('code', ctypes.c_uint16),
+                ('jt', ctypes.c_uint8),
+                ('jf', ctypes.c_uint8),
+                ('k', ctypes.c_uint32)]
+
+
+class _SockFprog(ctypes.Structure):
+    _fields_ = [('len', ctypes.c_uint16),
+                ('filter', ctypes.POINTER(_SockFilter))]
+
+
+def stream_filter(port=UDP_PORT, payload_bytes=PAYLOAD_BYTES):
+    """Classic BPF program accepting only adc_to_udp_stream frames.
+
+    Matches unfragmented IPv4/UDP frames to destination `port` whose UDP
+    length matches a payload of `payload_bytes`.
+
+    Returns
+    -------
+    A list of (code, jt, jf, k) instructions
+    """
+    prog = [
+        (0x28, 0, 0, 12),                   # ldh [12]            ethertype
+        (0x15, 0, 0, ETH_P_IP),             # jeq #0x800
+        (0x30, 0, 0, 23),                   # ldb [23]            protocol
+        (0x15, 0, 0, socket.IPPROTO_UDP),   # jeq #17
+        (0x28, 0, 0, 20),                   # ldh [20]            fragment
+        (0x45, 0, 0, 0x3fff),               # jset #0x3fff        MF, offset
+        (0xb1, 0, 0, 14),                   # ldxb 4*([14]&0xf)   IP hlen
+        (0x48, 0, 0, 16),                   # ldh [x+16]          dst port
+        (0x15, 0, 0, port),                 # jeq #port
+        (0x48, 0, 0, 18),                   # ldh [x+18]          UDP length
+        (0x15, 0, 0, 8 + payload_bytes),    # jeq #length
+        (0x06, 0, 0, 0x40000),              # ret #262144         accept
+        (0x06, 0, 0, 0),                    # ret #0              reject
+    ]
+    # Point the failing branch of every test at the final reject
+    reject = len(prog) - 1
+    for i, (code, _, _, k) in enumerate(prog):
+        if code == 0x15:
+            prog[i] = (code, 0, reject - i - 1, k)
+        elif code == 0x45:
+            prog[i] = (code, reject - i - 1, 0, k)
+    return prog
+
+
+class TPacketReceiver:
+    """Receive adc_to_udp_stream frames from a TPACKET_V3 mmap ring.
+
+    The kernel writes matching frames straight into a ring of blocks
+    shared with user space, bypassing the UDP stack. recv() returns the
+    payloads of one block as a zero-copy strided view of the ring; the
+    block is handed back to the kernel on the next call to recv(). Frames
+    the kernel could not store because the ring was full are reported as
+    drops. Opening the socket requires CAP_NET_RAW.
+
+    Parameters
+    ----------
+    interface: str
+        capture interface, e.g. the QSFP port of the host NIC
+    port: int
+        UDP destination port of the stream
+    block_size: int
+        size of each ring block in bytes, a multiple of the page size
+    block_nr: int
+        number of blocks in the ring
+    timeout_ms: int
+        time after which the kernel retires a partially filled block
+    """
+
+    def __init__(self, interface, port=UDP_PORT, block_size=1 << 22,
+                 block_nr=64, timeout_ms=10):
+        self.interface = interface
+        self.port = port
+        self.block_size = block_size
+        self.block_nr = block_nr
+        frame_size = 1 << (PAYLOAD_BYTES + FRAME_HEADER_BYTES + 128
+                           ).bit_length()
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW,
+                             socket.htons(ETH_P_IP))
+        try:
+            self._attach_filter(sock, stream_filter(port))
+            sock.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+            try:
+                sock.setsockopt(SOL_PACKET, PACKET_IGNORE_OUTGOING, 1)
+            except OSError:
+                pass
+            req = struct.pack('7I', block_size, block_nr, frame_size,
+                              block_size // frame_size * block_nr,
+                              timeout_ms, 0, 0)
+            sock.setsockopt(SOL_PACKET, PACKET_RX_RING, req)
+            sock.bind((interface, ETH_P_IP))
+            self._map = mmap.mmap(sock.fileno(), block_size * block_nr,
+                                  mmap.MAP_SHARED,
+                                  mmap.PROT_READ | mmap.PROT_WRITE)
+        except Exception:
+            sock.close()
+            raise
+        self.sock = sock
+        self.ring = np.frombuffer(self._map, dtype=np.uint8).reshape(
+            block_nr, block_size)
+        self._status = self.ring.view('<u4')[:, _BLOCK_STATUS // 4]
+        self._poll = select.poll()
+        self._poll.register(sock.fileno(), select.POLLIN | select.POLLERR)
+        self._block = 0
+        self._held = None
+        self._scratch = None
+        self.packets = 0
+        self.blocks = 0
+        self.irregular_blocks = 0
+        self.drops = 0
+        self.freeze_count = 0
+
+    @staticmethod
+    def _attach_filter(sock, prog):
+        insns = (_SockFilter * len(prog))(*[_SockFilter(*i) for i in prog])
+        fprog = _SockFprog(len(prog), insns)
+        sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER,
+                        bytes(memoryview(fprog)))
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def _release(self):
+        if self._held is not None:
+            self._status[self._held] = TP_STATUS_KERNEL
+            self._held = None
+
+    def recv(self, timeout=None):
+        """Return the payloads of the next filled block.
+
+        The previously returned block is released back to the kernel, so
+        its view must not be used after this call.
+
+        Parameters
+        ----------
+        timeout: float
+            seconds to wait for a block, None blocks forever
+
+        Returns
+        -------
+        A (n, PAYLOAD_BYTES) uint8 view of the ring, n may be zero if the
+        timeout expired
+        """
+        self._release()
+        b = self._block
+        if not self._status[b] & TP_STATUS_USER:
+            wait_ms = None if timeout is None else int(timeout * 1000)
+            self._poll.poll(wait_ms)
+            if not self._status[b] & TP_STATUS_USER:
+                return self.ring[b, :0].reshape(0, PAYLOAD_BYTES)
+        self._held = b
+        self._block = (b + 1) % self.block_nr
+        self.blocks += 1
+        payloads = self._block_payloads(self.ring[b])
+        self.packets += len(payloads)
+        return payloads
+
+    def _block_payloads(self, block):
+        desc = block[:_BLOCK_FIRST_PKT + 4].view('<u4')
+        num = int(desc[_BLOCK_NUM_PKTS // 4])
+        first = int(desc[_BLOCK_FIRST_PKT // 4])
+        if num == 0:
+            return block[:0].reshape(0, PAYLOAD_BYTES)
+        hdr0 = block[first:first + _TPACKET3_HDR.itemsize].view(
+            _TPACKET3_HDR)[0]
+        stride = int(hdr0['tp_next_offset']) or self.block_size
+        offset = first + int(hdr0['tp_mac']) + FRAME_HEADER_BYTES
+        # All frames have the same length, so they are evenly spaced
+        last = first + (num - 1) * stride
+        if last + PAYLOAD_BYTES + FRAME_HEADER_BYTES > self.block_size:
+            return self._gather(block, num, first)
+        hdrs = np.ndarray((num,), dtype=_TPACKET3_HDR, buffer=block,
+                          offset=first, strides=(stride,))
+        if (hdrs['tp_next_offset'][:-1] == stride).all() and \
+                (hdrs['tp_mac'] == hdr0['tp_mac']).all() and \
+                (hdrs['tp_snaplen'] ==
+                 PAYLOAD_BYTES + FRAME_HEADER_BYTES).all():
+            return np.ndarray((num, PAYLOAD_BYTES), dtype=np.uint8,
+                              buffer=block, offset=offset,
+                              strides=(stride, 1))
+        return self._gather(block, num, first)
+
+    def _gather(self, block, num, first):
+        """Copy the frames of an irregular block into a scratch buffer."""
+        self.irregular_blocks += 1
+        if self._scratch is None or len(self._scratch) < num:
+            self._scratch = np.zeros((num, PAYLOAD_BYTES), dtype=np.uint8)
+        n = 0
+        pos = first
+        for _ in range(num):
+            hdr = block[pos:pos + _TPACKET3_HDR.itemsize].view(
+                _TPACKET3_HDR)[0]
+            start = pos + int(hdr['tp_mac']) + FRAME_HEADER_BYTES
+            length = int(hdr['tp_snaplen']) - FRAME_HEADER_BYTES
+            if length == PAYLOAD_BYTES:
+                self._scratch[n] = block[start:start + PAYLOAD_BYTES]
+                n += 1
+            pos += int(hdr['tp_next_offset'])
+        return self._scratch[:n]
+
+    def _update_drops(self):
+        # struct tpacket_stats_v3, reading resets the kernel counters
+        raw = self.sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, 12)
+        _, drops, freeze = struct.unpack('3I', raw)
+        self.drops += drops
+        self.freeze_count += freeze
+
+    def stats(self) -> dict:
+        """Return a dictionary with the ring receive counters
+
+        'drops' counts frames lost because the ring was full.
+        """
+        self._update_drops()
+        return {
+            "packets": self.packets,
+            "blocks": self.blocks,
+            "irregular_blocks": self.irregular_blocks,
+            "drops": self.drops,
+            "freeze_count": self.freeze_count,
+        }
+
+    def close(self):
+        self._release()
+        self._poll.unregister(self.sock.fileno())
+        self._status = None
+        self.ring = None
+        try:
+            self._map.close()
+        except BufferError:
+            # Views are still held by the caller, unmapped once released
+            pass
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,231 @@
+import numpy as np
+from .convert import FULL_SCALE
+
+
+class Burst:
+    """A recorded burst.
+
+    Attributes
+    ----------
+    start: int
+        sample index of the first recorded sample, including pre-roll
+    stop: int
+        sample index after the last recorded sample, including post-roll
+    trigger: int
+        sample index of the frame that triggered the burst
+    peak_dbfs: float
+        highest frame power during the burst
+    floor_dbfs: float
+        noise floor when the burst triggered
+    """
+
+    __slots__ = ('start', 'stop', 'trigger', 'peak_dbfs', 'floor_dbfs')
+
+    def __init__(self, start, trigger, floor_dbfs):
+        self.start = start
+        self.stop = start
+        self.trigger = trigger
+        self.peak_dbfs = -np.inf
+        self.floor_dbfs = floor_dbfs
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __repr__(self):
+        return (f'Burst(start={self.start}, stop={self.stop}, '
+                f'peak_dbfs={self.peak_dbfs:.1f})')
+
+
+class BurstTrigger:
+    """Pass only energy bursts of a sample stream on to a sink.
+
+    The power of every frame of `frame_samples` samples is compared with
+    `threshold_dbfs`, or, if that is None, with the tracked noise floor
+    plus `snr_db`. A frame above it starts a burst, which is written to
+    `sink` from `pre_samples` before the frame, taken from a pre-trigger
+    ring, until `post_samples` after the last frame above it. The noise
+    floor follows the median power of the quiet frames of every block.
+
+    The sink is any object with write(samples, sample_idx), e.g. a
+    SigMFRecorder, which starts a new capture at every burst. Finished
+    bursts are listed with their sample indices in `bursts`.
+
+    Parameters
+    ----------
+    sink: object
+        receives the samples of the bursts
+    frame_samples: int
+        samples per power estimate
+    pre_samples: int
+        samples recorded before the triggering frame
+    post_samples: int
+        samples recorded after the last frame above the threshold
+    threshold_dbfs: float
+        absolute trigger level, None to trigger relative to the floor
+    snr_db: float
+        trigger level above the noise floor
+    floor_alpha: float
+        weight of each block in the noise floor average
+    """
+
+    def __init__(self, sink, frame_samples=1024, pre_samples=1 << 16,
+                 post_samples=1 << 16, threshold_dbfs=None, snr_db=10.0,
+                 floor_alpha=0.05):
+        self.sink = sink
+        self.frame_samples = frame_samples
+        self.pre_samples = pre_samples
+        self.post_samples = post_samples
+        self.threshold_dbfs = threshold_dbfs
+        self.snr_db = snr_db
+        self.floor_alpha = floor_alpha
+        self._ring = np.zeros(2 * pre_samples, dtype=np.int16)
+        self._ring_end = None       # Sample index after the newest in ring
+        self._ring_fill = 0
+        self._floor = None          # Linear power relative to full scale
+        self._burst = None
+        self._stop_at = None
+        self._written = None        # Sample index after the last written
+        self.bursts = []
+        self.samples = 0
+        self.written_samples = 0
+
+    @property
+    def noise_floor_dbfs(self):
+        return None if self._floor is None else \
+            float(10 * np.log10(self._floor))
+
+    def frame_power(self, samples):
+        """Return the mean power of every frame relative to full scale."""
+        x = samples.reshape(-1, self.frame_samples * 2).astype(np.float32)
+        p = np.einsum('ij,ij->i', x, x) / (self.frame_samples *
+                                           float(FULL_SCALE) ** 2)
+        return p
+
+    def push(self, samples, sample_idx):
+        """Process a block of interleaved int16 I/Q samples.
+
+        Parameters
+        ----------
+        samples: np.ndarray
+            interleaved int16 I/Q samples, a multiple of frame_samples
+        sample_idx: int
+            sample index of the first sample
+
+        Returns
+        -------
+        A list of the bursts finished by this block
+        """
+        n = len(samples) // 2
+        if n % self.frame_samples:
+            raise ValueError(
+                f"Block length must be a multiple of {self.frame_samples}.")
+        done = []
+        if n == 0:
+            return done
+        sample_idx = int(sample_idx)
+        if self._ring_end is not None and sample_idx != self._ring_end:
+            # Discontinuity: end the burst and forget the pre-trigger ring
+            self._end(done)
+            self._ring_fill = 0
+        power = self.frame_power(samples)
+        self._update_floor(power)
+        level = self.threshold_dbfs if self.threshold_dbfs is not None \
+            else self.noise_floor_dbfs + self.snr_db
+        hot = power > 10 ** (level / 10)
+        fs = self.frame_samples
+        pos = sample_idx
+        # Runs of consecutive frames above the threshold
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], hot, [0])))
+                               ).tolist()
+        for first, last in zip(edges[0::2], edges[1::2]):
+            start = sample_idx + first * fs
+            if self._burst is not None and start >= self._stop_at:
+                pos = self._write(samples, sample_idx, pos, self._stop_at)
+                self._end(done)
+            if self._burst is None:
+                self._burst = Burst(start, start, self.noise_floor_dbfs)
+                pos = self._pre_roll(samples, sample_idx, start)
+            self._burst.peak_dbfs = max(
+                self._burst.peak_dbfs,
+                float(10 * np.log10(power[first:last].max())))
+            self._stop_at = sample_idx + last * fs + self.post_samples
+        if self._burst is not None:
+            end = sample_idx + n
+            pos = self._write(samples, sample_idx, pos,
+                              min(self._stop_at, end))
+            if self._stop_at <= end:
+                self._end(done)
+        self._keep(samples, sample_idx + n)
+        self.samples += n
+        return done
+
+    def _update_floor(self, power):
+        hot = power > self._floor * 10 ** (self.snr_db / 10) \
+            if self._floor is not None else np.zeros(len(power), dtype=bool)
+        quiet = power[~hot]
+        if len(quiet) == 0:
+            return
+        level = max(float(np.median(quiet)), 1e-20)
+        self._floor = level if self._floor is None else \
+            (1 - self.floor_alpha) * self._floor + self.floor_alpha * level
+
+    def _pre_roll(self, samples, sample_idx, trigger):
+        """Write the samples before a trigger, return the write position."""
+        start = max(trigger - self.pre_samples, sample_idx - self._ring_fill)
+        if self._written is not None:
+            start = max(start, self._written)
+        self._burst.start = start
+        if start < sample_idx:
+            # Older samples come from the ring, which ends at sample_idx
+            ring = self._ring[2 * (self.pre_samples - (sample_idx - start)):]
+            self._emit(ring, start)
+            start = sample_idx
+        return self._write(samples, sample_idx, start, trigger)
+
+    def _write(self, samples, sample_idx, start, stop):
+        if stop > start:
+            self._emit(samples[2 * (start - sample_idx):
+                               2 * (stop - sample_idx)], start)
+        return max(start, stop)
+
+    def _emit(self, samples, sample_idx):
+        self.sink.write(samples, sample_idx)
+        n = len(samples) // 2
+        self.written_samples += n
+        self._written = sample_idx + n
+        self._burst.stop = self._written
+
+    def _end(self, done):
+        if self._burst is not None:
+            self.bursts.append(self._burst)
+            done.append(self._burst)
+            self._burst = None
+
+    def _keep(self, samples, end):
+        """Keep the newest pre_samples samples in the pre-trigger ring."""
+        m = min(len(samples), 2 * self.pre_samples)
+        if m:
+            self._ring[:-m] = self._ring[m:]
+            self._ring[-m:] = samples[-m:]
+        self._ring_fill = min(self.pre_samples, self._ring_fill + m // 2)
+        self._ring_end = end
+
+    def flush(self):
+        """End the current burst at the last processed sample.
+        """
+        done = []
+        self._end(done)
+        return done
+
+    def stats(self) -> dict:
+        """Return a dictionary with the trigger counters
+        """
+        return {
+            "samples": self.samples,
+            "written_samples": self.written_samples,
+            "bursts": len(self.bursts) + (self._burst is not None),
+            "recording": self._burst is not None,
+            "noise_floor_dbfs": self.noise_floor_dbfs,
+            "duty": self.written_samples / self.samples if self.samples
+            else 0.0,
+        }
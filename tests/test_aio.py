@@ -0,0 +1,67 @@
+import asyncio
+import socket
+import numpy as np
+import pytest
+from rfsoc_qsfp_offload.aio import SampleStream
+from rfsoc_qsfp_offload.replay import packetize
+from rfsoc_qsfp_offload.rx import PACKET_SAMPLES, Receiver
+
+N_PACKETS = 20
+BLOCK = 2 * PACKET_SAMPLES
+
+
+def stream(policy, consume=2, **kwargs):
+    """Queue N_PACKETS on loopback, then read them as 2-packet blocks.
+
+    The stream is closed after `consume` blocks; returns the packet index
+    and first value of every block and the stats.
+    """
+    async def run():
+        rx = Receiver(port=0, host='127.0.0.1', slots=256, batch=64)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(rx.sock.getsockname())
+            x = np.repeat(np.arange(N_PACKETS, dtype=np.int16),
+                          2 * PACKET_SAMPLES)
+            for p in packetize(x, 0, 1e6):
+                s.send(p)
+        out = []
+        async with SampleStream(rx, block_samples=BLOCK, policy=policy,
+                                **kwargs) as st:
+            async for b in st:
+                out.append((b.sample_idx // PACKET_SAMPLES,
+                            int(b.samples[0])))
+                if len(out) == consume:
+                    st.close()
+        rx.close()
+        return out, st.stats()
+    return asyncio.run(run())
+
+
+def test_all_blocks_in_order():
+    # One recv() takes every packet, the blocks pause only later reads
+    out, stats = stream('block', max_blocks=3)
+    assert out == [(i, i) for i in range(0, N_PACKETS, 2)]
+    assert stats["delivered_samples"] == N_PACKETS * PACKET_SAMPLES
+    assert stats["dropped_samples"] == stats["gap_samples"] == 0
+
+
+@pytest.mark.parametrize("policy", ['drop_oldest', 'drop_newest'])
+def test_overload_policies(policy):
+    out, stats = stream(policy, max_blocks=3)
+    first = [i for i, _ in out]
+    assert all(i == v for i, v in out)
+    assert first == sorted(first)
+    if policy == 'drop_oldest':
+        assert 0 not in first and first[-1] == N_PACKETS - 2
+    else:
+        assert first[:3] == [0, 2, 4]
+    assert stats["dropped_blocks"] > 0
+    assert stats["delivered_samples"] + stats["dropped_samples"] == \
+        N_PACKETS * PACKET_SAMPLES
+
+
+def test_rejects_bad_arguments():
+    with pytest.raises(ValueError):
+        SampleStream(object(), policy='drop_all')
+    with pytest.raises(ValueError):
+        SampleStream(object(), block_samples=100)
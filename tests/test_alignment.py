@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from scipy import signal
+from rfsoc_qsfp_offload.alignment import AlignmentChecker, cross_delay
+
+
+def noise(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(n) + 1j * rng.standard_normal(n)).astype(
+        np.complex64)
+
+
+def delayed(x, delay):
+    """x delayed by a fractional number of samples."""
+    f = np.fft.fftfreq(len(x))
+    return np.fft.ifft(np.fft.fft(x) * np.exp(-2j * np.pi * f * delay)
+                       ).astype(np.complex64)
+
+
+@pytest.mark.parametrize('delay', [0.0, 3.0, -7.0, 2.25])
+def test_cross_delay(delay):
+    x = noise(1 << 15)
+    # Band-limit the noise so fractional delays are well defined
+    x = signal.lfilter(signal.firwin(63, 0.5), 1, x).astype(np.complex64)
+    lag, coherence = cross_delay(x, delayed(x, delay))
+    assert lag == pytest.approx(delay, abs=0.05)
+    assert coherence > 0.95
+
+
+def test_uncorrelated_inputs_have_low_coherence():
+    _, coherence = cross_delay(noise(1 << 15, 1), noise(1 << 15, 2))
+    assert coherence < 0.1
+
+
+def test_checker_aligns_by_header_sample_idx():
+    x = noise(1 << 15)
+    # B started 100 samples later and lags A by 5 samples
+    captures = {"A": (1000, x), "B": (1100, np.roll(x, 5)[100:])}
+    report, = AlignmentChecker(245.76e6).measure(captures)
+    assert (report["a"], report["b"]) == ("A", "B")
+    assert report["sample_idx"] == 1100
+    assert report["delay_samples"] == pytest.approx(5.0, abs=0.05)
+    assert report["delay_s"] == pytest.approx(5 / 245.76e6)
+
+
+def test_checker_needs_overlap():
+    with pytest.raises(ValueError):
+        AlignmentChecker(1.0, segment=4096).measure(
+            {"A": (0, noise(5000)), "B": (2000, noise(5000))})
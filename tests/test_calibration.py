@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from rfsoc_qsfp_offload.calibration import CalibrationProfile, \
+    ChannelCorrection, fit_tone, tone_frequency
+
+RATE = 245.76e6
+TONE = 1.234e6
+
+
+def capture(gain, image=0j, dc=0j, n=1 << 14):
+    """A tone received with the given gain, IQ image and DC offset."""
+    s = np.exp(2j * np.pi * TONE / RATE * np.arange(n))
+    return (gain * s + image * s.conj() + dc).astype(np.complex64)
+
+
+# TONE / RATE = 617 / 122880, so the tone is back at phase 0 at multiples
+# of 122880 samples, also far beyond the float64 mantissa
+@pytest.mark.parametrize('sample_idx', [0, 122880, 122880 * 10 ** 12])
+def test_fit_tone(sample_idx):
+    fit = fit_tone(capture(0.5j, 0.01, 0.02 - 0.01j), TONE, RATE,
+                   sample_idx)
+    assert fit["gain"] == pytest.approx(0.5j, abs=1e-5)
+    assert fit["image"] == pytest.approx(0.01, abs=1e-5)
+    assert fit["dc"] == pytest.approx(0.02 - 0.01j, abs=1e-5)
+    assert fit["snr_db"] > 100
+
+
+def test_tone_frequency():
+    assert tone_frequency(capture(0.5), RATE) == pytest.approx(TONE, abs=500)
+
+
+def test_correction_inverts_the_fit():
+    gain, image, dc = 0.4 * np.exp(0.3j), 0.02 - 0.01j, 0.05j
+    corr = ChannelCorrection.from_fit(gain, image, dc)
+    y = corr.apply(capture(gain, image, dc))
+    np.testing.assert_allclose(y, capture(1.0), atol=1e-4)
+
+
+def test_profile_matches_channels(tmp_path):
+    captures = {"A": capture(0.5), "B": capture(0.25 * np.exp(1j), 0.01)}
+    profile = CalibrationProfile.estimate(captures, RATE)
+    summary = profile.summary()
+    assert summary["B"]["gain_db"] == pytest.approx(-6.02, abs=0.01)
+    assert summary["B"]["phase_deg"] == pytest.approx(57.3, abs=0.1)
+    path = str(tmp_path / "cal.json")
+    profile.save(path)
+    loaded = CalibrationProfile.load(path)
+    b = loaded.apply("B", capture(0.25 * np.exp(1j), 0.01))
+    np.testing.assert_allclose(b, captures["A"], atol=1e-4)
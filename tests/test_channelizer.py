@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from rfsoc_qsfp_offload.channelizer import Channelizer
+
+
+def tone(freq, n):
+    return np.exp(2j * np.pi * freq * np.arange(n)).astype(np.complex64)
+
+
+@pytest.mark.parametrize('k', [0, 3, 13])
+def test_tone_lands_in_its_channel(k):
+    m = 16
+    ch = Channelizer(m)
+    out = ch.push(tone(k / m, 64 * m))
+    power = np.mean(np.abs(out[20:]) ** 2, axis=0)
+    assert int(np.argmax(power)) == k
+    assert power[k] == pytest.approx(1.0, rel=0.05)
+    others = np.delete(power, [k, (k - 1) % m, (k + 1) % m])
+    assert 10 * np.log10(others.max() / power[k]) < -60
+
+
+def test_blocks_match_one_shot():
+    m = 8
+    rng = np.random.default_rng(0)
+    x = (rng.standard_normal(4003) + 1j * rng.standard_normal(4003)).astype(
+        np.complex64)
+    whole = Channelizer(m).push(x).copy()
+    ch = Channelizer(m)
+    parts = [ch.push(x[i:i + 501]).copy() for i in range(0, len(x), 501)]
+    np.testing.assert_allclose(np.concatenate(parts), whole, atol=1e-5)
+    assert ch.stats()["pending_samples"] == len(x) % m
+
+
+def test_channel_subset_matches_full_bank():
+    m = 32
+    rng = np.random.default_rng(1)
+    x = (rng.standard_normal(32 * m) + 1j * rng.standard_normal(32 * m)
+         ).astype(np.complex64)
+    full = Channelizer(m).push(x).copy()
+    subset = Channelizer(m, channels=[2, 30])
+    assert subset._dft is not None
+    np.testing.assert_allclose(subset.push(x), full[:, [2, 30]], atol=1e-4)
+
+
+def test_channel_frequencies():
+    ch = Channelizer(4, channels=[0, 1, 3])
+    assert ch.channel_frequencies(400.0).tolist() == [0.0, 100.0, -100.0]
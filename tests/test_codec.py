@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from rfsoc_qsfp_offload.codec import CODECS, decode, encode, pack14, unpack14
+
+
+def adc_samples(n, seed=0):
+    """Interleaved 14-bit I/Q of a tone in noise, MSB aligned."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    iq = np.empty(2 * n)
+    iq[0::2] = 3000 * np.cos(0.05 * t) + rng.normal(0, 20, n)
+    iq[1::2] = 3000 * np.sin(0.05 * t) + rng.normal(0, 20, n)
+    return (np.round(iq).astype(np.int16) << 2).astype(np.int16)
+
+
+@pytest.mark.parametrize("codec", CODECS)
+@pytest.mark.parametrize("n", [0, 1, 3, 1000])
+def test_round_trip(codec, n):
+    x = adc_samples(n)
+    y = decode(encode(x, codec))
+    assert y.dtype == np.int16
+    np.testing.assert_array_equal(y, x)
+
+
+@pytest.mark.parametrize("codec", ['raw', 'zlib', 'lzma'])
+def test_lossless_for_any_int16(codec):
+    x = np.random.default_rng(1).integers(-32768, 32768, 2001,
+                                          dtype=np.int16)
+    x[:4] = [-32768, 32767, -32768, 32767]
+    np.testing.assert_array_equal(decode(encode(x, codec)), x)
+
+
+def test_pack14_extremes_and_size():
+    x = np.array([-32768, 32764, -4, 0, 4, 8192, -8192], dtype=np.int16)
+    packed = pack14(x)
+    assert len(packed) == 14
+    np.testing.assert_array_equal(unpack14(packed, len(x)), x)
+
+
+def test_pack14_rejects_low_bits():
+    with pytest.raises(ValueError):
+        pack14(np.array([1, 0, 0, 0], dtype=np.int16))
+
+
+def test_compression_beats_packing_on_adc_data():
+    x = adc_samples(1 << 14)
+    sizes = {c: len(encode(x, c)) for c in CODECS}
+    assert sizes['pack14'] < 0.9 * sizes['raw']
+    assert sizes['zlib'] < sizes['pack14']
+
+
+def test_rejects_bad_input():
+    with pytest.raises(ValueError):
+        encode(np.zeros(4, dtype=np.int16), 'gzip')
+    with pytest.raises(ValueError):
+        decode(b'XXXX' + bytes(12))
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from rfsoc_qsfp_offload.convert import FORMATS, FULL_SCALE, SampleConverter, \
+    as_complex_int16, scale_inplace, to_complex64, to_complex_float16
+from rfsoc_qsfp_offload.replay import packetize
+from rfsoc_qsfp_offload.rx import PACKET_SAMPLES, payload_samples
+
+SAMPLES = np.array([0, 1, -2, 3, FULL_SCALE - 1, -FULL_SCALE, 100, -100],
+                   dtype=np.int16)
+EXPECTED = (SAMPLES[0::2] + 1j * SAMPLES[1::2]) / FULL_SCALE
+
+
+def test_to_complex64():
+    out = to_complex64(SAMPLES)
+    assert out.dtype == np.complex64
+    np.testing.assert_allclose(out, EXPECTED, rtol=1e-7)
+
+
+def test_to_complex64_into_out():
+    out = np.empty(4, dtype=np.complex64)
+    assert to_complex64(SAMPLES, out, scale=1.0) is out
+    np.testing.assert_array_equal(out, EXPECTED * FULL_SCALE)
+
+
+def test_to_complex_float16():
+    out = to_complex_float16(SAMPLES)
+    np.testing.assert_allclose(out['re'], EXPECTED.real, atol=1e-3)
+    np.testing.assert_allclose(out['im'], EXPECTED.imag, atol=1e-3)
+
+
+def test_as_complex_int16_is_a_view():
+    view = as_complex_int16(SAMPLES)
+    assert np.shares_memory(view, SAMPLES)
+    assert view['re'].tolist() == SAMPLES[0::2].tolist()
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_converter_accepts_batches(fmt):
+    conv = SampleConverter(fmt, max_samples=8)
+    flat = conv.convert(SAMPLES).copy()
+    batched = conv.convert(SAMPLES.reshape(2, 4))
+    assert batched.shape == (2, 2)
+    np.testing.assert_array_equal(batched.reshape(-1), flat)
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_converter_reads_payloads_in_place(fmt):
+    samples = np.arange(2 * PACKET_SAMPLES * 4).astype(np.int16)
+    payloads = packetize(samples, 0, 1e6)
+    view = payload_samples(payloads)
+    assert not view.flags.c_contiguous
+    conv = SampleConverter(fmt, max_samples=4 * PACKET_SAMPLES)
+    out = conv.convert(view)
+    assert out.shape == (4, PACKET_SAMPLES)
+    if fmt == 'complex_int16':
+        assert np.shares_memory(out, payloads)
+        assert out['im'].reshape(-1).tolist() == samples[1::2].tolist()
+    else:
+        assert np.shares_memory(out, conv._out)
+        expected = to_complex64(samples).reshape(4, -1)
+        got = out if fmt == 'complex64' else \
+            out['re'].astype(np.float32) + 1j * out['im'].astype(np.float32)
+        np.testing.assert_allclose(got, expected, atol=1e-3)
+
+
+def test_converter_rejects_strided_pairs():
+    with pytest.raises(ValueError):
+        SampleConverter('complex_int16').convert(SAMPLES[::2])
+
+
+def test_converter_limit():
+    with pytest.raises(ValueError):
+        SampleConverter('complex64', max_samples=2).convert(SAMPLES)
+
+
+def test_scale_inplace():
+    out = scale_inplace(to_complex64(SAMPLES), 2.0)
+    np.testing.assert_allclose(out, 2 * EXPECTED, rtol=1e-7)
+    half = scale_inplace(to_complex_float16(SAMPLES), 0.5)
+    np.testing.assert_allclose(half[0::2], EXPECTED.real / 2, atol=1e-3)
+
+
+def test_scale_inplace_rejects_integers():
+    with pytest.raises(ValueError):
+        scale_inplace(SAMPLES.copy(), 0.5)
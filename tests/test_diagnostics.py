@@ -0,0 +1,51 @@
+import socket
+import numpy as np
+from rfsoc_qsfp_offload.diagnostics import (PACKET_TRUESIZE, LossMonitor,
+                                            preflight, socket_counters)
+from rfsoc_qsfp_offload.replay import packetize
+from rfsoc_qsfp_offload.rx import PACKET_SAMPLES, Receiver
+
+
+def send(rx, payloads):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        for p in payloads:
+            s.sendto(p, rx.sock.getsockname())
+
+
+def packets(first, n):
+    x = np.zeros(2 * PACKET_SAMPLES * n, dtype=np.int16)
+    return packetize(x, first * PACKET_SAMPLES, 1e6)
+
+
+def test_preflight():
+    with Receiver(port=0, host='127.0.0.1', rcvbuf=1 << 16) as rx:
+        # 1000 packets per second, 50 ms of them
+        ok = preflight(rx, 1000 * PACKET_SAMPLES)
+        assert ok["required"] == 50 * PACKET_TRUESIZE
+        assert ok["rcvbuf"] >= 1 << 16
+        short = preflight(rx, 1000 * PACKET_SAMPLES, headroom_s=10.0)
+        assert short["warnings"]
+        assert short["buffered_s"] == ok["buffered_s"] < 10.0
+
+
+def test_loss_is_split_into_socket_and_upstream():
+    with Receiver(port=0, host='127.0.0.1', rcvbuf=4 * PACKET_TRUESIZE,
+                  slots=256) as rx:
+        mon = LossMonitor(rx)
+        assert socket_counters(rx)["rx_queue"] == 0
+        # Packets 10..19 are never sent, the socket overflows on 20..59 and
+        # packet 60 closes the gap left by the overflow
+        for first, n in ((0, 10), (20, 40), (60, 1)):
+            send(rx, packets(first, n))
+            while True:
+                payloads = rx.recv(timeout=0.05)
+                if not len(payloads):
+                    break
+                mon.update(payloads)
+        snap = mon.snapshot()
+    layers = snap["layers"]
+    assert layers["socket"] > 0
+    assert snap["received"] + snap["lost"] == 61
+    assert layers["upstream"] + layers["socket"] == snap["lost"]
+    assert layers["upstream"] == 10
+    assert layers["nic"] == layers["application"] == 0
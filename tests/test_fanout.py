@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from rfsoc_qsfp_offload.fanout import FanoutReader, FanoutWriter
+
+BLOCK = 16
+
+
+def block(i):
+    return np.full(2 * BLOCK, i, dtype=np.int16)
+
+
+@pytest.fixture
+def writer():
+    with FanoutWriter(n_slots=4, block_samples=BLOCK, max_readers=2) as w:
+        yield w
+
+
+def test_readers_keep_their_own_cursor(writer):
+    writer.write(block(0), 0)
+    with FanoutReader(writer.name, 'oldest') as old, \
+            FanoutReader(writer.name) as new:
+        writer.write(block(1), BLOCK)
+        assert [old.read(0).sample_idx, old.read(0).sample_idx] == \
+            [0, BLOCK]
+        b = new.read(0)
+        assert b.sample_idx == BLOCK and (b.samples == 1).all()
+        assert new.read(0) is None
+        assert sorted((r["lag_blocks"], r["blocks"])
+                      for r in writer.readers().values()) == [(0, 1), (0, 2)]
+    assert writer.readers() == {}
+
+
+def test_overrun_and_torn_blocks(writer):
+    with FanoutReader(writer.name) as r:
+        for i in range(3):
+            writer.write(block(i), i * BLOCK)
+        assert r.read(0).sample_idx == 0
+        # The ring holds n_slots - 1 readable blocks; the held one is reused
+        for i in range(3, 8):
+            writer.write(block(i), i * BLOCK)
+        assert r.read(0).sample_idx == 5 * BLOCK
+        assert (r.overruns, r.torn) == (4, 1)
+        entry, = writer.readers().values()
+        assert (entry["overruns"], entry["torn"]) == (4, 1)
+
+
+def test_reader_table_full_and_bad_name(writer):
+    readers = [FanoutReader(writer.name) for _ in range(3)]
+    assert len(writer.readers()) == 2
+    for r in readers:
+        r.detach()
+    with pytest.raises(ValueError):
+        with FanoutWriter(n_slots=1, block_samples=1) as other:
+            other._shared.control[0] = 0
+            FanoutReader(other.name)
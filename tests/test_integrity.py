@@ -0,0 +1,40 @@
+import numpy as np
+from rfsoc_qsfp_offload.integrity import StreamIntegrity, decode_packet_index
+from rfsoc_qsfp_offload.replay import packetize
+from rfsoc_qsfp_offload.rx import PACKET_SAMPLES
+
+
+def test_packet_index_from_sample_idx():
+    payloads = packetize(np.ones(2 * PACKET_SAMPLES * 4, dtype=np.int16),
+                         (1 << 40) * PACKET_SAMPLES, 1e6)
+    assert list(decode_packet_index(payloads)) == \
+        [(1 << 40) + i for i in range(4)]
+
+
+def test_contiguous_stream_has_no_loss():
+    s = StreamIntegrity()
+    s.update(np.arange(100))
+    s.update(np.arange(100, 250))
+    assert (s.received, s.lost, s.duplicates, s.reorders) == (250, 0, 0, 0)
+
+
+def test_gap_reorder_and_duplicate():
+    s = StreamIntegrity()
+    s.update(np.array([0, 1, 2, 5, 6, 3, 6, 7]))
+    # 3 and 4 were skipped, 3 arrived late, 6 twice
+    assert s.lost == 1
+    assert s.reorders == 1
+    assert s.duplicates == 1
+
+
+def test_counter_wrap():
+    s = StreamIntegrity(counter_bits=8)
+    s.update(np.arange(250, 262) & 0xff)
+    assert (s.lost, s.wraps, s.restarts) == (0, 1, 0)
+
+
+def test_restart_resyncs():
+    s = StreamIntegrity(window=16)
+    s.update(np.concatenate((np.arange(1000, 1100), np.arange(0, 50))))
+    assert s.restarts == 1
+    assert s.lost == 0
@@ -0,0 +1,61 @@
+import numpy as np
+from rfsoc_qsfp_offload.kurtosis import SpectralKurtosis, unpack_mask
+
+FFT = 64
+
+
+def noise(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (0.01 * (rng.standard_normal(n) + 1j * rng.standard_normal(n))
+            ).astype(np.complex64)
+
+
+def flagged_bins(mask):
+    return set(np.flatnonzero(unpack_mask(mask, FFT)) - FFT // 2)
+
+
+def test_gaussian_noise_is_rarely_flagged():
+    sk = SpectralKurtosis(FFT, m=256)
+    masks = sk.push(noise(4 * 256 * FFT))
+    assert [i for i, _ in masks] == [0, 256 * FFT, 512 * FFT, 768 * FFT]
+    assert sk.stats()["flagged_fraction"] < 0.02
+    assert abs(float(np.median(sk.sk)) - 1) < 0.05
+
+
+def test_tone_and_pulses_are_flagged():
+    t = np.arange(256 * FFT)
+    x = noise(len(t))
+    # A constant-envelope tone in bin 5 lowers SK
+    x += 0.1 * np.exp(2j * np.pi * 5 * t / FFT)
+    # A pulse in one segment out of 64 in bin -9 raises it
+    on = (t // FFT) % 64 == 0
+    x += on * 0.3 * np.exp(-2j * np.pi * 9 * t / FFT)
+    sk = SpectralKurtosis(FFT, m=256)
+    (_, mask), = sk.push(x.astype(np.complex64))
+    assert {5, -9} <= flagged_bins(mask)
+    assert sk.sk[FFT // 2 + 5] < sk.lower
+    assert sk.sk[FFT // 2 - 9] > sk.upper
+
+
+def test_blocks_match_a_single_push():
+    x = noise(8 * 64 * FFT)
+    whole = SpectralKurtosis(FFT, m=64, batch=7).push(x)
+    sk = SpectralKurtosis(FFT, m=64, batch=7)
+    parts = []
+    for i in range(0, len(x), 1000):
+        parts += sk.push(x[i:i + 1000])
+    assert [i for i, _ in parts] == [i for i, _ in whole]
+    for (_, a), (_, b) in zip(parts, whole):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_int16_input_and_restart():
+    x = np.zeros(2 * 10 * FFT, dtype=np.int16)
+    x[::2] = 1000
+    sk = SpectralKurtosis(FFT, m=4)
+    assert [i for i, _ in sk.push(x[:6 * FFT], 0)] == []
+    assert sk.stats()["pending_segments"] == 3
+    # A jump drops the pending segments and restarts the window
+    masks = sk.push(x, 5000)
+    assert [i for i, _ in masks] == [5000, 5000 + 4 * FFT]
+    assert sk.stats()["pending_segments"] == 2
@@ -0,0 +1,55 @@
+import json
+import numpy as np
+from rfsoc_qsfp_offload.levels import LevelMonitor
+from rfsoc_qsfp_offload.signal_generator import convert_to_int16
+
+
+def iq(x):
+    out = np.empty(2 * len(x))
+    out[0::2], out[1::2] = x.real, x.imag
+    return convert_to_int16(out, bits=14).astype(np.int16)
+
+
+def test_tone_level_and_dc():
+    t = np.arange(1 << 14)
+    x = iq(0.5 * np.exp(2j * np.pi * t / 64) + 0.1 - 0.05j)
+    mon = LevelMonitor(1e6)
+    assert mon.update(x, 0) is None
+    last = mon.last_block()
+    # A complex tone at amplitude 0.5 has power 0.25 plus the DC
+    assert abs(last["rms_dbfs"] - 10 * np.log10(0.25 + 0.0125)) < 0.05
+    assert abs(last["dc_i"] - 0.1) < 1e-3
+    assert abs(last["dc_q"] + 0.05) < 1e-3
+    assert abs(last["peak_dbfs"] - 20 * np.log10(0.6)) < 0.05
+    assert last["clipped"] == 0
+    assert mon.histogram().sum() == 2 * len(t)
+
+
+def test_clipping_and_near_full_scale():
+    x = iq(np.full(100, 0.95 + 0.5j))
+    x[:10] = 32767
+    x[10:20] = -32768
+    mon = LevelMonitor(1e6, near_dbfs=-1.0)
+    mon.update(x, 0)
+    last = mon.last_block()
+    assert last["clipped"] == 20
+    # All 100 I values and the 10 overwritten Q values
+    assert last["near_full_scale"] == 110
+    assert last["clip_fraction"] == 20 / 200
+
+
+def test_interval_summaries_per_channel():
+    summaries = []
+    mon = LevelMonitor(1000.0, interval_s=1.0, callback=summaries.append)
+    block = iq(np.full(400, 0.25))
+    results = [mon.update(block, i * 400, 'A') for i in range(5)]
+    mon.update(block, 0, 'B')
+    assert [r is not None for r in results] == [False, False, True,
+                                                False, False]
+    (s,) = summaries
+    assert (s["channel"], s["sample_idx"], s["samples"], s["blocks"]) == \
+        ('A', 0, 1200, 3)
+    json.dumps(s)
+    assert mon.histogram('A', interval=True).sum() == 2 * 800
+    assert set(mon.stats()) == {'A', 'B'}
+    assert mon.stats()['A']["samples"] == 2000
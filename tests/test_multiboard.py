@@ -0,0 +1,97 @@
+import socket
+import numpy as np
+import pytest
+from rfsoc_qsfp_offload.multiboard import MultiBoardReceiver
+from rfsoc_qsfp_offload.replay import packetize
+from rfsoc_qsfp_offload.rx import PACKET_SAMPLES, Receiver
+
+BLOCK = 2 * PACKET_SAMPLES
+
+
+def sender():
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.bind(('127.0.0.1', 0))
+    return s
+
+
+def packets(value, n, start=0):
+    x = np.full(2 * PACKET_SAMPLES * n, value, dtype=np.int16)
+    return packetize(x, start * PACKET_SAMPLES, 1e6)
+
+
+def receive_all(mb):
+    """Receive until the packets run out, then flush the receiver."""
+    blocks = []
+    while True:
+        got = mb.recv(timeout=0.05) or mb.flush()
+        if not got:
+            return blocks
+        blocks += [(b.sample_idx, b.samples.copy(), b.valid.copy())
+                   for b in got]
+
+
+@pytest.fixture
+def boards():
+    rx = Receiver(port=0, host='127.0.0.1', slots=256, batch=64,
+                  sources=True)
+    a, b, other = sender(), sender(), sender()
+    dest = rx.sock.getsockname()
+    sources = {('127.0.0.1', a.getsockname()[1]): 'A',
+               ('127.0.0.1', b.getsockname()[1]): 'B'}
+    with MultiBoardReceiver(sources, block_samples=BLOCK, lag_blocks=1,
+                            max_lag_blocks=2, receivers=[rx]) as mb:
+        yield mb, dest, a, b, other
+    for s in (rx, a, b, other):
+        s.close()
+
+
+def test_sources_are_aligned_and_missing_blocks_zero_filled(boards):
+    mb, dest, a, b, other = boards
+    for p in packets(1, 8):
+        a.sendto(p, dest)
+    # Board B misses its second block
+    for i, p in enumerate(packets(2, 8)):
+        if i not in (2, 3):
+            b.sendto(p, dest)
+    other.sendto(packets(3, 1)[0], dest)
+    blocks = receive_all(mb)
+    assert [idx for idx, _, _ in blocks] == [0, BLOCK, 2 * BLOCK, 3 * BLOCK]
+    for idx, samples, valid in blocks:
+        assert (samples[0] == 1).all() and valid[0].all()
+        if idx == BLOCK:
+            assert not samples[1].any() and not valid[1].any()
+        else:
+            assert (samples[1] == 2).all() and valid[1].all()
+    stats = mb.stats()
+    assert stats["total"]["unknown_packets"] == 1
+    assert stats["total"]["blocks"] == 4
+    assert stats["A"]["packets"] == 8 and stats["B"]["packets"] == 6
+    assert stats["B"]["lost"] == 2
+    assert stats["A"]["lag_samples"] == stats["B"]["lag_samples"] == 0
+
+
+def test_lagging_source_is_zero_filled_then_late(boards):
+    mb, dest, a, b, other = boards
+    for p in packets(1, 12):
+        a.sendto(p, dest)
+    first = []
+    while True:
+        got = mb.recv(timeout=0.05)
+        if not got:
+            break
+        first += [(blk.sample_idx, blk.valid.copy()) for blk in got]
+    # A is max_lag_blocks ahead of the oldest pending block
+    assert [idx for idx, _ in first] == [0, BLOCK, 2 * BLOCK]
+    assert all(v[0].all() and not v[1].any() for _, v in first)
+    for p in packets(2, 2):
+        b.sendto(p, dest)
+    receive_all(mb)
+    assert mb.stats()["B"]["late_blocks"] == 1
+    assert mb.stats()["B"]["lag_samples"] == 10 * PACKET_SAMPLES
+
+
+def test_rejects_bad_sources():
+    with pytest.raises(ValueError):
+        MultiBoardReceiver({}, receivers=[])
+    with pytest.raises(ValueError):
+        MultiBoardReceiver({'10.0.0.1': 'A', '10.0.0.2': 'A'}, receivers=[])
@@ -0,0 +1,61 @@
+import socket
+import time
+import numpy as np
+import pytest
+from rfsoc_qsfp_offload.multichannel import MultiChannelReceiver
+from rfsoc_qsfp_offload.reassembly import decode_headers
+from rfsoc_qsfp_offload.replay import packetize
+from rfsoc_qsfp_offload.rx import PACKET_SAMPLES
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def packets(first, n):
+    x = np.zeros(2 * PACKET_SAMPLES * n, dtype=np.int16)
+    return packetize(x, first * PACKET_SAMPLES, 1e6)
+
+
+def read_all(mcr, channel, n, timeout=5.0):
+    got = []
+    deadline = time.monotonic() + timeout
+    while sum(map(len, got)) < n and time.monotonic() < deadline:
+        block = mcr.read(channel)
+        if len(block):
+            got.append(block.copy())
+        else:
+            time.sleep(0.01)
+    return np.concatenate(got) if got else np.empty((0, 0), np.uint8)
+
+
+def test_reuseport_takes_one_channel():
+    with pytest.raises(ValueError):
+        MultiChannelReceiver(channels=['A', 'B'], reuseport=True)
+    with pytest.raises(ValueError):
+        MultiChannelReceiver(channels=['A'], ports={'B': 1})
+
+
+def test_channels_are_received_by_their_workers():
+    ports = {'A': free_port(), 'B': free_port()}
+    with MultiChannelReceiver(channels=['A', 'B'], ports=ports,
+                              host='127.0.0.1', slots=64, batch=8,
+                              rcvbuf=1 << 20) as mcr:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            for p in packets(0, 20):
+                s.sendto(p, ('127.0.0.1', ports['A']))
+            # Channel B misses packets 5..7
+            for p in list(packets(0, 5)) + list(packets(8, 4)):
+                s.sendto(p, ('127.0.0.1', ports['B']))
+        a = read_all(mcr, 'A', 20)
+        b = read_all(mcr, 'B', 9)
+        stats = mcr.stats()
+    assert np.array_equal(decode_headers(a)['sample_idx'] // PACKET_SAMPLES,
+                          np.arange(20))
+    assert len(b) == 9
+    assert stats['A']['packets'] == 20 and stats['A']['lost'] == 0
+    assert stats['B']['packets'] == 9 and stats['B']['lost'] == 3
+    assert stats['total']['packets'] == 29
+    assert stats['total']['lost'] == 3
@@ -0,0 +1,113 @@
+import struct
+import numpy as np
+from rfsoc_qsfp_offload.pcap import (FRAME_BYTES, PcapCapture, frame_header,
+                                     write_pcap)
+from rfsoc_qsfp_offload.replay import packetize
+from rfsoc_qsfp_offload.rx import PACKET_SAMPLES
+
+ARP = bytes(12) + b'\x08\x06' + bytes(46)
+
+
+def payloads(n, sample_idx=0):
+    samples = np.arange(2 * PACKET_SAMPLES * n, dtype=np.int16)
+    return packetize(samples, sample_idx, 1e6)
+
+
+def pcap_records(path, records):
+    """Write a nanosecond pcap of (timestamp_ns, frame bytes) records."""
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<IHHiIII', 0xa1b23c4d, 2, 4, 0, 0, 65535, 1))
+        for ts, frame in records:
+            f.write(struct.pack('<4I', ts // 10 ** 9, ts % 10 ** 9,
+                                len(frame), len(frame)))
+            f.write(frame)
+
+
+def stream_frame(payload, port=60133):
+    return frame_header(dst=('192.168.4.1', port)).tobytes() + \
+        payload.tobytes()
+
+
+def test_write_and_read_back(tmp_path):
+    p = payloads(5, 3 * PACKET_SAMPLES)
+    ts = 10 ** 18 + np.arange(5) * 1000
+    write_pcap(str(tmp_path / 'a.pcap'), p, ts, chunk=2)
+    with PcapCapture(str(tmp_path / 'a.pcap')) as cap:
+        assert len(cap) == 5
+        # Every record is a stream frame: a view of the file
+        assert not cap.payloads.flags.owndata
+        np.testing.assert_array_equal(cap.payloads, p)
+        np.testing.assert_array_equal(cap.timestamps_ns, ts)
+        assert list(cap.packet_index) == [3, 4, 5, 6, 7]
+        np.testing.assert_array_equal(cap.frames[0], frame_header())
+
+
+def test_irregular_records(tmp_path):
+    p = payloads(9)
+    records, expected = [], []
+    for i, payload in enumerate(p):
+        if i in (2, 3):
+            records.append((i, ARP))
+        if i == 6:
+            # A full-size frame to another port
+            records.append((i, stream_frame(payload, port=5000)))
+            continue
+        records.append((1000 + i, stream_frame(payload)))
+        expected.append(i)
+    # A record cut short by the end of the capture
+    records.append((99, stream_frame(p[0])))
+    path = str(tmp_path / 'b.pcap')
+    pcap_records(path, records)
+    with open(path, 'r+b') as f:
+        f.truncate(f.seek(0, 2) - 100)
+    with PcapCapture(path) as cap:
+        np.testing.assert_array_equal(cap.payloads, p[expected])
+        np.testing.assert_array_equal(cap.timestamps_ns,
+                                      1000 + np.array(expected))
+        assert cap.frames.shape == (len(expected), 42)
+    with PcapCapture(path, port=None) as cap:
+        assert len(cap) == 9
+
+
+def test_microsecond_pcap(tmp_path):
+    path = str(tmp_path / 'c.pcap')
+    p = payloads(2)
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, 1))
+        for i, payload in enumerate(p):
+            f.write(struct.pack('<4I', 7, 5 + i, FRAME_BYTES, FRAME_BYTES))
+            f.write(stream_frame(payload))
+    with PcapCapture(path) as cap:
+        assert cap.timestamps_ns.tolist() == [7_000_005_000, 7_000_006_000]
+
+
+def block(btype, body):
+    body += bytes(-len(body) % 4)
+    n = len(body) + 12
+    return struct.pack('<2I', btype, n) + body + struct.pack('<I', n)
+
+
+def test_pcapng(tmp_path):
+    p = payloads(6)
+    shb = block(0x0a0d0d0a, struct.pack('<IHHq', 0x1a2b3c4d, 1, 0, -1))
+    # Interface 0 in microseconds, interface 1 in nanoseconds
+    idb_us = block(1, struct.pack('<HHI', 1, 0, 65535))
+    idb_ns = block(1, struct.pack('<HHI', 1, 0, 65535) +
+                   struct.pack('<HHB3x', 9, 1, 9) + bytes(4))
+
+    def epb(iface, ticks, frame):
+        return block(6, struct.pack('<5I', iface, ticks >> 32,
+                                    ticks & 0xffffffff, len(frame),
+                                    len(frame)) + frame)
+    blocks = [shb, idb_us, idb_ns]
+    for i, payload in enumerate(p):
+        if i == 3:
+            blocks.append(epb(0, 0, ARP))
+        blocks.append(epb(i % 2, (1 << 40) + i, stream_frame(payload)))
+    path = str(tmp_path / 'd.pcapng')
+    with open(path, 'wb') as f:
+        f.write(b''.join(blocks))
+    with PcapCapture(path) as cap:
+        np.testing.assert_array_equal(cap.payloads, p)
+        assert cap.timestamps_ns.tolist() == [
+            ((1 << 40) + i) * (1000 if i % 2 == 0 else 1) for i in range(6)]
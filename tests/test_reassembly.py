@@ -0,0 +1,93 @@
+import numpy as np
+from rfsoc_qsfp_offload.reassembly import Reassembler, decode_headers
+from rfsoc_qsfp_offload.replay import packetize
+from rfsoc_qsfp_offload.rx import PACKET_SAMPLES, payload_samples
+
+
+def packets(first, n, frequency=0.0):
+    """n packets from packet index `first`, sample values counting up."""
+    samples = np.arange(2 * PACKET_SAMPLES * n).astype(np.int16)
+    return packetize(samples, first * PACKET_SAMPLES, 1e6, frequency)
+
+
+def run(r, *batches):
+    blocks = []
+    for b in batches:
+        blocks += [(blk.sample_idx, blk.samples.copy(), blk.valid.copy(),
+                    blk.tags) for blk in r.push(b)]
+    blocks += [(blk.sample_idx, blk.samples.copy(), blk.valid.copy(),
+                blk.tags) for blk in r.flush()]
+    return blocks
+
+
+def test_in_order_blocks():
+    p = packets(10, 32)
+    blocks = run(Reassembler(block_packets=8), p)
+    assert [b[0] for b in blocks] == \
+        [(10 + 8 * i) * PACKET_SAMPLES for i in range(4)]
+    assert np.array_equal(np.concatenate([b[1] for b in blocks]),
+                          payload_samples(p).reshape(-1))
+    assert all(b[2].all() for b in blocks)
+
+
+def test_reordered_packets_are_placed_by_sample_idx():
+    p = packets(0, 32)
+    jitter = np.random.default_rng(0).integers(0, 12, 32)
+    order = np.argsort(np.arange(32) + jitter)
+    r = Reassembler(block_packets=8, align=True)
+    blocks = run(r, p[order[:16]], p[order[16:]])
+    assert np.array_equal(np.concatenate([b[1] for b in blocks]),
+                          payload_samples(p).reshape(-1))
+    assert r.late == 0
+
+
+def test_gap_is_zero_filled():
+    p = packets(0, 16)
+    r = Reassembler(block_packets=8)
+    blocks = run(r, np.delete(p, [3, 4], axis=0))
+    assert r.gap_packets == 2
+    assert list(np.flatnonzero(~blocks[0][2])) == [3, 4]
+    gap = blocks[0][1].reshape(8, -1)[3:5]
+    assert not gap.any()
+
+
+def test_duplicates_are_counted():
+    p = packets(0, 8)
+    r = Reassembler(block_packets=8)
+    run(r, np.concatenate((p, p[2:4])))
+    assert r.duplicates == 2
+    assert r.packets == 10
+
+
+def test_frequency_tags():
+    p = np.concatenate((packets(0, 4, 1e9), packets(4, 4, 2e9)))
+    blocks = run(Reassembler(block_packets=8), p)
+    tags = [(idx, key, value) for idx, key, value in blocks[0][3]
+            if key == 'rx_freq']
+    assert tags == [(0, 'rx_freq', 1e9), (4 * PACKET_SAMPLES, 'rx_freq', 2e9)]
+
+
+def test_restart_inside_a_batch_is_not_mixed():
+    rng = np.random.default_rng(1)
+    old, new = packets(10000, 40), packets(0, 40)
+    jitter = np.arange(40) + rng.integers(0, 3, 40)
+    batch = np.concatenate((old[np.argsort(jitter)], new[np.argsort(jitter)]))
+    r = Reassembler(block_packets=8, lag_blocks=1)
+    blocks = run(r, batch)
+    assert [b[0] // PACKET_SAMPLES for b in blocks] == \
+        [10000, 10008, 10016, 10024, 10032, 0, 8, 16, 24, 32]
+    assert r.resyncs == 1
+    assert (r.late, r.gap_packets) == (0, 0)
+    assert any(key == 'rx_resync' for _, key, _ in blocks[5][3])
+
+
+def test_align_starts_blocks_on_the_grid():
+    blocks = run(Reassembler(block_packets=8, align=True), packets(13, 11))
+    assert [b[0] // PACKET_SAMPLES for b in blocks] == [8, 16]
+    assert list(np.flatnonzero(~blocks[0][2])) == [0, 1, 2, 3, 4]
+
+
+def test_decode_headers_is_a_view():
+    p = packets(0, 2)
+    decode_headers(p)['sample_idx'] = 7
+    assert decode_headers(p)['sample_idx'].tolist() == [7, 7]
@@ -0,0 +1,68 @@
+import json
+import numpy as np
+from rfsoc_qsfp_offload.reassembly import Block
+from rfsoc_qsfp_offload.recorder import SigMFRecorder
+from rfsoc_qsfp_offload.replay import load_recording
+from rfsoc_qsfp_offload.rx import PACKET_SAMPLES, payload_samples
+
+PAGE_SAMPLES = 1024
+
+
+def ramp(start, n):
+    return (np.arange(2 * start, 2 * (start + n)) % 30000).astype(np.int16)
+
+
+def read(path):
+    with open(path + '.sigmf-meta') as f:
+        meta = json.load(f)
+    return meta, np.fromfile(path + '.sigmf-data', dtype='<i2')
+
+
+def test_rotation_captures_and_round_robin(tmp_path):
+    dirs = [str(tmp_path / 'a'), str(tmp_path / 'b')]
+    for d in dirs:
+        (tmp_path / d).mkdir()
+    with SigMFRecorder('rec', 1e6, 1e9, dirs=dirs,
+                       max_bytes=3 * 4 * PAGE_SAMPLES, write_bytes=4096,
+                       n_buffers=2) as rec:
+        rec.write(ramp(0, 2000), 0)
+        rec.write(ramp(2000, 500), 2000, frequency=2e9)
+        rec.write(ramp(9000, 1000), 9000)
+        rec.write_block(Block(10000, ramp(10000, 100), None,
+                              [(10050, 'rx_freq', 3e9)]))
+    assert rec.files == [f'{dirs[0]}/rec_00000', f'{dirs[1]}/rec_00001']
+    assert rec.stats()["samples"] == 3600
+    assert rec.stats()["bytes_written"] == 3600 * 4
+    meta, data = read(rec.files[0])
+    assert meta["global"]["core:datatype"] == "ci16_le"
+    assert [(c["core:sample_start"], c["core:global_index"],
+             c["core:frequency"]) for c in meta["captures"]] == \
+        [(0, 0, 1e9), (2000, 2000, 2e9), (2500, 9000, 2e9)]
+    np.testing.assert_array_equal(
+        data, np.concatenate((ramp(0, 2500), ramp(9000, 572))))
+    meta, data = read(rec.files[1])
+    assert [(c["core:sample_start"], c["core:global_index"],
+             c["core:frequency"]) for c in meta["captures"]] == \
+        [(0, 9572, 2e9), (478, 10050, 3e9)]
+    np.testing.assert_array_equal(data, ramp(9572, 528))
+
+
+def test_absolute_sample_idx_sets_datetime(tmp_path):
+    fs = 1000
+    with SigMFRecorder(str(tmp_path / 'rec'), fs, 1e9,
+                       sample_idx_offset=1, write_bytes=4096) as rec:
+        rec.write(ramp(0, 10), 1_700_000_000 * fs + 500)
+    meta, _ = read(rec.files[0])
+    assert meta["captures"][0]["core:datetime"] == \
+        "2023-11-14T22:13:20.500000Z"
+
+
+def test_replay_loads_the_recording(tmp_path):
+    n = 2 * PACKET_SAMPLES + 100
+    with SigMFRecorder(str(tmp_path / 'rec'), 1e6, 1e9,
+                       write_bytes=4096) as rec:
+        rec.write(ramp(0, n), 4 * PACKET_SAMPLES)
+    payloads = load_recording(rec.files[0] + '.sigmf-data')
+    assert len(payloads) == 3
+    np.testing.assert_array_equal(payload_samples(payloads).reshape(-1)[
+        :2 * n], ramp(0, n))
@@ -0,0 +1,74 @@
+import numpy as np
+from rfsoc_qsfp_offload.reassembly import decode_headers
+from rfsoc_qsfp_offload.replay import Packetizer, Replayer, packetize
+from rfsoc_qsfp_offload.rx import PACKET_SAMPLES, Receiver, payload_samples
+
+W = 2 * PACKET_SAMPLES
+
+
+def ramp(n_samples, start=0):
+    return (np.arange(2 * n_samples, dtype=np.int64) + 2 * start).astype(
+        np.int16)
+
+
+def test_packetize_headers_and_padding():
+    x = ramp(2 * PACKET_SAMPLES + 10)
+    p = packetize(x, 4096, 122.88e6, 1.5e9)
+    hdr = decode_headers(p)
+    assert hdr['sample_idx'].tolist() == [4096, 4096 + PACKET_SAMPLES,
+                                          4096 + 2 * PACKET_SAMPLES]
+    assert (hdr['frequency_idx'] == 1_500_000).all()
+    assert (hdr['sample_rate_numerator'] / hdr['sample_rate_denominator']
+            == 122.88e6).all()
+    assert (hdr['pkt_samples'] == PACKET_SAMPLES).all()
+    rows = payload_samples(p)
+    np.testing.assert_array_equal(rows.reshape(-1)[:len(x)], x)
+    assert not rows[2, 20:].any()
+
+
+def test_blocks_give_the_packets_of_the_whole_stream():
+    x = ramp(5 * PACKET_SAMPLES + 300, 7000)
+    whole = packetize(x, 7000, 1e6)
+    pk = Packetizer(1e6)
+    cuts = [0, 1000, W + 4, W + 10, 4 * W + 6, len(x)]
+    parts = [pk.push(x[:1000], 7000)]
+    for a, b in zip(cuts[1:], cuts[2:]):
+        parts.append(pk.push(x[a:b]))
+    parts.append(pk.flush())
+    assert [len(p) for p in parts] == [0, 1, 0, 3, 1, 1]
+    np.testing.assert_array_equal(np.concatenate(parts), whole)
+    assert len(pk.flush()) == 0
+
+
+def test_held_samples_keep_their_frequency():
+    pk = Packetizer(1e6, frequency=1e9)
+    assert len(pk.push(ramp(100), 0)) == 0
+    p = pk.push(ramp(2 * PACKET_SAMPLES, 100), frequency=2e9)
+    assert decode_headers(p)['frequency_idx'].tolist() == [1_000_000,
+                                                           2_000_000]
+    assert decode_headers(pk.flush())['frequency_idx'].tolist() == \
+        [2_000_000]
+
+
+def test_discontinuity_flushes_held_samples():
+    pk = Packetizer(1e6)
+    pk.push(ramp(100), 0)
+    p = pk.push(ramp(PACKET_SAMPLES, 10_000), 10_000)
+    assert decode_headers(p)['sample_idx'].tolist() == [0, 10_000]
+    np.testing.assert_array_equal(payload_samples(p)[0, :200], ramp(100))
+    assert not payload_samples(p)[0, 200:].any()
+
+
+def test_replay_over_loopback():
+    p = packetize(ramp(20 * PACKET_SAMPLES), 0, 1e9)
+    with Receiver(port=0, host='127.0.0.1', slots=64, batch=64) as rx:
+        port = rx.sock.getsockname()[1]
+        with Replayer(('127.0.0.1', port), batch=8) as rep:
+            stats = rep.replay(p)
+        got = []
+        while sum(map(len, got)) < len(p):
+            batch = rx.recv(timeout=1.0)
+            assert len(batch)
+            got.append(batch.copy())
+    assert (stats["packets"], stats["batches"]) == (20, 3)
+    np.testing.assert_array_equal(np.concatenate(got), p)
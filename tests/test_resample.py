@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from scipy import signal
+from rfsoc_qsfp_offload.resample import Decimator, RationalResampler
+
+
+def noise(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(n) + 1j * rng.standard_normal(n)).astype(
+        np.complex64)
+
+
+def push_blocks(r, x, sizes):
+    out, i = [], 0
+    for size in sizes:
+        out.append(r.push(x[i:i + size]).copy())
+        i += size
+    return np.concatenate(out)
+
+
+@pytest.mark.parametrize('fft_threshold', [1000, 4])
+@pytest.mark.parametrize('up,down', [(3, 2), (1, 7), (5, 3), (2, 5)])
+def test_matches_upfirdn_across_blocks(up, down, fft_threshold):
+    r = RationalResampler(up, down, max_samples=5000,
+                          fft_threshold=fft_threshold)
+    assert (r._fft is not None) == (fft_threshold == 4)
+    sizes = [1000, 37, 1, 4096, 5, 2000]
+    x = noise(sum(sizes))
+    y = push_blocks(r, x, sizes)
+    ref = signal.upfirdn(r.taps.astype(np.float64), x, up, down)[:len(y)]
+    assert len(y) == -(-len(x) * up // down)
+    np.testing.assert_allclose(y, ref, atol=1e-5 * np.abs(ref).max())
+
+
+def test_int16_input():
+    samples = (np.arange(2000) % 200 - 100).astype(np.int16)
+    a = RationalResampler(3, 2).push(samples).copy()
+    b = RationalResampler(3, 2).push(
+        (samples[0::2] + 1j * samples[1::2]).astype(np.complex64) / 32768)
+    np.testing.assert_allclose(a, b, atol=1e-6)
+
+
+def test_for_rates_and_stats():
+    r = RationalResampler.for_rates(245.76e6, 200e6)
+    assert (r.up, r.down) == (625, 768)
+    assert r.output_rate(245.76e6) == pytest.approx(200e6)
+    r.push(noise(768))
+    assert r.stats()["samples_out"] == 625
+
+
+def test_decimator_passes_a_tone():
+    n = 1 << 14
+    tone = np.exp(2j * np.pi * 0.01 * np.arange(n)).astype(np.complex64)
+    y = Decimator(4).push(tone)
+    assert len(y) == n // 4
+    # Unit gain in the passband once the filter has settled
+    np.testing.assert_allclose(np.abs(y[200:]), 1.0, atol=0.01)
+
+
+def test_too_large_block():
+    with pytest.raises(ValueError):
+        RationalResampler(2, 3, max_samples=10).push(noise(11))
@@ -0,0 +1,43 @@
+import socket
+import numpy as np
+import pytest
+from rfsoc_qsfp_offload import rx
+from rfsoc_qsfp_offload.replay import packetize
+
+
+@pytest.fixture(params=['recvmmsg', 'fallback'])
+def receiver(request, monkeypatch):
+    if request.param == 'fallback':
+        monkeypatch.setattr(rx, '_recvmmsg', None)
+    elif rx._recvmmsg is None:
+        pytest.skip("recvmmsg() is not available")
+    r = rx.Receiver(port=0, host='127.0.0.1', slots=64, batch=16,
+                    rcvbuf=1 << 20)
+    yield r
+    r.close()
+
+
+def send(receiver, datagrams):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        for d in datagrams:
+            s.sendto(d, receiver.sock.getsockname())
+
+
+def test_receives_payloads(receiver):
+    payloads = packetize(np.arange(2 * 2048 * 4, dtype=np.int16), 0, 1e6)
+    send(receiver, payloads)
+    got = receiver.recv(timeout=1.0)
+    np.testing.assert_array_equal(got, payloads)
+    assert receiver.stats()["packets"] == 4
+
+
+def test_drops_truncated_datagrams(receiver):
+    payloads = packetize(np.arange(2 * 2048 * 3, dtype=np.int16), 0, 1e6)
+    oversize = np.zeros(rx.PAYLOAD_BYTES + 100, dtype=np.uint8)
+    send(receiver, [payloads[0], oversize, payloads[1], oversize,
+                    payloads[2]])
+    got = receiver.recv(timeout=1.0)
+    np.testing.assert_array_equal(got, payloads)
+    assert len(receiver.last_lengths) == 3
+    stats = receiver.stats()
+    assert (stats["packets"], stats["truncated"]) == (3, 2)
@@ -0,0 +1,65 @@
+import warnings
+import numpy as np
+import pytest
+from rfsoc_qsfp_offload.signal_generator import convert_to_int16, \
+    cyclic_length, cyclic_sawtooth, cyclic_sine, sine
+
+
+@pytest.mark.parametrize('f,fs,n', [(10e6, 2457.6e6, 6144),
+                                    (1e6, 1024e6, 1024),
+                                    (100.1e6, 2457.6e6, 24576)])
+def test_cyclic_length(f, fs, n):
+    length, cycles, actual = cyclic_length(f, fs)
+    assert (length, actual) == (n, f)
+    assert length % 16 == 0
+    assert cycles / length == pytest.approx(f / fs, rel=1e-15)
+
+
+def test_cyclic_length_min_samples():
+    length, cycles, _ = cyclic_length(10e6, 2457.6e6, min_samples=10000)
+    assert (length, cycles) == (12288, 50)
+
+
+def test_cyclic_length_rejects_bad_frequencies():
+    for f in (0.0, 3e9):
+        with pytest.raises(ValueError):
+            cyclic_length(f, 2457.6e6)
+
+
+def test_cyclic_sine_repeats_without_discontinuity():
+    f, fs = 100.1e6, 2457.6e6
+    wave = cyclic_sine(f, fs)
+    looped = np.concatenate((wave, wave))
+    ref = np.sin(2 * np.pi * f / fs * np.arange(len(looped)))
+    np.testing.assert_allclose(looped, ref, atol=1e-3)
+
+
+def test_cyclic_sine_min_samples_and_amplitude():
+    wave = cyclic_sine(10e6, 2457.6e6, A=0.5, min_samples=20000)
+    assert len(wave) == 24576
+    assert wave.dtype == np.single
+    assert np.abs(wave).max() == pytest.approx(0.5, abs=1e-4)
+
+
+def test_cyclic_sawtooth():
+    wave = cyclic_sawtooth(50e6, 2457.6e6, width=1.0)
+    assert len(wave) % 16 == 0
+    assert wave.min() >= -1 and wave.max() <= 1
+
+
+def test_warns_when_the_frequency_moves():
+    with pytest.warns(UserWarning, match="instead of"):
+        cyclic_sine(1.0000001e6, 1024e6)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        cyclic_sine(10e6, 2457.6e6)
+
+
+def test_convert_to_int16():
+    out = convert_to_int16(np.array([0.0, 0.5, -1.0, 1.5]))
+    assert out.dtype == np.int16
+    assert out.tolist() == [0, 4096 * 4, -8192 * 4, 8191 * 4]
+
+
+def test_sine_min_samples():
+    assert len(sine(10e6, 2457.6e6, min_samples=24576)) >= 24576
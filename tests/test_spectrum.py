@@ -0,0 +1,72 @@
+import numpy as np
+from rfsoc_qsfp_offload.spectrum import SpectrumEngine, WaterfallFile
+
+
+def tone(n, bin_, fft_size, amp=0.5, start=0):
+    t = np.arange(start, start + n)
+    return (amp * np.exp(2j * np.pi * bin_ * t / fft_size)).astype(
+        np.complex64)
+
+
+def test_tone_reads_its_level_in_its_bin():
+    eng = SpectrumEngine(fft_size=256, averages=4, window='hann')
+    rows = eng.push(tone(5 * 128 + 128, 10, 256))
+    (idx, row), = rows
+    assert idx == 0
+    assert np.argmax(row) == 128 + 10
+    assert abs(row.max() - 20 * np.log10(0.5)) < 0.1
+
+
+def test_blocks_match_a_single_push():
+    x = tone(8192, 5, 128) + 0.01
+    whole = SpectrumEngine(fft_size=128, averages=8, batch=3).push(x)
+    eng = SpectrumEngine(fft_size=128, averages=8, batch=3)
+    parts = []
+    for i in range(0, len(x), 1000):
+        parts += eng.push(x[i:i + 1000])
+    assert [i for i, _ in parts] == [i for i, _ in whole]
+    np.testing.assert_allclose(np.array([r for _, r in parts]),
+                               np.array([r for _, r in whole]), atol=1e-4)
+
+
+def test_sample_idx_jump_restarts_the_average():
+    eng = SpectrumEngine(fft_size=64, overlap=0, averages=4)
+    assert eng.push(tone(3 * 64, 3, 64), 0) == []
+    rows = eng.push(tone(4 * 64, 3, 64), 1000)
+    assert [i for i, _ in rows] == [1000]
+
+
+def test_retune_below_pending_segments():
+    # 256 averages at 8192 samples/s, 26 after the retune
+    eng = SpectrumEngine(fft_size=64, overlap=0.5, samp_rate=8192.0,
+                         frame_rate=1.0)
+    assert eng.averages == 256
+    assert eng.push(tone(64 + 198 * 32, 1, 64), 0) == []
+    assert eng.stats()["pending_segments"] == 199
+    eng.set_frequency_range(1e6, 832.0)
+    assert eng.averages == 26
+    assert eng.stats()["pending_segments"] == 0
+    # The unfinished segment is dropped, the next one starts at 6400
+    rows = eng.push(tone(64 + 25 * 32, 1, 64, start=6400))
+    assert [i for i, _ in rows] == [6400]
+    assert eng.stats()["pending_segments"] == 0
+
+
+def test_waterfall_keeps_the_axis_of_every_row(tmp_path):
+    path = str(tmp_path / 'wf')
+    eng = SpectrumEngine(fft_size=64, overlap=0, averages=1,
+                         center_f=1e6, samp_rate=64.0)
+    wf = WaterfallFile(path, 64, n_rows=4, center_f=1e6, samp_rate=64.0)
+    eng.sinks.append(wf)
+    eng.push(tone(2 * 64, 3, 64))
+    eng.set_frequency_range(2e6, 128.0)
+    eng.push(tone(3 * 64, 3, 64))
+    assert wf.frequencies(1)[32 + 3] == 1e6 + 3
+    assert wf.frequencies(0)[32 + 3] == 2e6 + 6
+    wf.close()
+    rows = np.load(path + '.npy')
+    axis = np.load(path + '_axis.npy')
+    assert np.load(path + '_idx.npy').tolist() == [256, 64, 128, 192]
+    assert axis.tolist() == [[2e6, 128.0], [1e6, 64.0],
+                             [2e6, 128.0], [2e6, 128.0]]
+    assert (rows.argmax(axis=1) == 32 + 3).all()
@@ -0,0 +1,59 @@
+import datetime
+import numpy as np
+from rfsoc_qsfp_offload.reassembly import Block
+from rfsoc_qsfp_offload.store import (EVENT_GAP, EVENT_PPS, EVENT_RETUNE,
+                                      CaptureStore, CaptureStoreWriter)
+
+FS = 1000
+T0 = 1_700_000_000          # Epoch second of the first sample
+
+
+def ramp(start, n):
+    return (np.arange(2 * start, 2 * (start + n)) % 30000).astype(np.int16)
+
+
+def write_store(root):
+    with CaptureStoreWriter(root, FS, center_freq=1e9) as w:
+        base = T0 * FS
+        w.write('A', ramp(0, 1500), base)
+        # 500 samples missing, then a retune half-way through a block
+        block = Block(base + 2000, ramp(2000, 1000), None,
+                      [(base + 2500, 'rx_freq', 2e9)])
+        w.write_block('A', block)
+        w.write('B', ramp(0, 10), base)
+    return base
+
+
+def test_index_and_events(tmp_path):
+    base = write_store(str(tmp_path))
+    with CaptureStore(str(tmp_path)) as store:
+        assert store.channels == ['A', 'B']
+        seg = store.segments('A')
+        assert seg['sample_idx'].tolist() == [base, base + 2000,
+                                              base + 2500]
+        assert seg['offset'].tolist() == [0, 1500, 2000]
+        assert seg['frequency'].tolist() == [1e9, 1e9, 2e9]
+        ev = store.events('A')
+        assert [(int(e['sample_idx']) - base, int(e['kind']), e['value'])
+                for e in ev] == [
+            (0, EVENT_PPS, T0), (1000, EVENT_PPS, T0 + 1),
+            (1500, EVENT_GAP, 500), (2000, EVENT_PPS, T0 + 2),
+            (2500, EVENT_RETUNE, 2e9)]
+        assert len(store.events('A', T0 + 1, T0 + 2.5, EVENT_PPS)) == 2
+
+
+def test_query_across_gap_and_retune(tmp_path):
+    base = write_store(str(tmp_path))
+    with CaptureStore(str(tmp_path)) as store:
+        blocks = store.query('A', T0 + 1.2, T0 + 2.8)
+        assert [(b.sample_idx - base, len(b)) for b in blocks] == \
+            [(1200, 300), (2000, 500), (2500, 300)]
+        for b in blocks:
+            np.testing.assert_array_equal(b.samples,
+                                          ramp(b.sample_idx - base, len(b)))
+        assert [b.tags[0][2] for b in blocks] == [1e9, 1e9, 2e9]
+        start = datetime.datetime.fromtimestamp(T0 + 2.9,
+                                                datetime.timezone.utc)
+        (b,) = store.query('A', start, T0 + 10)
+        assert (b.sample_idx - base, len(b)) == (2900, 100)
+        assert store.query_samples('A', base + 1500, base + 2000) == []
@@ -0,0 +1,78 @@
+import socket
+import struct
+import numpy as np
+import pytest
+from rfsoc_qsfp_offload.pcap import frame_header
+from rfsoc_qsfp_offload.replay import packetize
+from rfsoc_qsfp_offload.rx import PACKET_SAMPLES, PAYLOAD_BYTES
+from rfsoc_qsfp_offload.tpacket import TPacketReceiver, stream_filter
+
+
+def run_bpf(prog, pkt):
+    """Interpret the classic BPF instructions used by stream_filter()."""
+    a = x = pc = 0
+    while True:
+        code, jt, jf, k = prog[pc]
+        pc += 1
+        if code == 0x28:
+            a = struct.unpack_from('>H', pkt, k)[0]
+        elif code == 0x30:
+            a = pkt[k]
+        elif code == 0x48:
+            a = struct.unpack_from('>H', pkt, x + k)[0]
+        elif code == 0xb1:
+            x = 4 * (pkt[k] & 0xf)
+        elif code == 0x15:
+            pc += jt if a == k else jf
+        elif code == 0x45:
+            pc += jt if a & k else jf
+        elif code == 0x06:
+            return k
+        else:
+            raise ValueError(f"Unexpected BPF code {code:#x}.")
+
+
+def frame(port=60133, udp_len=8 + PAYLOAD_BYTES, proto=17, frag=0x4000):
+    f = bytearray(frame_header(dst=('192.168.4.1', port)).tobytes())
+    f[23] = proto
+    f[20:22] = struct.pack('>H', frag)
+    f[38:40] = struct.pack('>H', udp_len)
+    return bytes(f) + bytes(udp_len - 8)
+
+
+def test_stream_filter():
+    prog = stream_filter(60133)
+    assert run_bpf(prog, frame()) > 0
+    assert run_bpf(prog, frame(port=60134)) == 0
+    assert run_bpf(prog, frame(udp_len=108)) == 0
+    assert run_bpf(prog, frame(proto=6)) == 0
+    # First and later fragments
+    assert run_bpf(prog, frame(frag=0x2000)) == 0
+    assert run_bpf(prog, frame(frag=0x0010)) == 0
+    arp = bytes(12) + b'\x08\x06' + bytes(46)
+    assert run_bpf(prog, arp) == 0
+
+
+def test_receive_on_loopback():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sink:
+        sink.bind(('127.0.0.1', 0))
+        port = sink.getsockname()[1]
+        try:
+            rx = TPacketReceiver('lo', port, block_size=1 << 16, block_nr=4,
+                                 timeout_ms=5)
+        except PermissionError:
+            pytest.skip("needs CAP_NET_RAW")
+        with rx, socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            p = packetize(np.arange(6 * PACKET_SAMPLES, dtype=np.int16), 0,
+                          1e6)
+            for row in p:
+                s.sendto(row, ('127.0.0.1', port))
+                s.sendto(b'x' * 100, ('127.0.0.1', port))
+            got = []
+            while sum(map(len, got)) < len(p):
+                payloads = rx.recv(timeout=1.0)
+                assert len(payloads)
+                got.append(payloads.copy())
+            np.testing.assert_array_equal(np.concatenate(got), p)
+            stats = rx.stats()
+            assert stats["packets"] == len(p) and stats["drops"] == 0
@@ -0,0 +1,87 @@
+import numpy as np
+from rfsoc_qsfp_offload.trigger import BurstTrigger
+
+FRAME = 64
+
+
+class Sink:
+    def __init__(self):
+        self.writes = []
+
+    def write(self, samples, sample_idx):
+        self.writes.append((sample_idx, samples.copy()))
+
+
+def stream(n, bursts, seed=0):
+    """Quiet noise with loud frames at the (start, stop) sample ranges."""
+    rng = np.random.default_rng(seed)
+    x = rng.normal(0, 30, 2 * n)
+    for start, stop in bursts:
+        x[2 * start:2 * stop] *= 300
+    return x.astype(np.int16)
+
+
+def written(sink):
+    """Contiguous (start, stop) runs of the written sample indices."""
+    runs = []
+    for idx, samples in sink.writes:
+        stop = idx + len(samples) // 2
+        if runs and runs[-1][1] == idx:
+            runs[-1][1] = stop
+        else:
+            runs.append([idx, stop])
+    return [tuple(r) for r in runs]
+
+
+def push_blocks(trig, x, block, first=1000):
+    done = []
+    for i in range(0, len(x) // 2, block):
+        done += trig.push(x[2 * i:2 * (i + block)], first + i)
+    return done
+
+
+def test_pre_and_post_roll():
+    sink = Sink()
+    trig = BurstTrigger(sink, FRAME, pre_samples=256, post_samples=128)
+    x = stream(64 * FRAME, [(40 * FRAME, 42 * FRAME)])
+    done = push_blocks(trig, x, 8 * FRAME)
+    burst, = done
+    trigger = 1000 + 40 * FRAME
+    assert (burst.start, burst.trigger, burst.stop) == \
+        (trigger - 256, trigger, trigger + 2 * FRAME + 128)
+    assert written(sink) == [(burst.start, burst.stop)]
+    # The pre-roll crosses a block boundary and comes from the ring
+    samples = np.concatenate([s for _, s in sink.writes])
+    np.testing.assert_array_equal(
+        samples, x[2 * (burst.start - 1000):2 * (burst.stop - 1000)])
+    assert type(burst.start) is int and type(burst.stop) is int
+    assert all(type(idx) is int for idx, _ in sink.writes)
+
+
+def test_bursts_closer_than_post_roll_merge():
+    sink = Sink()
+    trig = BurstTrigger(sink, FRAME, pre_samples=64, post_samples=4 * FRAME)
+    x = stream(64 * FRAME, [(10 * FRAME, 11 * FRAME),
+                            (13 * FRAME, 14 * FRAME),
+                            (40 * FRAME, 41 * FRAME)])
+    done = push_blocks(trig, x, 16 * FRAME)
+    assert [(b.start - 1000, b.stop - 1000) for b in done] == \
+        [(10 * FRAME - 64, 18 * FRAME), (40 * FRAME - 64, 45 * FRAME)]
+    assert trig.stats()["written_samples"] == 13 * FRAME + 128
+
+
+def test_empty_first_block():
+    trig = BurstTrigger(Sink(), FRAME)
+    assert trig.push(np.zeros(0, dtype=np.int16), 0) == []
+    assert trig.noise_floor_dbfs is None
+    assert trig.push(stream(4 * FRAME, []), 0) == []
+
+
+def test_discontinuity_ends_the_burst():
+    sink = Sink()
+    trig = BurstTrigger(sink, FRAME, pre_samples=64, post_samples=1024)
+    trig.push(stream(8 * FRAME, []), 0)
+    trig.push(stream(8 * FRAME, [(4 * FRAME, 5 * FRAME)]), 8 * FRAME)
+    done = trig.push(stream(8 * FRAME, []), 100 * FRAME)
+    assert [(b.start, b.stop) for b in done] == \
+        [(12 * FRAME - 64, 16 * FRAME)]